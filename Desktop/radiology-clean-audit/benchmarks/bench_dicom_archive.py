@@ -0,0 +1,129 @@
+"""
+ZIP arşivi alım benchmark'ı: gövdenin tamamını bekleyip zipfile ile açan
+yol ile üyeleri yükleme sürerken açan spooled_archive karşılaştırması.
+
+Yükleme, --mbps hızına kısılmış bir parça akışıyla taklit edilir. Arşive
+DICOMDIR ve görüntü olmayan ekler (görüntüleyici programı) de konur;
+akış yolu DICOMDIR'e göre bunları diske yazmadan atlar.
+
+Kullanım (uygulama dizininden):
+    python -m benchmarks.bench_dicom_archive [--slices 200] [--size 256] [--mbps 20] [--extra-mb 20]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+
+from benchmarks.bench_slice_selection import synthetic_series
+
+CHUNK = 256 * 1024
+
+
+def _dicomdir(file_ids: list[str]) -> bytes:
+    from pydicom.dataset import Dataset, FileMetaDataset
+    from pydicom.uid import ExplicitVRLittleEndian, generate_uid
+
+    meta = FileMetaDataset()
+    meta.MediaStorageSOPClassUID = "1.2.840.10008.1.3.10"
+    meta.MediaStorageSOPInstanceUID = generate_uid()
+    meta.TransferSyntaxUID = ExplicitVRLittleEndian
+    ds = Dataset()
+    ds.file_meta = meta
+    records = []
+    for file_id in file_ids:
+        record = Dataset()
+        record.DirectoryRecordType = "IMAGE"
+        record.ReferencedFileID = file_id.split("/")
+        records.append(record)
+    ds.DirectoryRecordSequence = records
+    buf = io.BytesIO()
+    ds.save_as(buf, enforce_file_format=True)
+    return buf.getvalue()
+
+
+def build_archive(paths: list[str], extra_mb: int) -> bytes:
+    ids = [f"DICOM/IM{i:05d}" for i in range(len(paths))]
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        zf.writestr("DICOMDIR", _dicomdir(ids))
+        for file_id, path in zip(ids, paths):
+            zf.write(path, file_id)
+        zf.writestr("VIEWER/viewer.bin", os.urandom(extra_mb * 1024 * 1024), compress_type=zipfile.ZIP_STORED)
+    return buf.getvalue()
+
+
+async def throttled(data: bytes, mbps: float):
+    start = time.perf_counter()
+    for i in range(0, len(data), CHUNK):
+        due = start + (i + CHUNK) / (mbps * 1024 * 1024)
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        yield data[i:i + CHUNK]
+
+
+async def buffered(data: bytes, mbps: float) -> int:
+    """Eski yol: gövde bitince ZIP'i aç, tüm üyeleri yaz, başlıkları oku."""
+    from core.agent import dicom_pool
+
+    directory = tempfile.mkdtemp(prefix="bench_zip_")
+    try:
+        body = os.path.join(directory, "body.zip")
+        with open(body, "wb") as f:
+            async for chunk in throttled(data, mbps):
+                f.write(chunk)
+        with zipfile.ZipFile(body) as zf:
+            names = [n for n in zf.namelist() if not n.endswith("/")]
+            zf.extractall(directory, names)
+        headers = await dicom_pool.read_study_headers([os.path.join(directory, n) for n in names])
+        return sum(h is not None for h in headers)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+async def streamed(data: bytes, mbps: float) -> int:
+    from core.agent.dicom_archive import spooled_archive
+
+    async with spooled_archive(throttled(data, mbps)) as archive:
+        return len(archive.files)
+
+
+async def _measure(data: bytes, mbps: float) -> None:
+    from core.agent import dicom_pool
+
+    await dicom_pool.read_study_headers([])  # havuz ısınması
+    upload_s = len(data) / (mbps * 1024 * 1024)
+    for name, fn in (("buffered", buffered), ("streamed", streamed)):
+        t = time.perf_counter()
+        count = await fn(data, mbps)
+        total = time.perf_counter() - t
+        print(f"  {name:8s} {total:6.2f} s  (yukleme {upload_s:.2f} s, sonrasi {total - upload_s:+.2f} s)  {count} goruntu")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--slices", type=int, default=200)
+    parser.add_argument("--size", type=int, default=256)
+    parser.add_argument("--mbps", type=float, default=20.0, help="taklit edilen yukleme hizi (MB/s)")
+    parser.add_argument("--extra-mb", type=int, default=20, help="goruntu olmayan ek boyutu")
+    args = parser.parse_args()
+
+    from core.agent import dicom_pool
+
+    directory = tempfile.mkdtemp(prefix="bench_archive_")
+    try:
+        paths, _ = synthetic_series(directory, args.slices, args.size, 0.5)
+        data = build_archive(paths, args.extra_mb)
+        print(f"{args.slices} dilim {args.size}x{args.size}, ZIP {len(data) / 2**20:.1f} MB, {args.mbps} MB/s")
+        asyncio.run(_measure(data, args.mbps))
+    finally:
+        dicom_pool.shutdown()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
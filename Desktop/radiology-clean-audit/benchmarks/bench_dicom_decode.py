@@ -0,0 +1,137 @@
+"""
+DICOM decode benchmark'ı: tüm frame'leri decode eden eski yol (ds.pixel_array)
+ile metadata + seçili frame decode eden extract_images_from_dicom karşılaştırması.
+
+Her ölçüm ayrı süreçte yapılır; tepe RSS /proc/self/status VmHWM'den okunur
+(ru_maxrss execve'de sıfırlanmaz, üretici sürecin belleğini de gösterir).
+
+Kullanım (uygulama dizininden):
+    python -m benchmarks.bench_dicom_decode [--frames 500] [--size 256] [--rle]
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ENHANCED_MR = "1.2.840.10008.5.1.4.1.1.4.1"
+
+
+def synthetic_dicom(frames: int, rows: int, cols: int, rle: bool = False, seed: int = 0) -> bytes:
+    """Çok frame'li sentetik (Enhanced) MR nesnesi üretir."""
+    from pydicom.dataset import Dataset, FileMetaDataset
+    from pydicom.uid import ExplicitVRLittleEndian, RLELossless, generate_uid
+
+    meta = FileMetaDataset()
+    meta.MediaStorageSOPClassUID = ENHANCED_MR
+    meta.MediaStorageSOPInstanceUID = generate_uid()
+    meta.TransferSyntaxUID = ExplicitVRLittleEndian
+    ds = Dataset()
+    ds.file_meta = meta
+    ds.SOPClassUID = ENHANCED_MR
+    ds.SOPInstanceUID = meta.MediaStorageSOPInstanceUID
+    ds.SeriesInstanceUID = generate_uid()
+    ds.Modality = "MR"
+    ds.SeriesDescription = "T1 VIBE dinamik"
+    ds.Rows, ds.Columns = rows, cols
+    ds.NumberOfFrames = frames
+    ds.SamplesPerPixel = 1
+    ds.PhotometricInterpretation = "MONOCHROME2"
+    ds.BitsAllocated, ds.BitsStored, ds.HighBit = 16, 12, 11
+    ds.PixelRepresentation = 0
+
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:rows, 0:cols]
+    blob = np.exp(-(((yy - rows / 2) ** 2 + (xx - cols / 2) ** 2) / (2 * (rows / 5) ** 2)))
+    pixels = np.empty((frames, rows, cols), dtype=np.uint16)
+    for i in range(frames):
+        noise = rng.normal(0, 40, (rows, cols))
+        pixels[i] = np.clip(blob * (1500 + i % 100) + 300 + noise, 0, 4095)
+    ds.PixelData = pixels.tobytes()
+    if rle:
+        ds.compress(RLELossless, pixels)
+
+    buf = io.BytesIO()
+    ds.save_as(buf, enforce_file_format=True)
+    return buf.getvalue()
+
+
+def peak_rss_mb() -> float:
+    """Sürecin tepe RSS'i (MB, Linux)."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def legacy_normalize_frame(frame: np.ndarray) -> np.ndarray:
+    """Önceki _normalize_frame: float64 + frame başına min-max."""
+    frame = frame.astype(float)
+    lo, hi = frame.min(), frame.max()
+    if hi > lo:
+        frame = (frame - lo) / (hi - lo) * 255.0
+    else:
+        frame[:] = 0
+    return frame.astype(np.uint8)
+
+
+def _run(mode: str, path: str) -> None:
+    from core.agent import dicom_utils
+
+    t = time.perf_counter()
+    if mode == "eski":
+        import pydicom
+        ds = pydicom.dcmread(path)
+        arr = ds.pixel_array
+        idx = dicom_utils._select_indices(arr.shape[0], 3)
+        for i in idx:
+            base64.b64encode(dicom_utils._encode_frame(legacy_normalize_frame(arr[i]), dicom_utils.ImageEncoding()))
+    else:
+        dicom_utils.extract_images_from_dicom(path, max_slices=3)
+    ms = (time.perf_counter() - t) * 1000
+    print(f"{ms:.1f} {peak_rss_mb():.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--size", type=int, default=256)
+    parser.add_argument("--rle", action="store_true", help="RLE Lossless (encapsulated) kodla")
+    args = parser.parse_args()
+
+    data = synthetic_dicom(args.frames, args.size, args.size, rle=args.rle)
+    with tempfile.NamedTemporaryFile(suffix=".dcm", delete=False) as f:
+        f.write(data)
+        path = f.name
+    try:
+        kind = "RLE" if args.rle else "native"
+        print(f"{args.frames} frame {args.size}x{args.size} {kind}, {len(data) / 2**20:.1f} MB")
+        base = subprocess.run(
+            [sys.executable, "-c", "import pydicom, PIL.Image, core.agent.dicom_utils;"
+             "from benchmarks.bench_dicom_decode import peak_rss_mb; print(peak_rss_mb())"],
+            capture_output=True, text=True, check=True, cwd=os.getcwd(),
+        ).stdout.strip()
+        print(f"  taban RSS (importlar): {float(base):.0f} MB")
+        for mode in ("eski", "yeni"):
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_dicom_decode", "--_run", mode, path],
+                capture_output=True, text=True, check=True, cwd=os.getcwd(),
+            ).stdout.split()
+            print(f"  {mode}: {float(out[0]):8.1f} ms, tepe RSS {out[1]} MB")
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--_run":
+        _run(sys.argv[2], sys.argv[3])
+    else:
+        main()
@@ -0,0 +1,68 @@
+"""
+DICOM normalizasyon benchmark'ı: önceki float64 min-max ile modality LUT +
+VOI pencere (uint16→uint8 tablo ve float32 yolları) karşılaştırması.
+
+Kullanım (uygulama dizininden):
+    python -m benchmarks.bench_dicom_normalize [--frames 3] [--size 512] [--runs 20]
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+from pydicom.dataset import Dataset
+
+from benchmarks.bench_dicom_decode import legacy_normalize_frame
+from core.agent.dicom_utils import normalize_frames
+
+
+def _ds(**tags) -> Dataset:
+    ds = Dataset()
+    ds.PhotometricInterpretation = "MONOCHROME2"
+    for k, v in tags.items():
+        setattr(ds, k, v)
+    return ds
+
+
+def _bench(fn, runs: int) -> float:
+    fn()
+    times = []
+    for _ in range(runs):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=3)
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frames = rng.integers(0, 4096, size=(args.frames, args.size, args.size)).astype(np.uint16)
+    ct = (frames.astype(np.int32) - 1024).astype(np.int16)
+    mp = frames.size / 1e6
+
+    cases = {
+        "onceki min-max (float64)": lambda: [legacy_normalize_frame(f) for f in frames],
+        "LUT, WindowCenter/Width": lambda: normalize_frames(frames, _ds(WindowCenter=2048, WindowWidth=4000)),
+        "LUT, yuzdelik (etiket yok)": lambda: normalize_frames(frames, _ds()),
+        "LUT, int16 + rescale (CT)": lambda: normalize_frames(
+            ct, _ds(RescaleSlope=1, RescaleIntercept=-1024, WindowCenter=40, WindowWidth=400)),
+        "float32, yuzdelik": lambda: normalize_frames(frames.astype(np.float32), _ds()),
+    }
+    print(f"{args.frames} frame {args.size}x{args.size} ({mp:.2f} MP)")
+    for name, fn in cases.items():
+        sec = _bench(fn, args.runs)
+        print(f"  {name:<28} {sec * 1000:7.2f} ms  {mp / sec:8.0f} MP/s")
+    same = np.array_equal(normalize_frames(frames, _ds()), normalize_frames(frames.copy(), _ds()))
+    print(f"  deterministik: {same}")
+
+
+if __name__ == "__main__":
+    main()
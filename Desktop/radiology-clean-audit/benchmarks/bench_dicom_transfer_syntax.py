@@ -0,0 +1,154 @@
+"""
+Transfer syntax × decoder eklentisi benchmark'ı.
+
+Aynı sentetik çok frame'li seri farklı transfer syntax'larla yazılır
+(Explicit VR LE, RLE Lossless, JPEG Baseline, JPEG 2000 Lossless) ve seçili
+frame'ler kurulu her eklentiyle tek thread ve --threads thread'le decode
+edilir. Kurulu olmayan eklentiler "-" olarak gösterilir.
+
+JPEG Lossless / JPEG-LS fixture'ları bu ortamda kodlanamaz (pydicom'un bu
+syntax'lar için kodlayıcısı yok / pyjpegls gerekir); ölçüme girmez.
+
+Kullanım (uygulama dizininden):
+    python -m benchmarks.bench_dicom_transfer_syntax [--frames 64] [--size 512] [--select 20] [--threads 4]
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import time
+
+import numpy as np
+
+PLUGINS = ("pylibjpeg", "gdcm", "pyjpegls", "pillow", "pydicom")
+
+
+def _base_dataset(frames: int, size: int, bits: int):
+    from pydicom.dataset import Dataset, FileMetaDataset
+    from pydicom.uid import ExplicitVRLittleEndian, generate_uid
+
+    meta = FileMetaDataset()
+    meta.MediaStorageSOPClassUID = "1.2.840.10008.5.1.4.1.1.4"
+    meta.MediaStorageSOPInstanceUID = generate_uid()
+    meta.TransferSyntaxUID = ExplicitVRLittleEndian
+    ds = Dataset()
+    ds.file_meta = meta
+    ds.SOPClassUID = meta.MediaStorageSOPClassUID
+    ds.SOPInstanceUID = meta.MediaStorageSOPInstanceUID
+    ds.SeriesInstanceUID = generate_uid()
+    ds.Modality = "MR"
+    ds.NumberOfFrames = frames
+    ds.Rows, ds.Columns = size, size
+    ds.SamplesPerPixel = 1
+    ds.PhotometricInterpretation = "MONOCHROME2"
+    ds.BitsAllocated = 8 if bits == 8 else 16
+    ds.BitsStored, ds.HighBit = bits, bits - 1
+    ds.PixelRepresentation = 0
+    return ds
+
+
+def _volume(frames: int, size: int, bits: int, seed: int = 0) -> np.ndarray:
+    """Gürültülü elips gövde: gerçek MR'a benzer sıkıştırma oranı."""
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:size, 0:size]
+    body = ((yy - size / 2) / 0.8) ** 2 + (xx - size / 2) ** 2 < (size * 0.4) ** 2
+    peak = (1 << bits) - 1
+    vol = np.empty((frames, size, size), dtype=np.uint8 if bits == 8 else np.uint16)
+    for i in range(frames):
+        frame = rng.normal(peak * 0.02, peak * 0.005, (size, size))
+        frame[body] = rng.normal(peak * 0.4, peak * 0.05, body.sum())
+        vol[i] = np.clip(frame, 0, peak)
+    return vol
+
+
+def fixtures(frames: int, size: int) -> dict[str, bytes]:
+    """Kodlanabilen her transfer syntax için bir DICOM dosyası (bytes)."""
+    from PIL import Image
+    from pydicom.encaps import encapsulate
+    from pydicom.uid import JPEG2000Lossless, JPEGBaseline8Bit, RLELossless
+
+    out = {}
+    vol12 = _volume(frames, size, 12)
+    ds = _base_dataset(frames, size, 12)
+    ds.PixelData = vol12.tobytes()
+    out["Explicit VR LE"] = _to_bytes(ds)
+
+    for label, ts in (("RLE Lossless", RLELossless), ("JPEG 2000 Lossless", JPEG2000Lossless)):
+        ds = _base_dataset(frames, size, 12)
+        ds.PixelData = vol12.tobytes()
+        try:
+            ds.compress(ts)
+            out[label] = _to_bytes(ds)
+        except Exception as exc:
+            print(f"  {label}: kodlanamadi ({exc.__class__.__name__})")
+
+    # JPEG Baseline: pydicom kodlayamaz, frame'ler Pillow ile kodlanıp kapsüllenir
+    vol8 = _volume(frames, size, 8)
+    encoded = []
+    for frame in vol8:
+        buf = io.BytesIO()
+        Image.fromarray(frame).save(buf, format="JPEG", quality=90)
+        encoded.append(buf.getvalue())
+    ds = _base_dataset(frames, size, 8)
+    ds.file_meta.TransferSyntaxUID = JPEGBaseline8Bit
+    ds.PixelData = encapsulate(encoded)
+    ds["PixelData"].VR = "OB"
+    out["JPEG Baseline"] = _to_bytes(ds)
+    return out
+
+
+def _to_bytes(ds) -> bytes:
+    buf = io.BytesIO()
+    ds.save_as(buf, enforce_file_format=True)
+    return buf.getvalue()
+
+
+def _best_ms(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, (time.perf_counter() - t) * 1000)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=64)
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--select", type=int, default=20, help="decode edilecek frame sayisi")
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    import pydicom
+    from pydicom.pixels import get_decoder
+
+    from core.agent.dicom_decoders import decode_frames, decode_plan
+    from core.agent.dicom_utils import _select_indices
+
+    indices = _select_indices(args.frames, args.select)
+    print(f"{args.frames} frame {args.size}x{args.size}, {len(indices)} frame decode, {args.threads} thread")
+    print(f"  {'syntax':20s} {'boyut':>8s}  " + "  ".join(f"{p:>17s}" for p in PLUGINS))
+    for label, data in fixtures(args.frames, args.size).items():
+        header = pydicom.dcmread(io.BytesIO(data), stop_before_pixels=True)
+        plan = decode_plan(header)
+        available = get_decoder(plan.transfer_syntax).available_plugins if plan.compressed else {""}
+        cells = []
+        for plugin in PLUGINS:
+            if plan.compressed and plugin not in available:
+                cells.append(f"{'-':>17s}")
+                continue
+            if not plan.compressed and plugin != "pydicom":
+                cells.append(f"{'':>17s}")
+                continue
+            p = plan._replace(plugin=plugin if plan.compressed else "")
+            seq = _best_ms(lambda: decode_frames(io.BytesIO(data), indices, p, threads=1))
+            par = _best_ms(lambda: decode_frames(io.BytesIO(data), indices, p, threads=args.threads))
+            cells.append(f"{seq:7.1f} /{par:7.1f} ms")
+        secili = plan.plugin or "native"
+        print(f"  {label:20s} {len(data) / 1024:6.0f}KB  " + "  ".join(cells) + f"   secilen: {secili}")
+    print("  (hucre: tek thread / cok thread)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Dilim türevi (pyramid) benchmark'ı: tek decode + thumb/medium/full kodlama
+süresi ve seviye başına bayt, WebP ve JPEG için.
+
+İlk gösterim baytı, N dilimlik şeridin thumb'ları + seçili dilimin medium'u;
+karşılaştırma olarak tüm dilimlerin full JPEG'inin base64 (JSON) boyutu
+yazdırılır.
+
+Kullanım (uygulama dizininden):
+    python -m benchmarks.bench_image_pyramid [--size 512] [--slices 40] [--runs 10]
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import os
+import tempfile
+import time
+
+from benchmarks.bench_dicom_decode import synthetic_dicom
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--slices", type=int, default=40)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    from core.agent import image_pyramid
+
+    fd, path = tempfile.mkstemp(suffix=".dcm")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(synthetic_dicom(1, args.size, args.size))
+        formats = ["jpeg"] + (["webp"] if image_pyramid.WEBP_AVAILABLE else [])
+        for fmt in formats:
+            image_pyramid.PYRAMID_FORMAT = fmt
+            image_pyramid.build_pyramid(path, 0)
+            t = time.perf_counter()
+            for _ in range(args.runs):
+                levels = image_pyramid.build_pyramid(path, 0)
+            ms = (time.perf_counter() - t) * 1000 / args.runs
+            sizes = {level: len(data) for level, data in levels.items()}
+            first_paint = args.slices * sizes["thumb"] + sizes["medium"]
+            inline = args.slices * len(base64.b64encode(levels["full"]))
+            print(
+                f"{fmt:5s} build {ms:6.1f} ms/dilim  "
+                + "  ".join(f"{k} {v / 1024:6.1f} KiB" for k, v in sizes.items())
+                + f"  | ilk gosterim ({args.slices} dilim) {first_paint / 1024:7.1f} KiB"
+                + f" vs base64 full {inline / 1024:8.1f} KiB"
+            )
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+PDF render benchmark'ı: derlenmiş şablon + tek geçişli Markdown dönüştürücü
+ile önceki generate_pdf karşılaştırması (~20 KB ajan raporu).
+
+Kullanım (uygulama dizininden):
+    python -m benchmarks.bench_pdf_render [--runs 20] [--kb 20]
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import re
+import statistics
+import time
+
+os.environ.setdefault("AUDIT_SECRET", "benchmark-secret")
+
+from reportlab.lib.colors import HexColor
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.graphics.barcode.qr import QrCodeWidget
+from reportlab.graphics.shapes import Drawing
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+
+from core.export.audit_pack import build_pack
+from core.export.pdf_export import _lirads_color, generate_pdf, pdf_template
+
+_PAGE = re.compile(rb"/Type /Page[^s]")
+
+_SECTION = """## Seri {i}: Dinamik kontrastli MR
+
+Karaciğer sağ lob segment {seg} düzeyinde **{size} mm** boyutunda, arteryel fazda
+belirgin **hiperenhansman** gösteren lezyon izlenmiştir. Portal venöz fazda yıkanma
+ve gecikmiş fazda kapsül görünümü mevcuttur. Çevre parankimde sirotik morfoloji.
+
+- Arteryel faz: **non-rim APHE**
+- Portal faz: yıkanma pozitif
+- Gecikmiş faz: kapsül görünümü
+- Difüzyon kısıtlaması: hafif
+* Yağ içeriği: izlenmedi
+
+**Değerlendirme:** LI-RADS kriterlerine göre **LR-5** ile uyumlu bulgular.
+Önceki tetkikle karşılaştırıldığında boyut artışı saptanmıştır (threshold growth).
+"""
+
+
+def make_report(target_kb: int) -> str:
+    parts = []
+    i = 0
+    while sum(len(p.encode("utf-8")) for p in parts) < target_kb * 1024:
+        parts.append(_SECTION.format(i=i + 1, seg=(i % 8) + 1, size=10 + i % 30))
+        i += 1
+    return "\n".join(parts)
+
+
+def _qr_drawing(data: str, size: float) -> Drawing:
+    widget = QrCodeWidget(data)
+    x0, y0, x1, y1 = widget.getBounds()
+    drawing = Drawing(size, size, transform=[size / (x1 - x0), 0, 0, size / (y1 - y0), 0, 0])
+    drawing.add(widget)
+    return drawing
+
+
+def legacy_generate_pdf(pack) -> bytes:
+    """Önceki generate_pdf (her çağrıda stil kurulumu + satır satır replace döngüsü)."""
+    styles = getSampleStyleSheet()
+
+    # Ek stiller
+    styles.add(ParagraphStyle(
+        "SectionHead",
+        parent=styles["Heading3"],
+        spaceAfter=6,
+        spaceBefore=12,
+        textColor=HexColor("#18181b"),
+    ))
+    styles.add(ParagraphStyle(
+        "ReportBody",
+        parent=styles["Normal"],
+        fontSize=9,
+        leading=13,
+        spaceAfter=4,
+    ))
+    styles.add(ParagraphStyle(
+        "Meta",
+        parent=styles["Normal"],
+        fontSize=7,
+        textColor=HexColor("#a1a1aa"),
+    ))
+
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(buf, pagesize=A4)
+    el = []
+
+    # Baslik
+    el.append(Paragraph("Radiology-Clean Audit Pack", styles["Title"]))
+    el.append(Paragraph(f"Vaka: {pack['case_id']}", styles["Normal"]))
+    el.append(Spacer(1, 0.15 * inch))
+
+    # LI-RADS skoru
+    content = pack.get("content", {})
+    lirads = content.get("lirads", {})
+    decision = content.get("decision", "-")
+    category = lirads.get("category", "")
+    color = _lirads_color(category)
+
+    el.append(Paragraph(
+        f'<font color="{color}" size="14"><b>{decision}</b></font>',
+        styles["Normal"],
+    ))
+    el.append(Spacer(1, 0.1 * inch))
+
+    # Uygulanan kriterler
+    applied = lirads.get("applied_criteria", [])
+    if applied:
+        el.append(Paragraph(
+            f"Uygulanan kriterler: {', '.join(applied)}",
+            styles["Meta"],
+        ))
+
+    hcc_ancillary = lirads.get("ancillary_favor_hcc", [])
+    if hcc_ancillary:
+        el.append(Paragraph(
+            f"HCC lehine yardimci: {', '.join(hcc_ancillary)}",
+            styles["Meta"],
+        ))
+
+    el.append(Spacer(1, 0.15 * inch))
+
+    # Klinik bilgiler
+    clinical = content.get("clinical_data")
+    if clinical:
+        el.append(Paragraph("Klinik Bilgiler", styles["SectionHead"]))
+        parts = []
+        if clinical.get("region"):
+            parts.append(f"Bolge: {clinical['region']}")
+        if clinical.get("age"):
+            parts.append(f"Yas: {clinical['age']}")
+        if clinical.get("gender"):
+            parts.append(f"Cinsiyet: {clinical['gender']}")
+        if clinical.get("indication"):
+            parts.append(f"Endikasyon: {clinical['indication']}")
+        if clinical.get("risk_factors"):
+            parts.append(f"Risk faktorleri: {clinical['risk_factors']}")
+        if parts:
+            el.append(Paragraph(" | ".join(parts), styles["ReportBody"]))
+        el.append(Spacer(1, 0.1 * inch))
+
+    # DSL
+    el.append(Paragraph("DSL Verileri", styles["SectionHead"]))
+    dsl = content.get("dsl", {})
+    el.append(Paragraph(
+        json.dumps(dsl, ensure_ascii=False, indent=2),
+        styles["ReportBody"],
+    ))
+    el.append(Spacer(1, 0.15 * inch))
+
+    # Ajan raporu
+    agent_report = content.get("agent_report")
+    if agent_report:
+        el.append(Paragraph("Radyolog Ajan Raporu", styles["SectionHead"]))
+        # Rapor metnini paragraflara bol
+        for line in agent_report.split("\n"):
+            stripped = line.strip()
+            if not stripped:
+                el.append(Spacer(1, 0.05 * inch))
+                continue
+            if stripped.startswith("## "):
+                el.append(Spacer(1, 0.08 * inch))
+                el.append(Paragraph(
+                    f"<b>{stripped[3:]}</b>",
+                    styles["SectionHead"],
+                ))
+            elif stripped.startswith("**") and stripped.endswith("**"):
+                el.append(Paragraph(
+                    f"<b>{stripped[2:-2]}</b>",
+                    styles["ReportBody"],
+                ))
+            elif stripped.startswith("- ") or stripped.startswith("* "):
+                el.append(Paragraph(
+                    f"&bull; {stripped[2:]}",
+                    styles["ReportBody"],
+                ))
+            else:
+                # Inline bold
+                text = stripped.replace("**", "<b>", 1)
+                while "**" in text:
+                    text = text.replace("**", "</b>", 1)
+                    if "**" in text:
+                        text = text.replace("**", "<b>", 1)
+                el.append(Paragraph(text, styles["ReportBody"]))
+        el.append(Spacer(1, 0.15 * inch))
+
+    # QR kod
+    el.append(_qr_drawing(pack["verify_url"], 1.5 * inch))
+    el.append(Paragraph(pack["verify_url"], styles["Meta"]))
+    el.append(Spacer(1, 0.05 * inch))
+
+    # Imza bilgisi
+    el.append(Paragraph(
+        f"Imza: {pack.get('signature', '-')[:32]}... | "
+        f"v{pack.get('version', 1)} | "
+        f"{pack.get('generated_at', '-')}",
+        styles["Meta"],
+    ))
+
+    doc.build(el)
+    return buf.getvalue()
+
+
+def _bench(fn, pack, runs: int) -> tuple[float, int]:
+    fn(pack)  # ısınma (font/şablon kurulumu)
+    times = []
+    data = b""
+    for _ in range(runs):
+        t = time.perf_counter()
+        data = fn(pack)
+        times.append((time.perf_counter() - t) * 1000)
+    return statistics.median(times), len(_PAGE.findall(data))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--kb", type=int, default=20, help="Ajan raporu boyutu (KB)")
+    args = parser.parse_args()
+
+    pack = build_pack(
+        "BENCH-001",
+        {"lesion_size_mm": 22, "cirrhosis": True, "arterial_phase": {"hyperenhancement": True}},
+        "http://localhost:8000",
+    )
+    pack["content"]["agent_report"] = make_report(args.kb)
+
+    t = time.perf_counter()
+    pdf_template.cache_clear()
+    pdf_template()
+    print(f"sablon kurulumu (surec basina bir kez): {(time.perf_counter() - t) * 1000:.1f} ms")
+    for name, fn in (("onceki", legacy_generate_pdf), ("yeni", generate_pdf)):
+        ms, pages = _bench(fn, pack, args.runs)
+        print(f"{name:>7}: {ms:7.1f} ms / belge, {pages} sayfa, {ms / max(pages, 1):6.1f} ms / sayfa")
+
+
+if __name__ == "__main__":
+    main()
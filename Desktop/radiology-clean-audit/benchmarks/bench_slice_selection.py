@@ -0,0 +1,119 @@
+"""
+Dilim seçici benchmark'ı: eşit aralıklı (uniform) ve içerik duyarlı (content)
+seçim, sentetik bir karaciğer serisi üzerinde.
+
+Seri, dilim başına bir dosyadır; "organ" yalnızca ortadaki dilimlerdedir
+(--organ oranı), üst ve alt dilimler hava + gürültüdür. Her seçici için
+süre, gönderilen görüntü/bayt ve organ içeren görüntü oranı yazdırılır.
+
+Kullanım (uygulama dizininden):
+    python -m benchmarks.bench_slice_selection [--slices 120] [--size 256] [--organ 0.5] [--budget 20]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+
+def synthetic_series(directory: str, slices: int, size: int, organ: float, seed: int = 0) -> tuple[list[str], range]:
+    """Tek seri, dilim başına bir dosya; organ içeren dilim aralığını da döner."""
+    from pydicom.dataset import Dataset, FileMetaDataset
+    from pydicom.uid import ExplicitVRLittleEndian, generate_uid
+
+    rng = np.random.default_rng(seed)
+    first = int(slices * (1 - organ) / 2)
+    organ_range = range(first, first + max(1, int(slices * organ)))
+    yy, xx = np.mgrid[0:size, 0:size]
+    series_uid = generate_uid()
+    paths = []
+    for i in range(slices):
+        pixels = np.clip(rng.normal(20, 8, (size, size)), 0, 4095)
+        if i in organ_range:
+            # Organ kesiti: ortada en geniş, uçlara doğru daralan elips + doku
+            depth = 1 - abs((i - organ_range.start) / len(organ_range) * 2 - 1)
+            radius = size * (0.15 + 0.25 * depth)
+            mask = ((yy - size / 2) / 0.8) ** 2 + (xx - size / 2) ** 2 < radius ** 2
+            pixels[mask] = np.clip(rng.normal(900, 150, mask.sum()), 0, 4095)
+
+        meta = FileMetaDataset()
+        meta.MediaStorageSOPClassUID = "1.2.840.10008.5.1.4.1.1.4"
+        meta.MediaStorageSOPInstanceUID = generate_uid()
+        meta.TransferSyntaxUID = ExplicitVRLittleEndian
+        ds = Dataset()
+        ds.file_meta = meta
+        ds.SOPClassUID = meta.MediaStorageSOPClassUID
+        ds.SOPInstanceUID = meta.MediaStorageSOPInstanceUID
+        ds.SeriesInstanceUID = series_uid
+        ds.SeriesDescription = "T1 portal"
+        ds.Modality = "MR"
+        ds.InstanceNumber = i + 1
+        ds.ImageOrientationPatient = [1, 0, 0, 0, 1, 0]
+        ds.ImagePositionPatient = [0, 0, float(i * 3)]
+        ds.Rows, ds.Columns = size, size
+        ds.SamplesPerPixel = 1
+        ds.PhotometricInterpretation = "MONOCHROME2"
+        ds.BitsAllocated, ds.BitsStored, ds.HighBit = 16, 12, 11
+        ds.PixelRepresentation = 0
+        ds.PixelData = pixels.astype(np.uint16).tobytes()
+        buf = io.BytesIO()
+        ds.save_as(buf, enforce_file_format=True)
+        path = os.path.join(directory, f"{i:04d}.dcm")
+        with open(path, "wb") as f:
+            f.write(buf.getvalue())
+        paths.append(path)
+    return paths, organ_range
+
+
+async def _measure(paths: list[str], organ_range: range, budget: int) -> None:
+    from core.agent import dicom_pool
+
+    await dicom_pool.read_study_headers(paths[:1])  # havuzu ısıt
+    for selector in ("uniform", "content"):
+        best = float("inf")
+        for _ in range(3):
+            t = time.perf_counter()
+            images, plan = await dicom_pool.assemble_study(paths, max_images=budget, selector=selector)
+            best = min(best, (time.perf_counter() - t) * 1000)
+        hits = sum(1 for img in images if img["instance_number"] - 1 in organ_range)
+        print(
+            f"  {selector:8s}: {best:7.1f} ms, {len(images):2d} goruntu, {plan['bytes'] / 1024:6.0f} KB, "
+            f"organ iceren {hits}/{len(images)}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--slices", type=int, default=120)
+    parser.add_argument("--size", type=int, default=256)
+    parser.add_argument("--organ", type=float, default=0.5, help="organ iceren dilim orani")
+    parser.add_argument("--budget", type=int, default=20)
+    args = parser.parse_args()
+
+    from core.agent import dicom_pool
+    from core.agent.slice_selection import THUMB_SIDE, slice_scores
+
+    directory = tempfile.mkdtemp(prefix="bench_slices_")
+    try:
+        paths, organ_range = synthetic_series(directory, args.slices, args.size, args.organ)
+        print(f"{args.slices} dilim {args.size}x{args.size}, organ {organ_range.start}-{organ_range.stop - 1}, butce {args.budget}")
+
+        vol = np.random.default_rng(1).normal(0, 1, (args.slices, THUMB_SIDE, THUMB_SIDE)).astype(np.float32)
+        t = time.perf_counter()
+        slice_scores(vol)
+        print(f"  skor hesabi: {(time.perf_counter() - t) * 1e6 / args.slices:.1f} us/dilim")
+
+        asyncio.run(_measure(paths, organ_range, args.budget))
+    finally:
+        dicom_pool.shutdown()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+ZIP / DICOMDIR arşivinden akışla çalışma alımı.
+
+İstek gövdesi (application/zip) yüklenirken üyeler sırayla açılır ve diske
+yazılır (bkz. core.zip_stream); her üyenin başlığı havuzda okunurken akış
+devam eder, böylece başlık okuma yüklemeyle örtüşür. Bellekte aynı anda en
+fazla bir üyenin bir parçası bulunur.
+
+DICOMDIR varsa yalnızca IMAGE kayıtlarının işaret ettiği dosyalar işlenir;
+rapor, görüntüleyici programı, önizleme vb. üyeler diske yazılmadan ve
+açılmadan atlanır. DICOMDIR görüntülerden sonra gelirse önceden yazılmış
+ama işaret edilmeyen üyeler sonuçtan çıkarılır. Klasör yüklemesinde
+(dosya adları göreli yol) aynı seçim dicomdir_members ile yapılır.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import posixpath
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import NamedTuple
+
+from fastapi import HTTPException
+
+from core.agent import dicom_pool
+from core.agent.dicom_utils import read_dicomdir
+from core.uploads import DICOM_MAX_ARCHIVE_MB, DICOM_MAX_FILE_MB, SpooledFile, spool_chunks
+from core.zip_stream import ZipSizeLimitError, iter_zip
+
+logger = logging.getLogger(__name__)
+
+DICOMDIR = "DICOMDIR"
+
+
+class ArchiveStudy(NamedTuple):
+    files: list[tuple[str, str, dict]]  # (yol, sha256, başlık) — create_study girdisi
+    members: int  # arşivdeki dosya üyesi sayısı (DICOMDIR dahil)
+
+
+def _normalize(name: str) -> str:
+    name = posixpath.normpath(name.replace("\\", "/")).lstrip("/")
+    return "" if name == "." else name.upper()
+
+
+def _is_dicomdir(name: str) -> bool:
+    return posixpath.basename(_normalize(name)) == DICOMDIR
+
+
+async def _referenced(dicomdir: SpooledFile) -> set[str] | None:
+    """DICOMDIR'in işaret ettiği dosyaların arşiv içindeki normalize yolları."""
+    paths = await asyncio.to_thread(read_dicomdir, dicomdir.path)
+    if paths is None:
+        return None
+    base = posixpath.dirname(_normalize(dicomdir.filename))
+    return {_normalize(posixpath.join(base, p)) for p in paths}
+
+
+async def dicomdir_members(files: list[SpooledFile]) -> list[SpooledFile]:
+    """
+    Yüklenen dosyalar arasında DICOMDIR varsa yalnızca işaret ettiği dosyalar;
+    yoksa (veya okunamazsa) DICOMDIR dışındaki tüm dosyalar.
+    """
+    referenced: set[str] | None = None
+    for f in files:
+        if _is_dicomdir(f.filename):
+            refs = await _referenced(f)
+            if refs is not None:
+                referenced = (referenced or set()) | refs
+    return [
+        f for f in files
+        if not _is_dicomdir(f.filename) and (referenced is None or _normalize(f.filename) in referenced)
+    ]
+
+
+@asynccontextmanager
+async def spooled_archive(
+    chunks: AsyncIterator[bytes],
+    max_file_bytes: int = DICOM_MAX_FILE_MB * 1024 * 1024,
+    max_total_bytes: int = DICOM_MAX_ARCHIVE_MB * 1024 * 1024,
+):
+    """
+    ZIP akışını üye üye diske yazar, başlıkları yükleme sürerken okur ve
+    ArchiveStudy verir; çıkışta yazılan dosyalar silinir (create_study
+    sakladıklarını zaten taşımıştır). Geçersiz ZIP'te ZipStreamError.
+
+    max_total_bytes atlanan üyeler dahil tüm arşivin açılmış boyutuna uygulanır.
+    """
+    files: list[SpooledFile] = []
+    reads: list[asyncio.Future] = []
+    referenced: set[str] | None = None
+    members = 0
+    try:
+        try:
+            async for entry in iter_zip(chunks, max_unpacked=max_total_bytes):
+                if entry.is_dir:
+                    continue
+                members += 1
+                if _is_dicomdir(entry.name):
+                    dicomdir = await spool_chunks(entry.name, entry.data(), max_file_bytes)
+                    try:
+                        refs = await _referenced(dicomdir)
+                    finally:
+                        os.unlink(dicomdir.path)
+                    if refs is not None:
+                        referenced = (referenced or set()) | refs
+                    continue
+                if referenced is not None and _normalize(entry.name) not in referenced:
+                    continue  # iter_zip okunmayan üyeyi açmadan atlar
+
+                f = await spool_chunks(entry.name, entry.data(), max_file_bytes)
+                files.append(f)
+                reads.append(asyncio.ensure_future(dicom_pool.read_study_headers([f.path])))
+        except ZipSizeLimitError:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Arsiv acilmis boyut siniri ({max_total_bytes // (1024 * 1024)} MB) asildi",
+            ) from None
+
+        headers = [h for chunk in await asyncio.gather(*reads) for h in chunk]
+        valid = [
+            (f.path, f.sha256, h) for f, h in zip(files, headers)
+            if h is not None and (referenced is None or _normalize(f.filename) in referenced)
+        ]
+        logger.info("ZIP arsivi: %d uye, %d goruntu, DICOMDIR %s", members, len(valid), "var" if referenced is not None else "yok")
+        yield ArchiveStudy(valid, members)
+    finally:
+        for read in reads:
+            read.cancel()
+        await asyncio.gather(*reads, return_exceptions=True)
+        for f in files:
+            try:
+                os.unlink(f.path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,79 @@
+"""
+İşlenmiş DICOM görüntüleri için içerik adresli disk önbelleği.
+
+Anahtar: DICOM baytlarının SHA-256'sı + işleme parametreleri
+(processing_params: max_slices / seçili frame'ler, kodlama (format, kenar, kalite), pencereleme).
+Değer: extract_images_from_dicom çıktısı (base64 JPEG + metadata), JSON.
+Aynı çalışma klinik form düzenlenip yeniden analiz edildiğinde decode,
+normalizasyon ve JPEG kodlama tamamen atlanır.
+
+Kayıtlı çalışmalar (bkz. store/study_store) için birleştirilmiş sonucun
+tamamı (görüntüler + plan) da tek kayıt olarak saklanır: study_key.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from collections.abc import Sequence
+
+from core.agent.dicom_utils import ImageEncoding, processing_params
+from core.disk_cache import DiskLRUCache
+
+logger = logging.getLogger(__name__)
+
+DICOM_CACHE_DIR = os.getenv("DICOM_CACHE_DIR", os.path.join(tempfile.gettempdir(), "radiology_dicom_cache"))
+DICOM_CACHE_MAX_MB = int(os.getenv("DICOM_CACHE_MAX_MB", "512"))
+
+dicom_cache = DiskLRUCache(DICOM_CACHE_DIR, DICOM_CACHE_MAX_MB * 1024 * 1024, suffix=".json")
+
+
+def cache_key(
+    content_sha256: str,
+    max_slices: int,
+    frames: Sequence[int] | None = None,
+    encoding: ImageEncoding | None = None,
+) -> str:
+    params = json.dumps(processing_params(max_slices, frames, encoding), sort_keys=True)
+    return hashlib.sha256(f"{content_sha256}:{params}".encode("utf-8")).hexdigest()
+
+
+def get_images(key: str) -> list[dict] | None:
+    path = dicom_cache.get(key)
+    if path is None:
+        return None
+    try:
+        with open(path, "rb") as f:
+            return json.loads(f.read())
+    except (OSError, ValueError):
+        # Eviction ile yarış veya bozuk kayıt: ıska say
+        logger.warning("DICOM onbellek kaydi okunamadi: %s", key)
+        return None
+
+
+def put_images(key: str, images: list[dict]) -> None:
+    if not images:
+        return  # okunamayan dosyalar önbelleğe alınmaz
+    dicom_cache.put_bytes(key, json.dumps(images, ensure_ascii=False).encode("utf-8"))
+
+
+def study_key(digests: Sequence[str], params: dict) -> str:
+    """Çalışma düzeyi anahtar: yükleme sırasındaki dosya hash'leri + birleştirme parametreleri."""
+    payload = json.dumps(
+        {"files": list(digests), "params": params, "processing": processing_params(0)}, sort_keys=True,
+    )
+    return hashlib.sha256(f"study:{payload}".encode("utf-8")).hexdigest()
+
+
+def get_study(key: str) -> dict | None:
+    """{"images": [...], "plan": {...}} veya ıska."""
+    cached = get_images(key)
+    return cached if isinstance(cached, dict) else None
+
+
+def put_study(key: str, images: list[dict], plan: dict) -> None:
+    if not images:
+        return
+    dicom_cache.put_bytes(key, json.dumps({"images": images, "plan": plan}, ensure_ascii=False).encode("utf-8"))
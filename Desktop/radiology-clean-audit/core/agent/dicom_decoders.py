@@ -0,0 +1,188 @@
+"""
+Transfer syntax tespiti ve decoder eklentisi seçimi.
+
+Klinik arşivler JPEG Lossless, JPEG-LS, JPEG 2000 ve RLE kapsüllenmiş piksel
+verisi gönderir. pydicom her transfer syntax için birden çok eklentiyle
+(pylibjpeg, gdcm, pillow, pyjpegls, pydicom) decode edebilir; hangisinin
+kullanılacağı kurulu paketlere bağlıdır ve bazı syntax'lar (ör. JPEG
+Lossless SV1) hiçbir ek paket olmadan decode edilemez.
+
+- Transfer syntax piksel verisine dokunmadan başlıktan okunur; desteklenmiyorsa
+  decode denenmez, eksik paketler loglanır.
+- Eklenti DICOM_DECODER_PLUGINS sırasındaki ilk kurulu eklentidir; ayar
+  boşsa C tabanlı pylibjpeg/gdcm önce, saf Python pydicom RLE en son denenir
+  (JPEG Baseline'da Pillow önce). Sıra benchmarks/bench_dicom_transfer_syntax
+  ölçümlerine dayanır.
+- Kapsüllenmiş çok frame'li veride seçili frame'ler DICOM_DECODE_THREADS
+  thread'e paylaştırılır (C decoder'lar GIL'i bırakır); her thread kendi
+  dosya nesnesiyle yalnızca kendi frame'lerinin parçalarını okur.
+"""
+from __future__ import annotations
+
+import io
+import logging
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    from pydicom.pixels import get_decoder, iter_pixels
+    from pydicom.uid import ImplicitVRLittleEndian, UID
+    PYDICOM_AVAILABLE = True
+except ImportError:
+    PYDICOM_AVAILABLE = False
+
+# Eklenti tercih sırası; boşsa transfer syntax'a göre ölçülmüş varsayılan sıra
+DICOM_DECODER_PLUGINS = [p.strip() for p in os.getenv("DICOM_DECODER_PLUGINS", "").split(",") if p.strip()]
+DEFAULT_PLUGIN_ORDER = ("pylibjpeg", "gdcm", "pyjpegls", "pillow", "pydicom")
+# JPEG Baseline'da Pillow (libjpeg-turbo) pylibjpeg'den ~4 kat hızlı
+PLUGIN_ORDER_BY_SYNTAX = {
+    "1.2.840.10008.1.2.4.50": ("pillow", "pylibjpeg", "gdcm"),
+}
+DICOM_DECODE_THREADS = int(os.getenv("DICOM_DECODE_THREADS", str(min(4, os.cpu_count() or 1))))
+
+
+class UnsupportedTransferSyntax(Exception):
+    """Transfer syntax için kurulu decoder eklentisi yok."""
+
+
+class DecodePlan(NamedTuple):
+    transfer_syntax: str
+    name: str
+    compressed: bool
+    plugin: str  # "" = sıkıştırılmamış veya pydicom'un kendi seçimi
+
+
+def transfer_syntax(ds) -> "UID":
+    meta = getattr(ds, "file_meta", None)
+    return UID(getattr(meta, "TransferSyntaxUID", None) or ImplicitVRLittleEndian)
+
+
+@lru_cache(maxsize=64)
+def _plan_for(uid: str) -> DecodePlan:
+    ts = UID(uid)
+    if not ts.is_compressed:
+        return DecodePlan(str(ts), ts.name, False, "")
+    decoder = get_decoder(ts)  # bilinmeyen syntax'ta NotImplementedError
+    available = decoder.available_plugins
+    order = DICOM_DECODER_PLUGINS or PLUGIN_ORDER_BY_SYNTAX.get(str(ts), DEFAULT_PLUGIN_ORDER)
+    for plugin in order:
+        if plugin in available:
+            return DecodePlan(str(ts), ts.name, True, plugin)
+    if available:
+        return DecodePlan(str(ts), ts.name, True, "")
+    missing = "; ".join(decoder.missing_dependencies) or "bilinmiyor"
+    raise UnsupportedTransferSyntax(f"{ts.name} ({ts}) icin decoder yok. Gerekli: {missing}")
+
+
+def decode_plan(ds) -> DecodePlan:
+    """Başlıktan (stop_before_pixels) transfer syntax ve eklenti seçimi."""
+    try:
+        return _plan_for(str(transfer_syntax(ds)))
+    except NotImplementedError as exc:
+        raise UnsupportedTransferSyntax(str(exc)) from exc
+
+
+def available_plugins() -> dict[str, list[str]]:
+    """Sık görülen transfer syntax'lar için kurulu eklentiler (metrikler için)."""
+    from pydicom.uid import (
+        HTJ2KLossless,
+        JPEG2000,
+        JPEG2000Lossless,
+        JPEGBaseline8Bit,
+        JPEGExtended12Bit,
+        JPEGLosslessSV1,
+        JPEGLSLossless,
+        RLELossless,
+    )
+
+    out = {}
+    for ts in (RLELossless, JPEGBaseline8Bit, JPEGExtended12Bit, JPEGLosslessSV1,
+               JPEGLSLossless, JPEG2000Lossless, JPEG2000, HTJ2KLossless):
+        out[ts.name] = sorted(get_decoder(ts).available_plugins)
+    return out
+
+
+class _ViewReader(io.RawIOBase):
+    """Paylaşılan bellek (mmap) üstünde kopyasız, kendi konumu olan okuyucu."""
+
+    def __init__(self, buffer):
+        super().__init__()
+        self._view = memoryview(buffer)
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = max(min(len(b), len(self._view) - self._pos), 0)
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = max(base + offset, 0)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def close(self) -> None:
+        # Görünüm bırakılmazsa mmap kapatılamaz (BufferError)
+        self._view.release()
+        super().close()
+
+
+def _can_share(src) -> bool:
+    return isinstance(src, (str, os.PathLike, io.BytesIO, mmap.mmap)) or (
+        isinstance(getattr(src, "name", None), str) and os.path.isfile(src.name)
+    )
+
+
+@contextmanager
+def _reader(src):
+    """Thread başına ayrı kaynak: dosya konumu thread'ler arasında paylaşılamaz."""
+    if isinstance(src, (str, os.PathLike)):
+        yield src
+    elif isinstance(src, io.BytesIO):
+        yield io.BytesIO(src.getvalue())  # kopyalamaz, aynı bayt nesnesini paylaşır
+    elif isinstance(src, mmap.mmap):
+        with _ViewReader(src) as view:
+            yield view
+    else:
+        yield src.name
+
+
+def decode_frames(src, indices: list[int], plan: DecodePlan, threads: int | None = None) -> np.ndarray:
+    """
+    src (yol, mmap veya okunabilir dosya nesnesi, başa sarılmış) içinden
+    seçili frame'leri (k, satır, sütun[, kanal]) dizisi olarak decode eder.
+    """
+    workers = min(DICOM_DECODE_THREADS if threads is None else threads, len(indices))
+    if not plan.compressed or workers <= 1 or not _can_share(src):
+        return np.stack(list(iter_pixels(src, indices=indices, decoding_plugin=plan.plugin)))
+
+    # Kapsüllenmiş veri: frame'ler thread'lere dağıtılır, iter_pixels yalnızca
+    # istenen frame'lerin parçalarını okur (dosyanın tamamı belleğe alınmaz)
+    parts = [indices[w::workers] for w in range(workers)]
+
+    def _part(part: list[int]) -> list[np.ndarray]:
+        with _reader(src) as reader:
+            return list(iter_pixels(reader, indices=part, decoding_plugin=plan.plugin))
+
+    out: list[np.ndarray] = [None] * len(indices)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for w, frames in enumerate(pool.map(_part, parts)):
+            out[w::workers] = frames
+    return np.stack(out)
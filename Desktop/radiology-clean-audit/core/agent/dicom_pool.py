@@ -0,0 +1,392 @@
+"""
+DICOM işleme için event loop dışı süreç havuzu.
+
+Decode, normalizasyon ve JPEG kodlama CPU yoğundur; async endpoint içinde
+senkron çalıştığında aynı worker'daki tüm SSE akışlarını durdurur. Her dosya
+havuzda ayrı bir iş olarak işlenir ve sonuçlar asyncio ile toplanır.
+
+- İstek başına en fazla DICOM_REQUEST_CONCURRENCY dosya aynı anda işlenir.
+- Görüntüler seri ve anatomik dilim sırasındadır (bkz. dicom_study).
+- DICOM_WORKERS=0: süreç havuzu yerine thread'de çalışır (yine loop dışı).
+- assemble_study: önce yalnızca başlıklar okunur, bütçe seriler arasında
+  paylaştırılır (bkz. dicom_study), aday dilimlerin önizlemelerinden
+  seçici en bilgili dilimleri seçer (bkz. slice_selection) ve sadece
+  seçilen dilimler decode edilir.
+- digests verilirse sonuçlar içerik hash'iyle önbellekten okunur/yazılır
+  (bkz. dicom_cache); isabet eden dosya havuza hiç gönderilmez.
+- assemble_stored_study: kayıtlı çalışmada başlıklar veritabanından gelir ve
+  birleştirilmiş sonucun tamamı önbelleklenir; yeniden analiz dosya açmaz.
+- slice_pyramid: görüntüleyici için dilim türevleri (bkz. image_pyramid);
+  aynı dilime eşzamanlı istekler tek üretimi bekler.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from typing import NamedTuple
+
+from core.agent.dicom_cache import cache_key, get_images, get_study, put_images, put_study, study_key
+from core.agent.dicom_study import SeriesPlan, frames_by_file, plan_study
+from core.agent.dicom_utils import (
+    DICOM_DEDUP_DISTANCE,
+    ImageEncoding,
+    dedupe_images,
+    extract_images_from_dicom,
+    read_headers,
+    read_thumbnails,
+)
+from core.agent.image_pyramid import build_pyramid, get_level, put_levels
+from core.agent.image_budget import (
+    VISION_BYTE_BUDGET_MB,
+    VISION_IMAGE_FORMAT,
+    VISION_MIN_IMAGE_SIDE,
+    VISION_TOKEN_BUDGET,
+    encoded_size,
+    enforce_byte_budget,
+    plan_images,
+)
+from core.agent.montage import LAYOUTS, MONTAGE_COLUMNS, MONTAGE_ROWS, build_montage, montage_size
+from core.agent.slice_selection import (
+    DICOM_SELECT_OVERSAMPLE,
+    DICOM_SLICE_SELECTOR,
+    SLICE_MIN_FOREGROUND,
+    THUMB_SIDE,
+    get_selector,
+)
+
+logger = logging.getLogger(__name__)
+
+DICOM_WORKERS = int(os.getenv("DICOM_WORKERS", str(min(4, os.cpu_count() or 1))))
+DICOM_REQUEST_CONCURRENCY = int(os.getenv("DICOM_REQUEST_CONCURRENCY", "4"))
+# İstek başına modele gönderilen en fazla görüntü (tüm serilere paylaştırılır;
+# asıl sınır token/bayt bütçesidir, bkz. image_budget)
+DICOM_MAX_IMAGES = int(os.getenv("DICOM_MAX_IMAGES", "20"))
+# Başlık okuma havuza bu boyutta partiler halinde gönderilir (dosya başına iş çok küçük)
+DICOM_HEADER_BATCH = int(os.getenv("DICOM_HEADER_BATCH", "64"))
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=DICOM_WORKERS, mp_context=get_context("spawn"))
+            logger.info("DICOM isleme havuzu baslatildi (%d isci)", DICOM_WORKERS)
+        return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def _run(func, *args):
+    if DICOM_WORKERS <= 0:
+        return await asyncio.to_thread(func, *args)
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_pool(), func, *args)
+    except BrokenProcessPool:
+        # Bir işçi çöktüyse (ör. bozuk dosyada segfault) havuzu yenile, bir kez daha dene
+        logger.warning("DICOM isleme havuzu coktu, yeniden baslatiliyor")
+        _reset_pool()
+        return await loop.run_in_executor(_get_pool(), func, *args)
+
+
+class _Extractor:
+    """İstek başına eşzamanlılık sınırı + içerik önbelleği ile dosya işleme."""
+
+    def __init__(self, concurrency: int, digests: list[str] | None):
+        self.semaphore = asyncio.Semaphore(max(1, concurrency))
+        self.digests = digests
+        self.hits = 0
+
+    async def __call__(
+        self,
+        idx: int,
+        path: str,
+        max_slices: int,
+        frames: list[int] | None = None,
+        encoding: ImageEncoding | None = None,
+    ) -> list[dict]:
+        key = cache_key(self.digests[idx], max_slices, frames, encoding) if self.digests else None
+        if key is not None:
+            cached = await asyncio.to_thread(get_images, key)
+            if cached is not None:
+                self.hits += 1
+                return cached
+        async with self.semaphore:
+            images = await _run(extract_images_from_dicom, path, max_slices, frames, encoding)
+        if key is not None:
+            await asyncio.to_thread(put_images, key, images)
+        return images
+
+    async def montage(
+        self,
+        paths: list[str],
+        slots: list[tuple[int, int]],
+        labels: list[str],
+        encoding: ImageEncoding,
+    ) -> dict | None:
+        """slots: (dosya index'i, frame) listesi; karolar farklı dosyalardan gelebilir."""
+        key = None
+        if self.digests:
+            parts = [f"{self.digests[i]}:{frame}" for i, frame in slots]
+            combined = hashlib.sha256(
+                f"montage:{MONTAGE_COLUMNS}:{'|'.join(parts)}:{'|'.join(labels)}".encode("utf-8"),
+            ).hexdigest()
+            key = cache_key(combined, len(slots), encoding=encoding)
+            cached = await asyncio.to_thread(get_images, key)
+            if cached:
+                self.hits += 1
+                return cached[0]
+        async with self.semaphore:
+            image = await _run(
+                build_montage, [(paths[i], frame) for i, frame in slots], labels, MONTAGE_COLUMNS, encoding,
+            )
+        if key is not None and image is not None:
+            await asyncio.to_thread(put_images, key, [image])
+        return image
+
+
+async def _select_by_content(paths: list[str], plans: list[SeriesPlan], selector) -> list[SeriesPlan]:
+    """Aday dilimlerin önizlemelerini havuzda okur; her seride seçiciyle payı kadar dilim bırakır."""
+    wanted = list(frames_by_file([p for p in plans if len(p.slices) > p.quota]).items())
+    if not wanted:
+        return plans
+    batch = max(1, DICOM_HEADER_BATCH)
+    chunks = await asyncio.gather(*(
+        _run(read_thumbnails, [(paths[idx], frames) for idx, frames in wanted[i:i + batch]], THUMB_SIDE)
+        for i in range(0, len(wanted), batch)
+    ))
+    thumbs = {
+        (idx, frame): thumb
+        for (idx, frames), file_thumbs in zip(wanted, (t for chunk in chunks for t in chunk))
+        for frame, thumb in zip(frames, file_thumbs)
+    }
+
+    refined = []
+    for plan in plans:
+        if len(plan.slices) <= plan.quota:
+            refined.append(plan)
+            continue
+        series_thumbs = [thumbs.get((f, fr)) for _, f, fr in plan.slices]
+        if any(t is None for t in series_thumbs):
+            keep = get_selector("uniform")(series_thumbs, plan.quota)
+        else:
+            keep = selector(series_thumbs, plan.quota)
+        refined.append(plan._replace(slices=[plan.slices[i] for i in keep]))
+    return refined
+
+
+async def _assemble_single(
+    extract: _Extractor,
+    paths: list[str],
+    plans: list[SeriesPlan],
+    wanted: dict[int, list[int]],
+    encoding: ImageEncoding,
+) -> list[dict]:
+    results = await asyncio.gather(*(
+        extract(idx, paths[idx], len(frames), frames, encoding) for idx, frames in wanted.items()
+    ))
+    by_slot = {
+        (idx, img["frame_index"]): img
+        for idx, images in zip(wanted, results)
+        for img in images
+    }
+    images = []
+    for plan in plans:
+        for pos, file_idx, frame in plan.slices:
+            img = by_slot.get((file_idx, frame))
+            if img is not None:
+                images.append({**img, "slice_info": f"{pos + 1}/{plan.total}", "file_index": file_idx})
+    return images
+
+
+async def _assemble_montages(
+    extract: _Extractor,
+    paths: list[str],
+    plans: list[SeriesPlan],
+    group: int,
+    encoding: ImageEncoding,
+) -> list[dict]:
+    jobs = []
+    for plan in plans:
+        for i in range(0, len(plan.slices), group):
+            tile = plan.slices[i:i + group]
+            jobs.append(extract.montage(
+                paths,
+                [(file_idx, frame) for _, file_idx, frame in tile],
+                [f"{pos + 1}/{plan.total}" for pos, _, _ in tile],
+                encoding,
+            ))
+    return [img for img in await asyncio.gather(*jobs) if img is not None]
+
+
+class StudyImages(NamedTuple):
+    images: list[dict]
+    plan: dict  # image_budget.ImagePlan.as_dict() + gerçekleşen sayı/boyut
+
+
+async def read_study_headers(paths: list[str]) -> list[dict | None]:
+    """Başlıkları havuzda DICOM_HEADER_BATCH'lik partiler halinde okur (yükleme sırasında)."""
+    batch = max(1, DICOM_HEADER_BATCH)
+    chunks = await asyncio.gather(*(
+        _run(read_headers, paths[i:i + batch]) for i in range(0, len(paths), batch)
+    ))
+    return [h for chunk in chunks for h in chunk]
+
+
+async def assemble_study(
+    paths: list[str],
+    max_images: int = DICOM_MAX_IMAGES,
+    concurrency: int = DICOM_REQUEST_CONCURRENCY,
+    digests: list[str] | None = None,
+    token_budget: int = VISION_TOKEN_BUDGET,
+    byte_budget: int = int(VISION_BYTE_BUDGET_MB * 1024 * 1024),
+    selector: str = DICOM_SLICE_SELECTOR,
+    dedup_distance: int = DICOM_DEDUP_DISTANCE,
+    layout: str = "single",
+    headers: list[dict | None] | None = None,
+) -> StudyImages:
+    """
+    Çalışmayı seri bazında birleştirir: görüntü sayısı, boyutu ve kodlaması
+    token/bayt bütçesine göre planlanır; dilimler seriler arasında
+    paylaştırılır ve her seride anatomik sıradadır.
+
+    slice_info serideki konumu gösterir ("12/88"). dHash'i daha önce seçilmiş
+    bir görüntüye dedup_distance kadar yakın olanlar gönderilmez.
+
+    layout="montage": her görüntü bir serinin MONTAGE_COLUMNS×MONTAGE_ROWS
+    ardışık seçili diliminden oluşan ızgaradır (bkz. montage); bütçe karo
+    sayısı olarak uygulanır.
+
+    headers (paths ile aynı sırada read_header çıktıları) verilirse başlıklar
+    yeniden okunmaz.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Bilinmeyen yerlesim: {layout} (secenekler: {', '.join(LAYOUTS)})")
+    select = get_selector(selector)
+    group = montage_size() if layout == "montage" else 1
+    if headers is None:
+        headers = await read_study_headers(paths)
+    sizes = [(h["columns"], h["rows"]) for h in headers if h is not None for _ in range(h["frames"])]
+    if group > 1:
+        # Montaj: her aday görüntü group dilimlik bir ızgara
+        sizes = [(w * MONTAGE_COLUMNS, h * MONTAGE_ROWS) for w, h in sizes[::group]]
+    budget = plan_images(sizes, max_images, token_budget, byte_budget)
+    oversample = 1 if selector == "uniform" else DICOM_SELECT_OVERSAMPLE
+    plans = plan_study(headers, budget.count, oversample, group)
+    if oversample > 1:
+        plans = await _select_by_content(paths, plans, select)
+    wanted = frames_by_file(plans)
+
+    extract = _Extractor(concurrency, digests)
+    if group > 1:
+        images = await _assemble_montages(extract, paths, plans, group, budget.encoding)
+    else:
+        images = await _assemble_single(extract, paths, plans, wanted, budget.encoding)
+    images, duplicates = dedupe_images(images, dedup_distance)
+    images = enforce_byte_budget(images, byte_budget)
+    summary = {
+        **budget.as_dict(),
+        "layout": layout,
+        "slices": sum(img.get("montage", 1) for img in images),
+        "selector": selector,
+        "duplicates_removed": duplicates,
+        "sent": len(images),
+        "bytes": sum(encoded_size(img) for img in images),
+    }
+    logger.info(
+        "Calisma: %d dosya, %d seri, %d dosya decode edildi, %d goruntu (%d kopya atildi), %d bayt, ~%d token "
+        "(onbellek isabeti: %d)",
+        len(paths), len(plans), len(wanted), len(images), duplicates, summary["bytes"],
+        len(images) * budget.tokens_per_image, extract.hits,
+    )
+    return StudyImages(images, summary)
+
+
+async def assemble_stored_study(
+    instances: list[dict],
+    layout: str = "single",
+    max_images: int = DICOM_MAX_IMAGES,
+) -> StudyImages:
+    """
+    Kayıtlı çalışma (study_store.get_study_instances çıktısı) için assemble_study.
+
+    Sonuç dosya hash'leri + tüm birleştirme parametreleriyle anahtarlanır;
+    klinik form düzenlenip yeniden analiz edildiğinde başlık okuma, önizleme
+    ve decode tamamen atlanır.
+    """
+    digests = [inst["sha256"] for inst in instances]
+    key = study_key(digests, {
+        "layout": layout,
+        "max_images": max_images,
+        "token_budget": VISION_TOKEN_BUDGET,
+        "byte_budget": VISION_BYTE_BUDGET_MB,
+        "image_format": VISION_IMAGE_FORMAT,
+        "min_side": VISION_MIN_IMAGE_SIDE,
+        "selector": DICOM_SLICE_SELECTOR,
+        "oversample": DICOM_SELECT_OVERSAMPLE,
+        "min_foreground": SLICE_MIN_FOREGROUND,
+        "dedup_distance": DICOM_DEDUP_DISTANCE,
+        "montage": [MONTAGE_COLUMNS, MONTAGE_ROWS],
+    })
+    cached = await asyncio.to_thread(get_study, key)
+    if cached is not None:
+        logger.info("Calisma onbellekten: %d goruntu", len(cached["images"]))
+        return StudyImages(cached["images"], cached["plan"])
+    result = await assemble_study(
+        [inst["path"] for inst in instances],
+        max_images=max_images,
+        digests=digests,
+        layout=layout,
+        headers=[inst["header"] for inst in instances],
+    )
+    await asyncio.to_thread(put_study, key, result.images, result.plan)
+    return result
+
+
+_pyramid_builds: dict[tuple[str, int], asyncio.Task] = {}
+
+
+async def _build_pyramid(path: str, content_sha256: str, frame: int) -> None:
+    levels = await _run(build_pyramid, path, frame)
+    await asyncio.to_thread(put_levels, content_sha256, frame, levels)
+
+
+async def slice_pyramid(path: str, content_sha256: str, frame: int, level: str) -> str | None:
+    """
+    Dilim türevinin önbellekteki yolu. Yoksa frame bir kez decode edilip tüm
+    seviyeler üretilir; okunamayan dosyada None.
+    """
+    cached = await asyncio.to_thread(get_level, content_sha256, frame, level)
+    if cached is not None:
+        return cached
+    slot = (content_sha256, frame)
+    task = _pyramid_builds.get(slot)
+    if task is None or task.get_loop() is not asyncio.get_running_loop():
+        task = asyncio.ensure_future(_build_pyramid(path, content_sha256, frame))
+        _pyramid_builds[slot] = task
+        task.add_done_callback(lambda t: _pyramid_builds.pop(slot) if _pyramid_builds.get(slot) is t else None)
+    try:
+        await asyncio.shield(task)
+    except Exception as exc:
+        logger.error("Dilim turevi uretilemedi: %s", exc)
+        return None
+    return await asyncio.to_thread(get_level, content_sha256, frame, level)
+
+
+def shutdown() -> None:
+    _reset_pool()
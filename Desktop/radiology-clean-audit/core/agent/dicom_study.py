@@ -0,0 +1,115 @@
+"""
+Çok dosyalı çalışmalarda seri bazlı dilim seçimi.
+
+MR export'ları çoğunlukla dilim başına bir dosyadır. Dosyalar tek tek
+işlenip ilk N görüntü alınırsa model yalnızca yükleme sırasındaki ilk
+dosyaları görür. Burada:
+
+1. Başlıklar (piksel olmadan) SeriesInstanceUID'e göre gruplanır.
+2. Seri içinde dilimler ImagePositionPatient (dilim normali üzerindeki
+   izdüşüm), yoksa InstanceNumber, o da yoksa yükleme sırasına dizilir;
+   çok frame'li dosyalar frame başına birer dilim sayılır.
+3. Görüntü bütçesi seriler arasında paylaştırılır (küçük seriler tamamını
+   alır, artan bütçe diğerlerine eşit dağılır) ve her seride dilimler eşit
+   aralıklı seçilir.
+
+Sonuç dosya başına decode edilecek frame listesidir; seçilmeyen dosyaların
+piksel verisi hiç okunmaz.
+"""
+from __future__ import annotations
+
+from typing import NamedTuple
+
+from core.agent.dicom_utils import _select_indices
+
+
+class SeriesPlan(NamedTuple):
+    series_uid: str
+    description: str
+    total: int                          # serideki dilim sayısı
+    slices: list[tuple[int, int, int]]  # (serideki sıra, dosya index'i, frame index'i)
+    quota: int                          # bütçeden düşen pay; slices aday ise daha uzun olabilir
+
+
+def allocate_budget(sizes: list[int], budget: int) -> list[int]:
+    """
+    Bütçeyi seri boyutlarına göre paylaştırır (su doldurma).
+
+    Payından küçük seriler tamamını alır; kalan bütçe diğerlerine eşit
+    bölünür, artan birimler yükleme sırasında önce gelen serilere verilir.
+    """
+    alloc = [0] * len(sizes)
+    left = max(budget, 0)
+    pending = sorted((i for i, n in enumerate(sizes) if n > 0), key=lambda i: sizes[i])
+    while pending and left > 0:
+        smallest = pending[0]
+        if sizes[smallest] <= left // len(pending):
+            alloc[smallest] = sizes[smallest]
+            left -= sizes[smallest]
+            pending.pop(0)
+            continue
+        base, extra = divmod(left, len(pending))
+        for rank, i in enumerate(sorted(pending)):
+            alloc[i] = base + (1 if rank < extra else 0)
+        break
+    return alloc
+
+
+def _series_order(headers: list[tuple[int, dict]]) -> list[tuple[int, dict]]:
+    if all(h["position"] is not None for _, h in headers):
+        return sorted(headers, key=lambda item: (item[1]["position"], item[0]))
+    if all(h["instance_number"] is not None for _, h in headers):
+        return sorted(headers, key=lambda item: (item[1]["instance_number"], item[0]))
+    return headers
+
+
+def plan_study(
+    headers: list[dict | None],
+    budget: int,
+    oversample: int = 1,
+    group: int = 1,
+) -> list[SeriesPlan]:
+    """
+    Dosya başlıklarından (read_header çıktısı, yükleme sırasında) seri
+    planını çıkarır. Okunamayan dosyalar (None) atlanır.
+
+    oversample > 1 ise her seride payın bu katı kadar eşit aralıklı aday
+    döner; nihai seçimi içerik seçici yapar (bkz. slice_selection).
+    group > 1 (montaj) ise bütçe görüntü değil group'luk karo sayısıdır;
+    seri payı group'un katı olarak dağıtılır.
+    """
+    groups: dict[str, list[tuple[int, dict]]] = {}
+    for file_idx, header in enumerate(headers):
+        if header is None:
+            continue
+        uid = header["series_uid"] or f"__file{file_idx}"
+        groups.setdefault(uid, []).append((file_idx, header))
+
+    ordered: list[tuple[str, str, list[tuple[int, int]]]] = []
+    for uid, members in groups.items():
+        slots = [
+            (file_idx, frame)
+            for file_idx, header in _series_order(members)
+            for frame in range(header["frames"])
+        ]
+        ordered.append((uid, members[0][1]["series_description"], slots))
+
+    group = max(1, group)
+    alloc = allocate_budget([-(-len(slots) // group) for _, _, slots in ordered], budget)
+    plans = []
+    for (uid, desc, slots), tiles in zip(ordered, alloc):
+        k = min(len(slots), tiles * group)
+        if k == 0:
+            continue
+        chosen = [(int(pos), *slots[pos]) for pos in _select_indices(len(slots), k * max(1, oversample))]
+        plans.append(SeriesPlan(uid, desc, len(slots), chosen, k))
+    return plans
+
+
+def frames_by_file(plans: list[SeriesPlan]) -> dict[int, list[int]]:
+    """Plan → dosya index'i başına decode edilecek frame'ler."""
+    out: dict[int, list[int]] = {}
+    for plan in plans:
+        for _, file_idx, frame in plan.slices:
+            out.setdefault(file_idx, []).append(frame)
+    return out
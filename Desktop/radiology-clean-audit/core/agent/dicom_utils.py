@@ -9,7 +9,10 @@ from __future__ import annotations
 import base64
 import io
 import logging
-from typing import List
+import mmap
+import os
+from collections.abc import Sequence
+from typing import List, NamedTuple, Union
 
 import numpy as np
 
@@ -18,10 +21,13 @@ logger = logging.getLogger(__name__)
 try:
     import pydicom
     from pydicom.errors import InvalidDicomError
+    from pydicom.pixels import apply_modality_lut, apply_voi_lut
     PYDICOM_AVAILABLE = True
 except ImportError:
     PYDICOM_AVAILABLE = False
 
+from core.agent.dicom_decoders import UnsupportedTransferSyntax, decode_frames, decode_plan
+
 try:
     from PIL import Image
     PIL_AVAILABLE = True
@@ -30,28 +36,228 @@ except ImportError:
 
 
 MAX_IMAGE_SIDE = 1024  # pikselde maksimum kenar uzunluğu
+JPEG_QUALITY = 80
+# Normalizasyon mantığı değiştiğinde artırılır (işlenmiş görüntü önbelleğini geçersiz kılar)
+NORMALIZATION_VERSION = 1
+
+
+# Yakın kopya tespiti: dHash (8x8 = 64 bit) ve en fazla bu Hamming mesafesi
+# kopya sayılır; negatif değer kapatır
+DHASH_SIZE = 8
+DICOM_DEDUP_DISTANCE = int(os.getenv("DICOM_DEDUP_DISTANCE", "4"))
 
 
-def _normalize_frame(frame: np.ndarray) -> np.ndarray:
-    """Piksel değerlerini 0-255 uint8'e normalize et."""
-    frame = frame.astype(float)
-    lo, hi = frame.min(), frame.max()
-    if hi > lo:
-        frame = (frame - lo) / (hi - lo) * 255.0
-    else:
-        frame[:] = 0
-    return frame.astype(np.uint8)
+# VOI pencere etiketi yoksa kullanılan yüzdelik kırpma sınırları
+PERCENTILE_LOW = 0.5
+PERCENTILE_HIGH = 99.5
+
+
+def _first(value):
+    """Çok değerli DICOM etiketinin (MultiValue) ilk değeri, float olarak."""
+    if isinstance(value, Sequence) and not isinstance(value, (str, bytes)):
+        value = value[0] if len(value) else None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
 
 
-def _frame_to_base64_jpeg(frame: np.ndarray) -> str:
-    """NumPy 2D frame → base64 JPEG string."""
-    img = Image.fromarray(frame).convert("RGB")
+def _modality_params(ds) -> tuple[float, float]:
+    slope = _first(getattr(ds, "RescaleSlope", None))
+    intercept = _first(getattr(ds, "RescaleIntercept", None))
+    return (slope if slope else 1.0), (intercept or 0.0)
+
+
+def _voi_window(ds) -> tuple[float, float] | None:
+    """WindowCenter/Width → (alt, üst) sınır (DICOM lineer VOI fonksiyonu, PS3.3 C.11.2.1.2)."""
+    center = _first(getattr(ds, "WindowCenter", None))
+    width = _first(getattr(ds, "WindowWidth", None))
+    if center is None or width is None or width < 1:
+        return None
+    half = (width - 1) / 2
+    return center - 0.5 - half, center - 0.5 + half
+
+
+def _percentile_bounds_int(stored: np.ndarray) -> tuple[float, float]:
+    """
+    Tamsayı girdide yüzdelikler histogramdan (deterministik, O(n)).
+
+    1 MP üstünde histogram düzenli 2×2 ızgaradaki piksellerden çıkarılır;
+    görüntüleme penceresi için yeterince doğru, süreyi ~4 kat azaltır.
+    """
+    if stored.size > 1 << 20:
+        stored = stored[..., ::2, ::2]
+    counts = np.bincount(stored.ravel())
+    cdf = np.cumsum(counts)
+    total = cdf[-1]
+    lo = int(np.searchsorted(cdf, total * PERCENTILE_LOW / 100, side="right"))
+    hi = int(np.searchsorted(cdf, total * PERCENTILE_HIGH / 100, side="left"))
+    return float(lo), float(hi)
+
+
+def _linear_to_uint8(values: np.ndarray, lo: float, hi: float, invert: bool) -> np.ndarray:
+    """values (float32) yerinde [lo, hi] → [0, 255] eşlenir."""
+    if hi <= lo:
+        return np.zeros(values.shape, dtype=np.uint8)
+    values -= lo
+    values *= 255.0 / (hi - lo)
+    np.clip(values, 0, 255, out=values)
+    if invert:
+        np.subtract(255.0, values, out=values)
+    np.rint(values, out=values)
+    return values.astype(np.uint8)
+
+
+def normalize_frames(frames: np.ndarray, ds=None) -> np.ndarray:
+    """
+    Seçili frame'leri (k, satır, sütun) birlikte 0-255 uint8'e çevirir.
+
+    Sıra: modality LUT (RescaleSlope/Intercept veya ModalityLUTSequence) →
+    VOI (VOILUTSequence, WindowCenter/Width; yoksa tüm frame'ler üzerinde
+    %0.5–%99.5 kırpma) → MONOCHROME1 ise ters çevirme.
+
+    8/16 bit tamsayı veride tüm zincir depolanan değer uzayında bir kez
+    hesaplanan uint16→uint8 tabloya indirgenir; diğer tiplerde float32 yerinde
+    işlem yapılır. Sonuç deterministiktir.
+    """
+    ds = ds if ds is not None else {}
+    invert = str(getattr(ds, "PhotometricInterpretation", "")).strip() == "MONOCHROME1"
+
+    if frames.ndim == 4 or "ModalityLUTSequence" in ds or "VOILUTSequence" in ds:
+        # Renkli veri veya LUT tabloları: pydicom ile, ardından min-max
+        values = frames
+        if frames.ndim == 3:
+            values = apply_voi_lut(apply_modality_lut(frames, ds), ds)
+        values = np.asarray(values, dtype=np.float32)
+        return _linear_to_uint8(values, float(values.min()), float(values.max()), invert and frames.ndim == 3)
+
+    slope, intercept = _modality_params(ds)
+    window = _voi_window(ds)
+
+    if frames.dtype in (np.uint8, np.int8, np.uint16, np.int16):
+        # İşaretli tipler offset-binary'ye çevrilir: x + 2^(bit-1)
+        if frames.dtype == np.int16:
+            stored, offset = frames.view(np.uint16) ^ np.uint16(0x8000), -32768
+        elif frames.dtype == np.int8:
+            stored, offset = frames.view(np.uint8) ^ np.uint8(0x80), -128
+        else:
+            stored, offset = frames, 0
+        if window is None:
+            s_lo, s_hi = _percentile_bounds_int(stored)
+            bounds = sorted(((s_lo + offset) * slope + intercept, (s_hi + offset) * slope + intercept))
+        else:
+            bounds = window
+        domain = np.arange(256 if stored.dtype == np.uint8 else 65536, dtype=np.float32)
+        domain += offset
+        domain *= slope
+        domain += intercept
+        lut = _linear_to_uint8(domain, bounds[0], bounds[1], invert)
+        return lut.take(stored)
+
+    values = frames.astype(np.float32)
+    if slope != 1.0:
+        values *= slope
+    if intercept:
+        values += intercept
+    if window is None:
+        sample = values[..., ::2, ::2] if values.size > 1 << 20 else values
+        lo, hi = np.percentile(sample, (PERCENTILE_LOW, PERCENTILE_HIGH))
+        window = float(lo), float(hi)
+    return _linear_to_uint8(values, window[0], window[1], invert)
+
+
+class ImageEncoding(NamedTuple):
+    """Model'e gönderilecek görüntünün kodlaması (bkz. image_budget)."""
+    format: str = "jpeg"          # "jpeg" | "webp"
+    max_side: int = MAX_IMAGE_SIDE
+    quality: int = JPEG_QUALITY
+
+    @property
+    def media_type(self) -> str:
+        return f"image/{self.format}"
+
+
+def _encode_frame(frame: np.ndarray, encoding: ImageEncoding) -> bytes:
+    img = Image.fromarray(frame)
+    if img.mode not in ("L", "RGB"):
+        img = img.convert("RGB")
     # Büyük görüntüleri yeniden boyutlandır
-    if max(img.size) > MAX_IMAGE_SIDE:
-        img.thumbnail((MAX_IMAGE_SIDE, MAX_IMAGE_SIDE), Image.LANCZOS)
+    if max(img.size) > encoding.max_side:
+        img.thumbnail((encoding.max_side, encoding.max_side), Image.LANCZOS)
     buf = io.BytesIO()
-    img.save(buf, format="JPEG", quality=80)
-    return base64.b64encode(buf.getvalue()).decode("utf-8")
+    img.save(buf, format=encoding.format.upper(), quality=encoding.quality)
+    return buf.getvalue()
+
+
+def processing_params(
+    max_slices: int,
+    frames: Sequence[int] | None = None,
+    encoding: ImageEncoding | None = None,
+) -> dict:
+    """Çıktıyı belirleyen tüm parametreler (önbellek anahtarına girer)."""
+    encoding = encoding or ImageEncoding()
+    return {
+        "max_slices": max_slices,
+        "frames": list(frames) if frames is not None else None,
+        "format": encoding.format,
+        "max_image_side": encoding.max_side,
+        "quality": encoding.quality,
+        "percentiles": [PERCENTILE_LOW, PERCENTILE_HIGH],
+        "normalization": NORMALIZATION_VERSION,
+        "dhash": DHASH_SIZE,
+    }
+
+
+def dhash_frames(frames: np.ndarray) -> np.ndarray:
+    """
+    (k, satır, sütun[, kanal]) uint8 → (k,) uint64 fark hash'i (dHash).
+
+    Her frame 8×9 bloğa toplanır (tüm batch tek reshape + sum ile) ve
+    yatay komşu bloklar karşılaştırılır.
+    """
+    if frames.ndim == 4:
+        frames = frames.sum(axis=-1, dtype=np.uint16)
+    k, h, w = frames.shape
+    if h >= DHASH_SIZE and w >= DHASH_SIZE + 1:
+        # Kenardan blok boyutunun katına kırpılıp yeniden şekillendirilir; tamsayı
+        # toplam, frame'lerin float kopyası oluşturulmaz
+        bh, bw = h // DHASH_SIZE, w // (DHASH_SIZE + 1)
+        blocks = frames[:, :bh * DHASH_SIZE, :bw * (DHASH_SIZE + 1)].reshape(
+            k, DHASH_SIZE, bh, DHASH_SIZE + 1, bw,
+        ).sum(axis=(2, 4), dtype=np.uint32)
+    else:  # çok küçük görüntü: en yakın komşu örnekleme
+        rows = np.linspace(0, h - 1, DHASH_SIZE).astype(np.intp)
+        cols = np.linspace(0, w - 1, DHASH_SIZE + 1).astype(np.intp)
+        blocks = frames[:, rows][:, :, cols]
+    bits = blocks[:, :, 1:] > blocks[:, :, :-1]
+    return np.packbits(bits.reshape(k, -1), axis=1).view(">u8").ravel().astype(np.uint64)
+
+
+def hamming_matrix(hashes: np.ndarray) -> np.ndarray:
+    """(n,) uint64 hash → (n, n) bit farkı sayısı."""
+    xor = hashes[:, None] ^ hashes[None, :]
+    return np.unpackbits(xor.view(np.uint8).reshape(len(hashes), len(hashes), 8), axis=-1).sum(axis=-1)
+
+
+def dedupe_images(images: List[dict], max_distance: int = DICOM_DEDUP_DISTANCE) -> tuple[List[dict], int]:
+    """
+    Daha önce tutulmuş bir görüntüye max_distance veya daha yakın dHash'i
+    olan görüntüleri atar (komşu dilimler, iki export'ta aynı dilim).
+
+    Sıra korunur; ilk görülen tutulur. Returns: (tutulanlar, atılan sayısı).
+    """
+    hashed = [i for i, img in enumerate(images) if img.get("dhash")]
+    if max_distance < 0 or len(hashed) < 2:
+        return images, 0
+    dist = hamming_matrix(np.array([int(images[i]["dhash"], 16) for i in hashed], dtype=np.uint64))
+    drop: set[int] = set()
+    kept: list[int] = []
+    for j, i in enumerate(hashed):
+        if kept and dist[j, kept].min() <= max_distance:
+            drop.add(i)
+        else:
+            kept.append(j)
+    return [img for i, img in enumerate(images) if i not in drop], len(drop)
 
 
 def _select_indices(total: int, max_slices: int) -> List[int]:
@@ -61,6 +267,117 @@ def _select_indices(total: int, max_slices: int) -> List[int]:
     return list(np.linspace(0, total - 1, max_slices, dtype=int))
 
 
+def _instance_number(ds):
+    try:
+        return int(ds.InstanceNumber)
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def _slice_position(ds) -> float | None:
+    """ImagePositionPatient'in dilim normali üzerindeki izdüşümü (mm)."""
+    try:
+        ipp = [float(v) for v in ds.ImagePositionPatient]
+        iop = [float(v) for v in ds.ImageOrientationPatient]
+    except (AttributeError, TypeError, ValueError):
+        return None
+    if len(ipp) != 3 or len(iop) != 6:
+        return None
+    return float(np.dot(np.cross(iop[:3], iop[3:]), ipp))
+
+
+def read_header(path: Union[str, os.PathLike]) -> dict | None:
+    """
+    Piksel verisine dokunmadan seri gruplaması için gereken etiketleri okur.
+
+    Returns:
+        {"series_uid", "series_description", "instance_number", "position",
+         "frames", "rows", "columns", "transfer_syntax", "study_uid", "sop_instance_uid"}
+        veya okunamayan ya da decode edilemeyen (eksik decoder) dosyada None.
+    """
+    if not PYDICOM_AVAILABLE:
+        return None
+    try:
+        ds = pydicom.dcmread(path, stop_before_pixels=True)
+        if "Rows" not in ds:
+            return None  # görüntü içermeyen nesne (SR, DICOMDIR...)
+        plan = decode_plan(ds)
+        return {
+            "series_uid": str(getattr(ds, "SeriesInstanceUID", "") or ""),
+            "series_description": _get_series_description(ds),
+            "instance_number": _instance_number(ds),
+            "position": _slice_position(ds),
+            "frames": int(getattr(ds, "NumberOfFrames", 1) or 1),
+            "rows": int(ds.Rows),
+            "columns": int(getattr(ds, "Columns", 0) or 0),
+            "transfer_syntax": plan.transfer_syntax,
+            "study_uid": str(getattr(ds, "StudyInstanceUID", "") or ""),
+            "sop_instance_uid": str(getattr(ds, "SOPInstanceUID", "") or ""),
+        }
+    except UnsupportedTransferSyntax as exc:
+        logger.warning("DICOM atlandi: %s", exc)
+        return None
+    except Exception as exc:
+        logger.error("DICOM basligi okunamadi: %s", exc)
+        return None
+
+
+def read_headers(paths: List[str]) -> List[dict | None]:
+    """read_header'ın toplu hali (havuza tek iş olarak gönderilir)."""
+    return [read_header(p) for p in paths]
+
+
+def read_dicomdir(path: Union[str, os.PathLike]) -> List[str] | None:
+    """
+    DICOMDIR'deki IMAGE kayıtlarının dosya yolları (DICOMDIR'e göre göreli,
+    "/" ile ayrılmış, büyük harf). Okunamazsa veya DICOMDIR değilse None.
+    """
+    if not PYDICOM_AVAILABLE:
+        return None
+    try:
+        ds = pydicom.dcmread(path, force=True)
+        records = ds.DirectoryRecordSequence
+    except Exception as exc:
+        logger.warning("DICOMDIR okunamadi: %s", exc)
+        return None
+    paths = []
+    for record in records:
+        if getattr(record, "DirectoryRecordType", "") != "IMAGE" or "ReferencedFileID" not in record:
+            continue
+        file_id = record.ReferencedFileID
+        parts = [file_id] if isinstance(file_id, str) else list(file_id)
+        paths.append("/".join(str(p).strip() for p in parts).upper())
+    return paths
+
+
+def read_thumbnails(items: List[tuple[str, List[int]]], side: int = 64) -> List[List[np.ndarray | None]]:
+    """
+    Seçici için küçük önizlemeler: her (yol, frame'ler) için side×side
+    float32 dizileri (modality LUT uygulanmış, en yakın komşu örnekleme).
+
+    Pencereleme ve JPEG yapılmaz; okunamayan dosyada frame'ler None döner.
+    """
+    out: List[List[np.ndarray | None]] = []
+    for path, frames in items:
+        try:
+            ds = pydicom.dcmread(path, stop_before_pixels=True)
+            plan = decode_plan(ds)
+            slope, intercept = _modality_params(ds)
+            rows = np.linspace(0, int(ds.Rows) - 1, side).astype(np.intp)
+            cols = np.linspace(0, int(ds.Columns) - 1, side).astype(np.intp)
+            thumbs = []
+            for frame in decode_frames(path, list(frames), plan):
+                if frame.ndim == 3:
+                    frame = frame.mean(axis=-1)  # renkli: parlaklık
+                thumb = frame[np.ix_(rows, cols)].astype(np.float32)
+                thumbs.append(thumb * slope + intercept)
+            out.append(thumbs)
+        except Exception as exc:
+            logger.error("DICOM onizlemesi okunamadi: %s", exc)
+            out.append([None] * len(frames))
+    return out
+
+
 def _get_series_description(ds) -> str:
     """DICOM tag'lerinden seri açıklaması oluştur."""
     parts = []
@@ -76,43 +393,82 @@ def _get_series_description(ds) -> str:
 
 
 def extract_images_from_dicom(
-    file_bytes: bytes,
+    source: Union[bytes, str, os.PathLike],
     max_slices: int = 4,
+    frames: Sequence[int] | None = None,
+    encoding: ImageEncoding | None = None,
 ) -> List[dict]:
     """
-    DICOM bytes'tan görüntü listesi çıkar.
+    DICOM dosyasından (yol veya bytes) görüntü listesi çıkar.
+
+    Yol verilirse dosya mmap ile okunur; dosyanın tamamı belleğe kopyalanmaz.
+    frames verilirse eşit aralıklı seçim yerine yalnızca bu frame'ler decode edilir.
+    encoding verilmezse JPEG, MAX_IMAGE_SIDE ve JPEG_QUALITY kullanılır.
 
     Returns:
-        [{"base64": str, "series_description": str, "slice_info": str}, ...]
+        [{"base64": str, "media_type": str, "series_description": str, "slice_info": str,
+          "series_uid": str, "instance_number": int | None, "frame_index": int,
+          "dhash": str}, ...]
     """
     if not PYDICOM_AVAILABLE or not PIL_AVAILABLE:
         logger.warning("DICOM isleme icin pydicom veya Pillow yuklu degil.")
         return []
 
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return _extract_images(io.BytesIO(source), max_slices, frames, encoding)
+    try:
+        with open(source, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _extract_images(mm, max_slices, frames, encoding)
+    except (OSError, ValueError) as exc:  # boş dosya mmap edilemez
+        logger.error("DICOM dosyasi acilamadi: %s", exc)
+        return []
+
+
+def _extract_images(
+    fp,
+    max_slices: int,
+    frames: Sequence[int] | None = None,
+    encoding: ImageEncoding | None = None,
+) -> List[dict]:
+    """
+    Önce yalnızca metadata okunur (stop_before_pixels); dilimler NumberOfFrames'ten
+    seçilir ve sadece seçilen frame'ler decode edilir. Transfer syntax ve
+    decoder eklentisi de başlıktan belirlenir; decoder yoksa decode denenmez.
+    """
     try:
-        ds = pydicom.dcmread(io.BytesIO(file_bytes))
-        pixel_array = ds.pixel_array
+        ds = pydicom.dcmread(fp, stop_before_pixels=True)
+        n = int(getattr(ds, "NumberOfFrames", 1) or 1)
+        if frames is None:
+            indices = _select_indices(n, max_slices)
+        else:
+            indices = sorted({int(i) for i in frames if 0 <= int(i) < n})
+        if not indices:
+            return []
+        plan = decode_plan(ds)
+        fp.seek(0)
+        frames = normalize_frames(decode_frames(fp, indices, plan), ds)
+    except UnsupportedTransferSyntax as exc:
+        logger.warning("DICOM atlandi: %s", exc)
+        return []
     except Exception as exc:
         logger.error("DICOM dosyasi okunamadi: %s", exc)
         return []
 
+    encoding = encoding or ImageEncoding()
+    hashes = dhash_frames(frames)
     series_desc = _get_series_description(ds)
-
-    # Tek dilim (2D)
-    if pixel_array.ndim == 2:
-        b64 = _frame_to_base64_jpeg(_normalize_frame(pixel_array))
-        return [{"base64": b64, "series_description": series_desc, "slice_info": "1/1"}]
-
-    # Çok dilimli (3D): [dilimsayısı, satır, sütun]
-    n = pixel_array.shape[0]
-    indices = _select_indices(n, max_slices)
-    results = []
-    for idx in indices:
-        frame = _normalize_frame(pixel_array[idx])
-        b64 = _frame_to_base64_jpeg(frame)
-        results.append({
-            "base64": b64,
+    series_uid = str(getattr(ds, "SeriesInstanceUID", "") or "")
+    instance_number = _instance_number(ds)
+    return [
+        {
+            "base64": base64.b64encode(_encode_frame(frame, encoding)).decode("ascii"),
+            "media_type": encoding.media_type,
             "series_description": series_desc,
             "slice_info": f"{idx + 1}/{n}",
-        })
-    return results
+            "series_uid": series_uid,
+            "instance_number": instance_number,
+            "frame_index": int(idx),
+            "dhash": f"{int(hash_):016x}",
+        }
+        for idx, frame, hash_ in zip(indices, frames, hashes)
+    ]
@@ -0,0 +1,155 @@
+"""
+Vision isteği için görüntü token/bayt bütçesi planlayıcısı.
+
+Görüntü başına token maliyeti yaklaşık genişlik × yükseklik / 750'dir
+(model uzun kenarı ~1568 pikselden büyük görüntüleri zaten küçültür).
+Sabit "20 görüntü, 1024 px, JPEG 80" yerine planlayıcı, seçilebilecek
+dilim sayısı ve kaynak boyutlarından:
+
+1. Görüntü sayısını ve en büyük kenarı token bütçesine sığdırır; önce
+   sayı korunur, kenar VISION_MIN_IMAGE_SIDE altına inecekse sayı azaltılır.
+2. Kodlama kalitesini tahmini bayt/piksel tablosuyla bayt bütçesine
+   sığdırır (en yüksek uygun kalite), gerekirse sayıyı daha da azaltır.
+
+Kodlamadan sonra gerçek boyut bütçeyi aşarsa enforce_byte_budget en çok
+görüntüsü olan seriden dilim düşürür. Plan SSE akışının ilk olayında
+istemciye bildirilir.
+"""
+from __future__ import annotations
+
+import math
+import os
+from typing import NamedTuple
+
+from core.agent.dicom_utils import MAX_IMAGE_SIDE, ImageEncoding
+
+try:
+    from PIL import features
+    WEBP_AVAILABLE = bool(features.check("webp"))
+except ImportError:
+    WEBP_AVAILABLE = False
+
+VISION_TOKEN_BUDGET = int(os.getenv("VISION_TOKEN_BUDGET", "24000"))
+VISION_BYTE_BUDGET_MB = float(os.getenv("VISION_BYTE_BUDGET_MB", "8"))
+# "jpeg" | "webp" (WebP kodlama JPEG'den ~40 kat yavaş; Pillow desteklemiyorsa JPEG)
+VISION_IMAGE_FORMAT = os.getenv("VISION_IMAGE_FORMAT", "jpeg").lower()
+VISION_MIN_IMAGE_SIDE = int(os.getenv("VISION_MIN_IMAGE_SIDE", "512"))
+
+PIXELS_PER_TOKEN = 750
+MODEL_MAX_SIDE = 1568
+
+# Normalize MR dilimlerinde ölçülen bayt/piksel (gürültülü sentetik veri,
+# gerçek görüntülerde daha düşük: tahmin temkinli tarafta kalır)
+QUALITY_LADDER = (80, 70, 60, 50, 40)
+BITS_PER_PIXEL = {80: 1.4, 70: 1.0, 60: 0.75, 50: 0.6, 40: 0.45}
+
+
+class ImagePlan(NamedTuple):
+    count: int
+    available: int
+    encoding: ImageEncoding
+    tokens_per_image: int
+    token_budget: int
+    byte_budget: int
+
+    def as_dict(self) -> dict:
+        return {
+            "images": self.count,
+            "available": self.available,
+            "format": self.encoding.format,
+            "max_side": self.encoding.max_side,
+            "quality": self.encoding.quality,
+            "est_tokens": self.count * self.tokens_per_image,
+            "token_budget": self.token_budget,
+            "byte_budget": self.byte_budget,
+        }
+
+
+def scaled_size(width: int, height: int, max_side: int) -> tuple[int, int]:
+    """Uzun kenarı max_side'a indirilmiş boyut (büyütme yapılmaz)."""
+    longest = max(width, height)
+    if longest <= max_side:
+        return width, height
+    scale = max_side / longest
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def image_tokens(width: int, height: int) -> int:
+    width, height = scaled_size(width, height, MODEL_MAX_SIDE)
+    return math.ceil(width * height / PIXELS_PER_TOKEN)
+
+
+def _encoded_bytes(width: int, height: int, quality: int) -> int:
+    """base64 sonrası tahmini boyut."""
+    return math.ceil(width * height * BITS_PER_PIXEL[quality] / 8 * 4 / 3)
+
+
+def _fit_side(width: int, height: int, tokens: int) -> int:
+    """tokens'a sığan en büyük uzun kenar."""
+    pixels = tokens * PIXELS_PER_TOKEN
+    scale = min(1.0, math.sqrt(pixels / (width * height)))
+    return max(1, int(max(width, height) * scale))
+
+
+def plan_images(
+    sizes: list[tuple[int, int]],
+    max_images: int,
+    token_budget: int = VISION_TOKEN_BUDGET,
+    byte_budget: int = int(VISION_BYTE_BUDGET_MB * 1024 * 1024),
+    image_format: str = VISION_IMAGE_FORMAT,
+) -> ImagePlan:
+    """
+    sizes: seçilebilecek dilimlerin (genişlik, yükseklik) listesi.
+
+    Boyutlar serilere göre değişebildiği için en büyük boyut esas alınır.
+    """
+    fmt = image_format if image_format == "jpeg" or (image_format == "webp" and WEBP_AVAILABLE) else "jpeg"
+    if not sizes or max_images <= 0:
+        return ImagePlan(0, len(sizes), ImageEncoding(fmt), 0, token_budget, byte_budget)
+
+    width = max(w for w, _ in sizes)
+    height = max(h for _, h in sizes)
+    cap_side = min(MAX_IMAGE_SIDE, max(width, height))
+    floor_side = min(VISION_MIN_IMAGE_SIDE, cap_side)
+
+    count = min(len(sizes), max_images)
+    side = min(cap_side, _fit_side(width, height, token_budget // count))
+    if side < floor_side:
+        side = floor_side
+        out_w, out_h = scaled_size(width, height, side)
+        count = max(1, min(count, token_budget // image_tokens(out_w, out_h)))
+    out_w, out_h = scaled_size(width, height, side)
+
+    quality = QUALITY_LADDER[-1]
+    for q in QUALITY_LADDER:
+        if count * _encoded_bytes(out_w, out_h, q) <= byte_budget:
+            quality = q
+            break
+    else:
+        count = max(1, min(count, byte_budget // _encoded_bytes(out_w, out_h, quality)))
+
+    return ImagePlan(
+        count, len(sizes), ImageEncoding(fmt, side, quality),
+        image_tokens(out_w, out_h), token_budget, byte_budget,
+    )
+
+
+def encoded_size(img: dict) -> int:
+    return len(img["base64"])
+
+
+def enforce_byte_budget(images: list[dict], byte_budget: int) -> list[dict]:
+    """
+    Gerçek boyut bütçeyi aşıyorsa en çok görüntüsü olan serinin ortadaki
+    dilimini düşürür; seriler arası denge ve sıra korunur.
+    """
+    images = list(images)
+    total = sum(encoded_size(img) for img in images)
+    while images and total > byte_budget:
+        counts: dict[str, list[int]] = {}
+        for i, img in enumerate(images):
+            counts.setdefault(img.get("series_uid", ""), []).append(i)
+        largest = max(counts.values(), key=len)
+        victim = largest[len(largest) // 2]
+        total -= encoded_size(images.pop(victim))
+    return images
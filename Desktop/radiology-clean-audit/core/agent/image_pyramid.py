@@ -0,0 +1,80 @@
+"""
+Görüntüleyici (ImageViewer) için çok çözünürlüklü dilim türevleri.
+
+Kayıtlı çalışmada seçilen her dilim bir kez decode edilir, normalize edilir
+ve üç seviyede kodlanır: thumb (şerit ve ilk gösterim), medium (ekran) ve
+full (yakınlaştırma). Türevler base64/JSON yerine ikili WebP/JPEG olarak
+sunulur; anahtar dosya içeriğinin SHA-256'sı + frame + kodlama
+parametreleridir, bu yüzden yanıtlar "immutable" önbelleklenebilir.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+
+from core.agent.dicom_decoders import decode_frames, decode_plan
+from core.agent.dicom_utils import (
+    NORMALIZATION_VERSION,
+    PERCENTILE_HIGH,
+    PERCENTILE_LOW,
+    PYDICOM_AVAILABLE,
+    ImageEncoding,
+    _encode_frame,
+    normalize_frames,
+)
+from core.agent.image_budget import WEBP_AVAILABLE
+from core.disk_cache import DiskLRUCache
+
+if PYDICOM_AVAILABLE:
+    import pydicom
+
+# Seviye → uzun kenar (piksel) ve kalite; full kaynak boyutunu aşmaz
+PYRAMID_LEVELS = {"thumb": 128, "medium": 512, "full": 2048}
+PYRAMID_QUALITY = {"thumb": 60, "medium": 75, "full": 85}
+# "webp" | "jpeg" (Pillow WebP desteklemiyorsa JPEG)
+PYRAMID_FORMAT = os.getenv("PYRAMID_FORMAT", "webp").lower()
+if PYRAMID_FORMAT != "jpeg" and not (PYRAMID_FORMAT == "webp" and WEBP_AVAILABLE):
+    PYRAMID_FORMAT = "jpeg"
+
+PYRAMID_CACHE_DIR = os.getenv("PYRAMID_CACHE_DIR", os.path.join(tempfile.gettempdir(), "radiology_pyramid_cache"))
+PYRAMID_CACHE_MAX_MB = int(os.getenv("PYRAMID_CACHE_MAX_MB", "1024"))
+
+pyramid_cache = DiskLRUCache(PYRAMID_CACHE_DIR, PYRAMID_CACHE_MAX_MB * 1024 * 1024)
+
+
+def media_type() -> str:
+    return f"image/{PYRAMID_FORMAT}"
+
+
+def pyramid_key(content_sha256: str, frame: int, level: str) -> str:
+    params = json.dumps({
+        "side": PYRAMID_LEVELS[level],
+        "quality": PYRAMID_QUALITY[level],
+        "format": PYRAMID_FORMAT,
+        "percentiles": [PERCENTILE_LOW, PERCENTILE_HIGH],
+        "normalization": NORMALIZATION_VERSION,
+    }, sort_keys=True)
+    return hashlib.sha256(f"pyramid:{content_sha256}:{int(frame)}:{params}".encode("utf-8")).hexdigest()
+
+
+def get_level(content_sha256: str, frame: int, level: str) -> str | None:
+    """Önbellekteki türevin yolu veya None."""
+    return pyramid_cache.get(pyramid_key(content_sha256, frame, level))
+
+
+def put_levels(content_sha256: str, frame: int, levels: dict[str, bytes]) -> None:
+    for level, data in levels.items():
+        pyramid_cache.put_bytes(pyramid_key(content_sha256, frame, level), data)
+
+
+def build_pyramid(path: str, frame: int) -> dict[str, bytes]:
+    """Tek frame'i bir kez decode edip tüm seviyeleri kodlar (süreç havuzunda çalışır)."""
+    ds = pydicom.dcmread(path, stop_before_pixels=True)
+    pixels = decode_frames(path, [int(frame)], decode_plan(ds))
+    image = normalize_frames(pixels, ds)[0]
+    return {
+        level: _encode_frame(image, ImageEncoding(PYRAMID_FORMAT, side, PYRAMID_QUALITY[level]))
+        for level, side in PYRAMID_LEVELS.items()
+    }
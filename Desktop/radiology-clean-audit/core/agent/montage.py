@@ -0,0 +1,146 @@
+"""
+Çok dilimli montaj: bir serinin komşu dilimlerini tek görüntüde karolar.
+
+Her görüntü _build_content'te sabit bir ek yük ve etiket metni taşır;
+2×2 montaj aynı token bütçesinde modele dört kat dilim gösterir.
+Her dilim kendi etiketleriyle normalize edilir, NumPy blok birleştirmesiyle
+ızgaraya dizilir ve her karonun sol üstüne dilim numarası yazılır.
+
+build_montage süreç havuzunda çalışır: dilimler farklı dosyalardan gelebilir.
+"""
+from __future__ import annotations
+
+import base64
+import logging
+import math
+import os
+from typing import List
+
+import numpy as np
+
+from core.agent.dicom_decoders import decode_frames, decode_plan
+from core.agent.dicom_utils import (
+    PIL_AVAILABLE,
+    PYDICOM_AVAILABLE,
+    ImageEncoding,
+    _encode_frame,
+    _get_series_description,
+    _instance_number,
+    normalize_frames,
+)
+
+logger = logging.getLogger(__name__)
+
+if PYDICOM_AVAILABLE:
+    import pydicom
+
+if PIL_AVAILABLE:
+    from PIL import Image, ImageDraw, ImageFont
+
+MONTAGE_COLUMNS = int(os.getenv("MONTAGE_COLUMNS", "2"))
+MONTAGE_ROWS = int(os.getenv("MONTAGE_ROWS", "2"))
+MONTAGE_GAP = 2  # karolar arası siyah çizgi (piksel)
+
+LAYOUTS = ("single", "montage")
+
+
+def montage_size() -> int:
+    """Montaj başına dilim sayısı."""
+    return max(1, MONTAGE_COLUMNS) * max(1, MONTAGE_ROWS)
+
+
+def tile_frames(frames: np.ndarray, columns: int, gap: int = MONTAGE_GAP) -> np.ndarray:
+    """
+    (n, h, w) uint8 → tek 2B ızgara. Eksik karolar siyah kalır.
+
+    Karolar (satır, sütun, h+gap, w+gap) bloğa yerleştirilip tek transpose +
+    reshape ile birleştirilir; son satır/sütundaki fazla boşluk kırpılır.
+    """
+    n, h, w = frames.shape
+    columns = max(1, min(columns, n))
+    rows = math.ceil(n / columns)
+    cells = np.zeros((rows * columns, h + gap, w + gap), dtype=np.uint8)
+    cells[:n, :h, :w] = frames
+    grid = cells.reshape(rows, columns, h + gap, w + gap).transpose(0, 2, 1, 3)
+    return grid.reshape(rows * (h + gap), columns * (w + gap))[: rows * (h + gap) - gap, : columns * (w + gap) - gap]
+
+
+def _font(size: int):
+    try:
+        return ImageFont.load_default(size=size)
+    except (TypeError, OSError):  # FreeType yok / eski Pillow
+        return ImageFont.load_default()
+
+
+def burn_labels(canvas: np.ndarray, labels: List[str], tile_shape: tuple[int, int], columns: int) -> np.ndarray:
+    """Her karonun sol üstüne etiketi (siyah zemin üzerine beyaz) yazar."""
+    h, w = tile_shape
+    img = Image.fromarray(canvas)
+    draw = ImageDraw.Draw(img)
+    font = _font(max(10, min(h, w) // 16))
+    for i, label in enumerate(labels):
+        x = (i % columns) * (w + MONTAGE_GAP) + 3
+        y = (i // columns) * (h + MONTAGE_GAP) + 3
+        box = draw.textbbox((x, y), label, font=font)
+        draw.rectangle((box[0] - 2, box[1] - 2, box[2] + 2, box[3] + 2), fill=0)
+        draw.text((x, y), label, fill=255, font=font)
+    return np.asarray(img)
+
+
+def _read_frame(path: str, frame: int):
+    ds = pydicom.dcmread(path, stop_before_pixels=True)
+    pixels = decode_frames(path, [frame], decode_plan(ds))[0]
+    return ds, pixels
+
+
+def build_montage(
+    items: List[tuple[str, int]],
+    labels: List[str],
+    columns: int = MONTAGE_COLUMNS,
+    encoding: ImageEncoding | None = None,
+) -> dict | None:
+    """
+    items: seri sırasında (yol, frame) listesi; labels: karo etiketleri.
+
+    Returns: extract_images_from_dicom görüntü sözlüğü biçiminde tek kayıt
+    ("montage": dilim sayısı) veya hiçbir dilim okunamazsa None.
+    """
+    if not PYDICOM_AVAILABLE or not PIL_AVAILABLE:
+        return None
+    encoding = encoding or ImageEncoding()
+    frames, kept, first_ds = [], [], None
+    for (path, frame), label in zip(items, labels):
+        try:
+            ds, pixels = _read_frame(path, frame)
+        except Exception as exc:
+            logger.error("Montaj dilimi okunamadi: %s", exc)
+            continue
+        if pixels.ndim == 3:
+            pixels = pixels.mean(axis=-1).astype(np.float32)  # renkli: parlaklık
+        frames.append(normalize_frames(pixels[None], ds)[0])
+        kept.append(label)
+        first_ds = first_ds or ds
+    if not frames:
+        return None
+
+    # Seri içinde boyut farklıysa karolar en büyük boyuta sıfırla doldurulur
+    h = max(f.shape[0] for f in frames)
+    w = max(f.shape[1] for f in frames)
+    stack = np.zeros((len(frames), h, w), dtype=np.uint8)
+    for i, f in enumerate(frames):
+        stack[i, : f.shape[0], : f.shape[1]] = f
+
+    canvas = burn_labels(tile_frames(stack, columns), kept, (h, w), max(1, min(columns, len(frames))))
+    return {
+        "base64": base64.b64encode(_encode_frame(canvas, encoding)).decode("ascii"),
+        "media_type": encoding.media_type,
+        "series_description": _get_series_description(first_ds),
+        "slice_info": ", ".join(kept),
+        "series_uid": str(getattr(first_ds, "SeriesInstanceUID", "") or ""),
+        "instance_number": _instance_number(first_ds),
+        "frame_index": int(items[0][1]),
+        # Tüm ızgaranın 8×9 dHash'i karo başına çok kaba (benzer anatomideki farklı
+        # montajlar kopya sayılıyor): montajlar kopya elemeye girmez
+        "dhash": None,
+        "montage": len(kept),
+    }
@@ -1113,14 +1113,20 @@ def _build_content(clinical_data: dict, images: list[dict]) -> list:
     for img in images:
         label = img.get("series_description", "")
         info = img.get("slice_info", "")
-        if label or info:
+        if img.get("montage"):
+            content.append({
+                "type": "text",
+                "text": f"[{label}  –  {img['montage']} dilimlik montaj (soldan sağa, yukarıdan aşağıya; "
+                        f"numaralar karoların sol üstünde): {info}]",
+            })
+        elif label or info:
             content.append({"type": "text", "text": f"[{label}  –  dilim {info}]"})
         content.append(
             {
                 "type": "image",
                 "source": {
                     "type": "base64",
-                    "media_type": "image/jpeg",
+                    "media_type": img.get("media_type", "image/jpeg"),
                     "data": img["base64"],
                 },
             }
@@ -0,0 +1,97 @@
+"""
+Seri içinde dilim seçicileri.
+
+- uniform: eşit aralıklı (np.linspace), önizleme gerektirmez.
+- content: aday dilimlerin küçük önizlemeleri üzerinde vektörel bir
+  bilgi skoru hesaplar ve aralık kısıtıyla en iyi k dilimi seçer.
+  Karaciğer serisinde kubbe üstü / uç altı gibi boş dilimler elenir;
+  ön plan oranı SLICE_MIN_FOREGROUND altındaki dilimler bütçe kalsa da
+  gönderilmez (daha az ama daha bilgili görüntü).
+
+Skor = ön plan oranı × (normalize entropi + normalize gradyan enerjisi) / 2.
+Tüm metrikler seri hacmi üzerinde ortak pencereyle, tek numpy geçişinde
+hesaplanır.
+"""
+from __future__ import annotations
+
+import os
+
+import numpy as np
+
+from core.agent.dicom_utils import PERCENTILE_HIGH, PERCENTILE_LOW, _select_indices
+
+DICOM_SLICE_SELECTOR = os.getenv("DICOM_SLICE_SELECTOR", "content")
+# content seçicide seri başına pay × bu kadar aday önizlenir
+DICOM_SELECT_OVERSAMPLE = int(os.getenv("DICOM_SELECT_OVERSAMPLE", "3"))
+SLICE_MIN_FOREGROUND = float(os.getenv("SLICE_MIN_FOREGROUND", "0.05"))
+
+THUMB_SIDE = 64
+HIST_BINS = 32
+FOREGROUND_LEVEL = 0.1  # pencere içinde bu seviyenin üstü ön plan
+
+
+def slice_scores(volume: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (k, h, w) önizleme hacmi → (skor, ön plan oranı), her biri (k,).
+    """
+    k = volume.shape[0]
+    lo, hi = np.percentile(volume, (PERCENTILE_LOW, PERCENTILE_HIGH))
+    x = (volume - lo) / (hi - lo) if hi > lo else np.zeros_like(volume)
+    np.clip(x, 0.0, 1.0, out=x)
+    flat = x.reshape(k, -1)
+    pixels = flat.shape[1]
+
+    foreground = (flat > FOREGROUND_LEVEL).mean(axis=1)
+
+    bins = np.minimum((flat * HIST_BINS).astype(np.intp), HIST_BINS - 1)
+    bins += (np.arange(k) * HIST_BINS)[:, None]
+    p = np.bincount(bins.ravel(), minlength=k * HIST_BINS).reshape(k, HIST_BINS) / pixels
+    with np.errstate(divide="ignore", invalid="ignore"):
+        entropy = -np.where(p > 0, p * np.log2(p), 0.0).sum(axis=1) / np.log2(HIST_BINS)
+
+    gradient = np.abs(np.diff(x, axis=1)).mean(axis=(1, 2)) + np.abs(np.diff(x, axis=2)).mean(axis=(1, 2))
+    peak = gradient.max()
+    if peak > 0:
+        gradient = gradient / peak
+
+    return foreground * (entropy + gradient) / 2, foreground
+
+
+def top_k_spaced(scores: np.ndarray, k: int, min_gap: int, eligible: np.ndarray | None = None) -> list[int]:
+    """
+    En yüksek skorlu k index; seçilenler arası en az min_gap. Aralık
+    yüzünden k dolmazsa kısıt adım adım gevşetilir. Sonuç sıralı.
+    """
+    order = [int(i) for i in np.argsort(-scores, kind="stable") if eligible is None or eligible[i]]
+    chosen: list[int] = []
+    for gap in range(max(min_gap, 1), 0, -1):
+        for idx in order:
+            if len(chosen) == k:
+                return sorted(chosen)
+            if idx not in chosen and all(abs(idx - c) >= gap for c in chosen):
+                chosen.append(idx)
+    return sorted(chosen)
+
+
+def uniform_selector(thumbs: list[np.ndarray], k: int) -> list[int]:
+    return [int(i) for i in _select_indices(len(thumbs), k)]
+
+
+def content_selector(thumbs: list[np.ndarray], k: int) -> list[int]:
+    """thumbs: eşit aralıklı aday önizlemeleri (seri sırasında)."""
+    if not thumbs:
+        return []
+    scores, foreground = slice_scores(np.stack(thumbs))
+    # Adaylar ~oversample kat sık: seçilenler arasında en az yarım pay aralığı
+    min_gap = max(1, len(thumbs) // (2 * max(k, 1)))
+    return top_k_spaced(scores, k, min_gap, eligible=foreground >= SLICE_MIN_FOREGROUND)
+
+
+SELECTORS = {"uniform": uniform_selector, "content": content_selector}
+
+
+def get_selector(name: str = DICOM_SLICE_SELECTOR):
+    try:
+        return SELECTORS[name]
+    except KeyError:
+        raise ValueError(f"Bilinmeyen dilim secici: {name} (secenekler: {', '.join(SELECTORS)})") from None
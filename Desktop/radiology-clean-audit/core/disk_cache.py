@@ -0,0 +1,156 @@
+"""
+Boyut sınırlı, disk tabanlı LRU önbellek.
+
+Her kayıt dizinde tek bir dosyadır; erişim zamanı dosyanın mtime'ı ile
+tutulur. Toplam boyut yazımlarda süreç içinde tutulur; dizin yalnızca ilk
+yazımda ve sınır aşıldığında taranır, en eski dosyalar sınırın
+EVICT_TARGET oranına inene kadar silinir (tarama başka süreçlerin
+yazımlarını da hesaba katar). Yazımlar geçici dosya + os.replace ile
+atomiktir; aynı dizini paylaşan birden fazla süreç yarım dosya görmez.
+
+open() kaydı açık dosya olarak verir: kayıt o sırada silinse de açık tanıtıcı
+okunabilir kalır, yol döndüren get() ise gönderimden önce silinmiş bir dosya
+gösterebilir.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+from typing import BinaryIO
+
+logger = logging.getLogger(__name__)
+
+_SAFE_KEY = re.compile(r"^[0-9a-f]{16,128}$")
+# Sınır aşıldığında toplam bu orana inene kadar silinir (her yazımda tarama olmasın)
+EVICT_TARGET = 0.9
+
+
+class DiskLRUCache:
+    def __init__(self, directory: str, max_bytes: int, suffix: str = ""):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._total: int | None = None  # None: henüz taranmadı
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, key: str) -> str:
+        """Anahtarın dosya yolu. Hex olmayan anahtarlar hash'lenir (path traversal önlemi)."""
+        name = key if _SAFE_KEY.match(key) else hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, name + self.suffix)
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str, count: bool = True) -> str | None:
+        """Kayıt varsa yolunu döner ve LRU sırasını günceller (count=False: istatistiğe girmez)."""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            if count:
+                self._count(False)
+            return None
+        if count:
+            self._count(True)
+        return path
+
+    def open(self, key: str, count: bool = True) -> BinaryIO | None:
+        """Kayıt varsa okumaya açılmış dosyayı döner (kapatmak çağıranın işi); yoksa None."""
+        path = self.path_for(key)
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            if count:
+                self._count(False)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass  # açıldıktan sonra silindi; tanıtıcı yine okunur
+        if count:
+            self._count(True)
+        return f
+
+    def put_bytes(self, key: str, data: bytes) -> str:
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return self.put_file(key, tmp)
+
+    def put_file(self, key: str, src_path: str) -> str:
+        """Dosyayı önbelleğe taşır (aynı dosya sisteminde olmalı)."""
+        path = self.path_for(key)
+        size = os.path.getsize(src_path)
+        try:
+            replaced = os.path.getsize(path)
+        except FileNotFoundError:
+            replaced = 0
+        os.replace(src_path, path)
+        with self._lock:
+            over = self._total is None or self._total + size - replaced > self.max_bytes
+            if not over:
+                self._total += size - replaced
+        if over:
+            self.evict(keep=path)
+        return path
+
+    def evict(self, keep: str | None = None) -> int:
+        """
+        Dizini tarar; toplam sınırı aşıyorsa sınırın EVICT_TARGET oranına
+        inene kadar en eski kayıtları siler ve süreç içi toplamı günceller.
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for e in it:
+                if not e.is_file() or not e.name.endswith(self.suffix) or e.name.endswith(".tmp"):
+                    continue
+                st = e.stat()
+                entries.append((st.st_mtime, st.st_size, e.path))
+                total += st.st_size
+        removed = 0
+        target = self.max_bytes * EVICT_TARGET if total > self.max_bytes else self.max_bytes
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except FileNotFoundError:
+                total -= size
+            except PermissionError:
+                pass  # Windows: açık dosya silinemez, sonraki taramada denenir
+        with self._lock:
+            self._total = total
+        if removed:
+            logger.info("Disk onbellegi: %d kayit silindi (%s)", removed, self.directory)
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+            "max_bytes": self.max_bytes,
+        }
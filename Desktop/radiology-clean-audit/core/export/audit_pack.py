@@ -1,5 +1,7 @@
 import os, json, hmac, hashlib, datetime, logging
-from typing import Optional
+from typing import NamedTuple, Optional
+
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +28,154 @@ def _hmac_hex(secret: str, payload: bytes) -> str:
     return hmac.new(secret.encode("utf-8"), payload, hashlib.sha256).hexdigest()
 
 # -------- LI-RADS v2018 karar motoru --------
+# Kurallar aşağıda veri olarak tanımlanır ve import sırasında tek bir arama
+# tablosuna derlenir. Tablo index'i: özellik bitleri | (boyut kovası << 10).
+LIRADS_CATEGORIES = ("LR-1", "LR-2", "LR-3", "LR-4", "LR-5", "LR-M", "LR-TIV")
+LIRADS_LABELS = {
+    "LR-1": "LR-1 (Definitely benign)",
+    "LR-2": "LR-2 (Probably benign)",
+    "LR-3": "LR-3 (Intermediate probability)",
+    "LR-4": "LR-4 (Probable HCC)",
+    "LR-5": "LR-5 (Definite HCC)",
+    "LR-M": "LR-M (Malignant, not HCC specific)",
+    "LR-TIV": "LR-TIV (Tumor in Vein)",
+}
+_CODE = {c: i for i, c in enumerate(LIRADS_CATEGORIES)}
+
+# Tablo index'indeki bit sırası
+LIRADS_FEATURES = (
+    "cirrhosis",
+    "arterial",
+    "washout",
+    "capsule",
+    "tumor_in_vein",
+    "rim_aphe",
+    "peripheral_washout",
+    "delayed_central",
+    "infiltrative",
+    "ancillary_hcc",
+)
+_BIT = {name: 1 << i for i, name in enumerate(LIRADS_FEATURES)}
+_SIZE_SHIFT = len(LIRADS_FEATURES)
+
+# Boyut kovaları: 0 → <10 mm, 1 → 10–19 mm, 2 → ≥20 mm
+SIZE_BUCKETS = ("<10", "10-19", ">=20")
+_ANY_SIZE = (0, 1, 2)
+_GE_10 = (1, 2)
+_GE_20 = (2,)
+
+
+class LiradsRule(NamedTuple):
+    category: str
+    requires: frozenset
+    sizes: tuple
+
+
+def _rule(category, *requires, sizes=_ANY_SIZE):
+    return LiradsRule(category, frozenset(requires), sizes)
+
+
+# Öncelik sırasıyla: ilk eşleşen kural kategoriyi belirler, hiçbiri
+# eşleşmezse LR-2.
+LIRADS_RULES = (
+    # LR-TIV: Tümör içinde ven (tüm kategorileri geçersiz kılar)
+    _rule("LR-TIV", "tumor_in_vein"),
+    # LR-M: targetoid (rim APHE, periferal washout, gecikmiş santral tutulum)
+    # veya infiltratif görünüm
+    _rule("LR-M", "rim_aphe"),
+    _rule("LR-M", "peripheral_washout"),
+    _rule("LR-M", "delayed_central"),
+    _rule("LR-M", "infiltrative"),
+    # LR-5: siroz + APHE + ≥10 mm + 2 majör kriter, veya ≥20 mm + 1 majör kriter
+    _rule("LR-5", "cirrhosis", "arterial", "washout", "capsule", sizes=_GE_10),
+    _rule("LR-5", "cirrhosis", "arterial", "washout", sizes=_GE_20),
+    _rule("LR-5", "cirrhosis", "arterial", "capsule", sizes=_GE_20),
+    # LR-4: siroz + APHE + ≥10 mm + 1 majör kriter veya ancillary
+    _rule("LR-4", "cirrhosis", "arterial", "washout", sizes=_GE_10),
+    _rule("LR-4", "cirrhosis", "arterial", "capsule", sizes=_GE_10),
+    _rule("LR-4", "cirrhosis", "arterial", "ancillary_hcc", sizes=_GE_10),
+    # LR-3: orta olasılık
+    _rule("LR-3", "cirrhosis", "arterial", sizes=_GE_10),
+    _rule("LR-3", "arterial", sizes=(0,)),
+    _rule("LR-3", "cirrhosis", "arterial", "ancillary_hcc"),
+)
+_DEFAULT_CATEGORY = "LR-2"
+
+# applied_criteria: (özellik, kriter adı). Majör kriterler her zaman,
+# kategoriye özel olanlar yalnızca o kategori seçildiğinde eklenir.
+_BASE_CRITERIA = (
+    ("cirrhosis", "cirrhosis"),
+    ("arterial", "arterial_hyperenhancement"),
+    ("washout", "washout"),
+    ("capsule", "capsule_appearance"),
+)
+_CATEGORY_CRITERIA = {
+    "LR-TIV": (("tumor_in_vein", "tumor_in_vein"),),
+    "LR-M": (
+        ("rim_aphe", "rim_aphe"),
+        ("peripheral_washout", "peripheral_washout"),
+        ("delayed_central", "delayed_central_enhancement"),
+        ("infiltrative", "infiltrative_appearance"),
+    ),
+}
+
+_ANCILLARY_HCC_KEYS = (
+    "fat_sparing_in_solid_mass",
+    "blood_products_in_mass",
+    "corona_enhancement",
+    "mild_hbp_hypointensity",  # hepatobiliary phase
+)
+
+
+# DSL → tablo özelliği (ancillary_hcc hariç)
+_FEATURE_GETTERS = {
+    "cirrhosis": lambda d: bool(d.get("cirrhosis", False)),
+    "arterial": lambda d: bool((d.get("arterial_phase") or {}).get("hyperenhancement", False)),
+    "washout": lambda d: bool((d.get("portal_phase") or {}).get("washout", False)),
+    "capsule": lambda d: bool((d.get("delayed_phase") or {}).get("capsule", False)),
+    "tumor_in_vein": lambda d: bool(d.get("tumor_in_vein", False)),
+    "rim_aphe": lambda d: bool(d.get("rim_aphe", False)),
+    "peripheral_washout": lambda d: bool(d.get("peripheral_washout", False)),
+    "delayed_central": lambda d: bool(d.get("delayed_central_enhancement", False)),
+    "infiltrative": lambda d: bool(d.get("infiltrative", False)),
+}
+
+
+def _compile_rules(rules) -> tuple[bytes, tuple]:
+    """Kural tablosunu (kategori kodu, applied_criteria) arama tablolarına derler."""
+    codes = bytearray()
+    criteria = []
+    for index in range(len(SIZE_BUCKETS) << _SIZE_SHIFT):
+        bucket = index >> _SIZE_SHIFT
+        present = {name for name in LIRADS_FEATURES if index & _BIT[name]}
+        category = next(
+            (r.category for r in rules if bucket in r.sizes and r.requires <= present),
+            _DEFAULT_CATEGORY,
+        )
+        applied = [c for f, c in _BASE_CRITERIA if f in present]
+        applied += [c for f, c in _CATEGORY_CRITERIA.get(category, ()) if f in present]
+        codes.append(_CODE[category])
+        criteria.append(tuple(applied))
+    return bytes(codes), tuple(criteria)
+
+
+_DECISION_TABLE, _CRITERIA_TABLE = _compile_rules(LIRADS_RULES)
+_DECISION_CODES = np.frombuffer(_DECISION_TABLE, dtype=np.uint8)
+
+
+def _size_bucket(size: int) -> int:
+    return 0 if size < 10 else (1 if size < 20 else 2)
+
+
+_INT64 = np.iinfo(np.int64)
+
+
+def _column_size(dsl: dict) -> int:
+    """Boyutu kolon için okur; yalnızca int64'e sığmayanlar sınıra doyurulur (kova değişmez)."""
+    size = int(dsl.get("lesion_size_mm", 0))
+    return min(max(size, _INT64.min), _INT64.max)
+
+
 def _lirads_result(category, label, applied, ancillary_favor_hcc, ancillary_favor_benign):
     """Standart LI-RADS sonuç dict'i oluşturur."""
     return {
@@ -42,6 +192,7 @@ def run_lirads_decision(dsl: dict) -> dict:
     LI-RADS v2018 kriterlerine göre HCC olasılık kategorisi döner.
 
     Desteklenen kategoriler: LR-1, LR-2, LR-3, LR-4, LR-5, LR-M, LR-TIV.
+    Karar, derlenmiş kural tablosunda tek bir aramadır (bkz. LIRADS_RULES).
 
     Dönüş:
         {
@@ -52,124 +203,69 @@ def run_lirads_decision(dsl: dict) -> dict:
           "ancillary_favor_benign": [...],
         }
     """
-    arterial   = bool((dsl.get("arterial_phase") or {}).get("hyperenhancement", False))
-    washout    = bool((dsl.get("portal_phase") or {}).get("washout", False))
-    capsule    = bool((dsl.get("delayed_phase") or {}).get("capsule", False))
-    size       = int(dsl.get("lesion_size_mm", 0))
-    cirrhosis  = bool(dsl.get("cirrhosis", False))
-
-    # LR-TIV ve LR-M özellikleri
-    tumor_in_vein          = bool(dsl.get("tumor_in_vein", False))
-    rim_aphe               = bool(dsl.get("rim_aphe", False))
-    peripheral_washout     = bool(dsl.get("peripheral_washout", False))
-    delayed_central        = bool(dsl.get("delayed_central_enhancement", False))
-    infiltrative           = bool(dsl.get("infiltrative", False))
-
-    # Ancillary features (yardımcı bulgular)
-    ancillary  = dsl.get("ancillary_features") or {}
-    fat_sparing       = bool(ancillary.get("fat_sparing_in_solid_mass", False))
-    blood_products    = bool(ancillary.get("blood_products_in_mass", False))
-    corona_enhancement= bool(ancillary.get("corona_enhancement", False))
-    mild_hypointensity= bool(ancillary.get("mild_hbp_hypointensity", False))  # hepatobiliary phase
-
-    applied = []
-    ancillary_favor_hcc = []
-    ancillary_favor_benign = []
-
-    if cirrhosis:
-        applied.append("cirrhosis")
-    if arterial:
-        applied.append("arterial_hyperenhancement")
-    if washout:
-        applied.append("washout")
-    if capsule:
-        applied.append("capsule_appearance")
-
-    # Yardımcı bulgular değerlendirme
-    if fat_sparing:
-        ancillary_favor_hcc.append("fat_sparing_in_solid_mass")
-    if blood_products:
-        ancillary_favor_hcc.append("blood_products_in_mass")
-    if corona_enhancement:
-        ancillary_favor_hcc.append("corona_enhancement")
-    if mild_hypointensity:
-        ancillary_favor_hcc.append("mild_hbp_hypointensity")
-
-    ancillary_positive = len(ancillary_favor_hcc) > 0
-
-    # --- LR-TIV: Tümör İçinde Ven (tüm kategorileri geçersiz kılar) ---
-    if tumor_in_vein:
-        applied.append("tumor_in_vein")
-        return _lirads_result(
-            "LR-TIV", "LR-TIV (Tumor in Vein)",
-            applied, ancillary_favor_hcc, ancillary_favor_benign,
-        )
-
-    # --- LR-M: Malign, muhtemelen HCC değil ---
-    # Targetoid kitle: rim APHE, periferal washout veya gecikmiş santral tutulum
-    # Veya infiltratif görünüm
-    targetoid = rim_aphe or peripheral_washout or delayed_central
-    if targetoid or infiltrative:
-        if rim_aphe:
-            applied.append("rim_aphe")
-        if peripheral_washout:
-            applied.append("peripheral_washout")
-        if delayed_central:
-            applied.append("delayed_central_enhancement")
-        if infiltrative:
-            applied.append("infiltrative_appearance")
-        return _lirads_result(
-            "LR-M", "LR-M (Malignant, not HCC specific)",
-            applied, ancillary_favor_hcc, ancillary_favor_benign,
-        )
+    ancillary = dsl.get("ancillary_features") or {}
+    ancillary_favor_hcc = [k for k in _ANCILLARY_HCC_KEYS if ancillary.get(k, False)]
+
+    index = 0
+    for name, getter in _FEATURE_GETTERS.items():
+        if getter(dsl):
+            index |= _BIT[name]
+    if ancillary_favor_hcc:
+        index |= _BIT["ancillary_hcc"]
+    index |= _size_bucket(int(dsl.get("lesion_size_mm", 0))) << _SIZE_SHIFT
+
+    category = LIRADS_CATEGORIES[_DECISION_TABLE[index]]
+    return _lirads_result(
+        category, LIRADS_LABELS[category],
+        list(_CRITERIA_TABLE[index]), ancillary_favor_hcc, [],
+    )
 
-    # --- LR-5: Kesin HCC ---
-    # Majör kriter: siroz + arteriyel + (washout VEYA kapsül) + ≥10 mm
-    if cirrhosis and arterial and size >= 10:
-        major_features = sum([washout, capsule])
-        if major_features >= 2:
-            return _lirads_result(
-                "LR-5", "LR-5 (Definite HCC)",
-                applied, ancillary_favor_hcc, ancillary_favor_benign,
-            )
-        if major_features == 1 and size >= 20:
-            # ≥20 mm + 1 majör kriter → LR-5
-            return _lirads_result(
-                "LR-5", "LR-5 (Definite HCC)",
-                applied, ancillary_favor_hcc, ancillary_favor_benign,
-            )
-
-    # --- LR-4: Muhtemel HCC ---
-    # Siroz + arteriyel + ≥10 mm + 1 majör kriter veya ancillary
-    if cirrhosis and arterial and size >= 10:
-        if washout or capsule or ancillary_positive:
-            return _lirads_result(
-                "LR-4", "LR-4 (Probable HCC)",
-                applied, ancillary_favor_hcc, ancillary_favor_benign,
-            )
-
-    # --- LR-3: Orta olasılık ---
-    if cirrhosis and arterial and size >= 10:
-        return _lirads_result(
-            "LR-3", "LR-3 (Intermediate probability)",
-            applied, ancillary_favor_hcc, ancillary_favor_benign,
-        )
-    if arterial and size < 10:
-        return _lirads_result(
-            "LR-3", "LR-3 (Intermediate probability)",
-            applied, ancillary_favor_hcc, ancillary_favor_benign,
-        )
-    if cirrhosis and arterial and ancillary_positive:
-        return _lirads_result(
-            "LR-3", "LR-3 (Intermediate probability)",
-            applied, ancillary_favor_hcc, ancillary_favor_benign,
-        )
 
-    # --- LR-2: Muhtemelen benign ---
-    return _lirads_result(
-        "LR-2", "LR-2 (Probably benign)",
-        applied, ancillary_favor_hcc, ancillary_favor_benign,
+# -------- Toplu (vektörel) LI-RADS skorlama --------
+def dsls_to_columns(dsls: list[dict]) -> dict[str, np.ndarray]:
+    """DSL dict listesini run_lirads_decision_batch için kolon dizilerine çevirir."""
+    n = len(dsls)
+    columns = {
+        name: np.fromiter((getter(d) for d in dsls), dtype=np.bool_, count=n)
+        for name, getter in _FEATURE_GETTERS.items()
+    }
+    columns["ancillary_hcc"] = np.fromiter(
+        (any((d.get("ancillary_features") or {}).get(k, False) for k in _ANCILLARY_HCC_KEYS)
+         for d in dsls),
+        dtype=np.bool_, count=n,
     )
+    columns["size"] = np.fromiter((_column_size(d) for d in dsls), dtype=np.int64, count=n)
+    return columns
+
+
+def run_lirads_decision_batch(size, **features) -> np.ndarray:
+    """
+    run_lirads_decision'ın kolon bazlı (NumPy) karşılığı.
+
+    size: lezyon boyutu (mm) dizisi (tamsayı veya sonlu ondalık). features: LIRADS_FEATURES adlarıyla
+    aynı uzunlukta boolean diziler; verilmeyen bayraklar False kabul edilir.
+    ancillary_hcc: HCC lehine yardımcı bulgulardan en az biri var mı.
+
+    Dönüş: LIRADS_CATEGORIES index'lerinden oluşan uint8 dizi.
+    Etiketler için: np.asarray(LIRADS_CATEGORIES)[codes]
+    """
+    unknown = set(features) - set(LIRADS_FEATURES)
+    if unknown:
+        raise TypeError(f"Bilinmeyen LI-RADS özelliği: {', '.join(sorted(unknown))}")
+
+    size = np.asarray(size)
+    if size.dtype.kind == "f":
+        if not np.isfinite(size).all():
+            raise ValueError("Lezyon boyutu sonlu olmali")
+    elif size.dtype.kind not in "iu":
+        # Python int listesi vb.: int64'e sığmayan değer OverflowError verir (sessizce taşmaz)
+        size = size.astype(np.int64)
+    # Boyut yalnızca tablo index'ine çevrilirken kovaya indirgenir; kolon değişmez
+    index = np.digitize(size, (10, 20)).astype(np.int32) << _SIZE_SHIFT
+    for name, column in features.items():
+        if column is not None:
+            index |= np.asarray(column, dtype=bool).astype(np.int32) * _BIT[name]
+    return _DECISION_CODES[index]
 
 # -------- PACK ASSEMBLY (shared) --------
 def _assemble_pack(
@@ -235,6 +331,19 @@ def build_pack(case_id: str, dsl: dict, verify_base_url: str, previous_pack: dic
     content = {"dsl": dsl, "decision": decision, "lirads": lirads_result}
     return _assemble_pack(case_id, content, verify_base_url, previous_pack)
 
+def rescore_pack(previous_pack: dict, verify_base_url: str) -> dict:
+    """
+    Saklı DSL'i güncel LI-RADS motoruyla yeniden skorlayıp yeni versiyon oluşturur.
+
+    İçeriğin geri kalanı (ajan raporu, klinik veri) aynen korunur; yeni pack
+    önceki versiyona hash zinciriyle bağlanır.
+    """
+    content = dict(previous_pack.get("content") or {})
+    lirads_result = run_lirads_decision(content.get("dsl") or {})
+    content["decision"] = lirads_result["label"]
+    content["lirads"] = lirads_result
+    return _assemble_pack(previous_pack["case_id"], content, verify_base_url, previous_pack)
+
 # -------- VERIFY FULL --------
 def verify_pack_full(pack: dict) -> dict:
     reasons = []
@@ -286,6 +395,80 @@ def verify_pack_full(pack: dict) -> dict:
 
 
 # -------- FORM → DSL BRIDGE --------
+def _empty_dsl(cirrhosis: bool) -> dict:
+    return {
+        "arterial_phase": {"hyperenhancement": False},
+        "portal_phase": {"washout": False},
+        "delayed_phase": {"capsule": False},
+        "lesion_size_mm": 0,
+        "cirrhosis": cirrhosis,
+    }
+
+
+def lesion_to_dsl(les: dict, cirrhosis: bool) -> dict:
+    """Ajan formundaki tek bir lezyonu LI-RADS DSL formatına çevirir."""
+    arterial_text = (les.get("arterial_enhancement") or "").lower()
+    # "rim enhansman" → LR-M yönünde, APHE sayılmaz
+    # "hiperenhansman (non-rim APHE)" → gerçek APHE
+    is_rim_only = arterial_text.startswith("rim ")
+    aphe = ("aphe" in arterial_text or "hiperenhansman" in arterial_text) and not is_rim_only
+
+    washout = bool(les.get("washout", False))
+    capsule = bool(les.get("capsule", False))
+
+    size_str = str(les.get("size_mm", "0")).strip()
+    try:
+        size = round(float(size_str))
+    except (ValueError, TypeError):
+        size = 0
+
+    dsl = {
+        "arterial_phase": {"hyperenhancement": aphe},
+        "portal_phase": {"washout": washout},
+        "delayed_phase": {"capsule": capsule},
+        "lesion_size_mm": size,
+        "cirrhosis": cirrhosis,
+        # LR-M: rim APHE + targetoid özellikler
+        "rim_aphe": is_rim_only,
+        "peripheral_washout": bool(les.get("peripheral_washout", False)),
+        "delayed_central_enhancement": bool(les.get("delayed_central_enhancement", False)),
+        "infiltrative": bool(les.get("infiltrative", False)),
+        # LR-TIV: tümör-içi ven
+        "tumor_in_vein": bool(les.get("tumor_in_vein", False)),
+    }
+
+    # Ancillary features from DWI
+    ancillary = {}
+    if les.get("dwi_restriction"):
+        ancillary["restricted_diffusion"] = True
+    if les.get("additional"):
+        add_lower = les["additional"].lower()
+        if "mozaik" in add_lower or "mosaic" in add_lower:
+            ancillary["mosaic_architecture"] = True
+        if "nodül-içinde-nodül" in add_lower or "nodul-icinde-nodul" in add_lower:
+            ancillary["nodule_in_nodule"] = True
+    if ancillary:
+        dsl["ancillary_features"] = ancillary
+    return dsl
+
+
+def _lesion_risk_score(dsl: dict) -> int:
+    """LR-TIV ve LR-M en yüksek önceliğe sahip; sonra majör kriterler + boyut."""
+    lr_m = dsl["rim_aphe"] or dsl["peripheral_washout"] or dsl["delayed_central_enhancement"] or dsl["infiltrative"]
+    majors = (
+        dsl["arterial_phase"]["hyperenhancement"],
+        dsl["portal_phase"]["washout"],
+        dsl["delayed_phase"]["capsule"],
+    )
+    return (200 if dsl["tumor_in_vein"] else 0) + (100 if lr_m else 0) + sum(majors) * 10 + dsl["lesion_size_mm"]
+
+
+def extract_lesion_dsls(clinical_data: dict) -> list[dict]:
+    """Formdaki her lezyon için ayrı DSL döner (lezyon sırası korunur)."""
+    cirrhosis = bool(clinical_data.get("cirrhosis", False))
+    return [lesion_to_dsl(les, cirrhosis) for les in clinical_data.get("lesions", [])]
+
+
 def extract_dsl_from_findings(clinical_data: dict) -> dict:
     """
     Ajan formundaki yapılandırılmış lezyon verisini LI-RADS DSL formatına çevirir.
@@ -293,88 +476,14 @@ def extract_dsl_from_findings(clinical_data: dict) -> dict:
     Birden fazla lezyon varsa, en yüksek risk taşıyan lezyon seçilir
     (en büyük boyut + en çok major kriter).
     """
-    lesions = clinical_data.get("lesions", [])
-    cirrhosis = bool(clinical_data.get("cirrhosis", False))
-
-    if not lesions:
-        return {
-            "arterial_phase": {"hyperenhancement": False},
-            "portal_phase": {"washout": False},
-            "delayed_phase": {"capsule": False},
-            "lesion_size_mm": 0,
-            "cirrhosis": cirrhosis,
-        }
-
-    # Her lezyon için DSL üret, en yüksek risk skoru olanı seç
     best_dsl = None
     best_score = -1
-
-    for les in lesions:
-        arterial_text = (les.get("arterial_enhancement") or "").lower()
-        # "rim enhansman" → LR-M yönünde, APHE sayılmaz
-        # "hiperenhansman (non-rim APHE)" → gerçek APHE
-        is_rim_only = arterial_text.startswith("rim ")
-        aphe = ("aphe" in arterial_text or "hiperenhansman" in arterial_text) and not is_rim_only
-
-        washout = bool(les.get("washout", False))
-        capsule = bool(les.get("capsule", False))
-
-        size_str = str(les.get("size_mm", "0")).strip()
-        try:
-            size = round(float(size_str))
-        except (ValueError, TypeError):
-            size = 0
-
-        # LR-M: rim APHE + targetoid özellikler
-        peripheral_washout = bool(les.get("peripheral_washout", False))
-        delayed_central = bool(les.get("delayed_central_enhancement", False))
-        infiltrative = bool(les.get("infiltrative", False))
-
-        # LR-TIV: tümör-içi ven
-        tumor_in_vein = bool(les.get("tumor_in_vein", False))
-
-        dsl = {
-            "arterial_phase": {"hyperenhancement": aphe},
-            "portal_phase": {"washout": washout},
-            "delayed_phase": {"capsule": capsule},
-            "lesion_size_mm": size,
-            "cirrhosis": cirrhosis,
-            "rim_aphe": is_rim_only,
-            "peripheral_washout": peripheral_washout,
-            "delayed_central_enhancement": delayed_central,
-            "infiltrative": infiltrative,
-            "tumor_in_vein": tumor_in_vein,
-        }
-
-        # Ancillary features from DWI
-        ancillary = {}
-        if les.get("dwi_restriction"):
-            ancillary["restricted_diffusion"] = True
-        if les.get("additional"):
-            add_lower = les["additional"].lower()
-            if "mozaik" in add_lower or "mosaic" in add_lower:
-                ancillary["mosaic_architecture"] = True
-            if "nodül-içinde-nodül" in add_lower or "nodul-icinde-nodul" in add_lower:
-                ancillary["nodule_in_nodule"] = True
-        if ancillary:
-            dsl["ancillary_features"] = ancillary
-
-        # Risk skoru: LR-TIV ve LR-M en yüksek önceliğe sahip
-        # Sonra major kriterler + boyut
-        lr_m_score = 100 if (is_rim_only or peripheral_washout or delayed_central or infiltrative) else 0
-        lr_tiv_score = 200 if tumor_in_vein else 0
-        score = lr_tiv_score + lr_m_score + sum([aphe, washout, capsule]) * 10 + size
+    for dsl in extract_lesion_dsls(clinical_data):
+        score = _lesion_risk_score(dsl)
         if score > best_score:
             best_score = score
             best_dsl = dsl
-
-    return best_dsl or {
-        "arterial_phase": {"hyperenhancement": False},
-        "portal_phase": {"washout": False},
-        "delayed_phase": {"capsule": False},
-        "lesion_size_mm": 0,
-        "cirrhosis": cirrhosis,
-    }
+    return best_dsl or _empty_dsl(bool(clinical_data.get("cirrhosis", False)))
 
 
 def build_agent_pack(
@@ -0,0 +1,151 @@
+"""
+Toplu PDF export: birden çok vakanın PDF'i tek bir akan ZIP yanıtında.
+
+PDF'ler render servisinde paralel üretilir ve bittikçe ZIP'e yazılır.
+ZIP, seek edilemeyen bir tampona yazılır (zipfile data descriptor kullanır)
+ve tampon her parçadan sonra boşaltılır; bellekte aynı anda yalnızca işçi
+sayısı kadar PDF bulunur. Önbellekteki PDF'ler diskten parça parça kopyalanır;
+arama ile kopyalama arasında önbellekten silinen PDF yeniden render edilir.
+Aynı ada temizlenen case_id'lerin dosyalarına sayı eki verilir. Arşivin
+sonunda imzaları içeren manifest.json yer alır.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import logging
+import posixpath
+import zipfile
+from collections.abc import Iterator
+from datetime import datetime, timezone
+
+from core.export.pdf_cache import pdf_cache, pdf_key
+from core.export.pdf_export import pdf_filename
+from core.export.pdf_service import iter_render
+from store.store import get_case
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _StreamSink(io.RawIOBase):
+    """ZipFile'ın yazdığı baytları biriktirir; tell/seek desteklemez."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _entry(pack: dict, filename: str, digest, size: int, source: str) -> dict:
+    return {
+        "case_id": pack["case_id"],
+        "version": pack.get("version", 1),
+        "signature": pack["signature"],
+        "file": filename,
+        "sha256": digest.hexdigest(),
+        "bytes": size,
+        "source": source,
+    }
+
+
+def _unique_name(filename: str, used: set[str]) -> str:
+    """Temizlenmiş case_id'ler çakışabilir (ör. "A/1" ve "A_1"): ada -2, -3 ... eklenir."""
+    name = filename
+    stem, ext = posixpath.splitext(filename)
+    n = 1
+    while name in used:
+        n += 1
+        name = f"{stem}-{n}{ext}"
+    used.add(name)
+    return name
+
+
+def stream_pdf_zip(case_ids: list[str]) -> Iterator[bytes]:
+    """case_ids için PDF'leri render edip ZIP baytlarını parça parça üretir."""
+    sink = _StreamSink()
+    manifest: list[dict] = []
+    errors: list[dict] = []
+    cached: list[dict] = []
+    evicted: list[dict] = []
+    names: set[str] = set()
+
+    def _to_render() -> Iterator[dict]:
+        # Önbellekte olanlar render kuyruğuna girmez, ayrıca kopyalanır.
+        # Bu aramalar PDF isabet oranı istatistiğine girmez.
+        for case_id in case_ids:
+            pack = get_case(case_id)
+            if pack is None:
+                errors.append({"case_id": case_id, "error": "Case not found"})
+                continue
+            if pdf_cache.get(pdf_key(pack["signature"]), count=False) is not None:
+                cached.append(pack)
+                continue
+            yield pack
+
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as zf:
+
+        def _copy_cached() -> Iterator[bytes]:
+            while cached:
+                pack = cached.pop(0)
+                # Üye başlamadan açılır; arada silinen kayıt yeniden render edilir
+                src = pdf_cache.open(pdf_key(pack["signature"]), count=False)
+                if src is None:
+                    evicted.append(pack)
+                    continue
+                filename = _unique_name(pdf_filename(pack["case_id"]), names)
+                digest = hashlib.sha256()
+                size = 0
+                with src, zf.open(filename, "w") as dst:
+                    for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                        dst.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+                        yield sink.drain()
+                manifest.append(_entry(pack, filename, digest, size, "cache"))
+                yield sink.drain()
+
+        def _write_rendered(pack: dict, result: bytes | Exception) -> Iterator[bytes]:
+            if isinstance(result, Exception):
+                logger.warning("Toplu PDF: %s render edilemedi (%s)", pack["case_id"], result)
+                errors.append({"case_id": pack["case_id"], "error": str(result) or type(result).__name__})
+                return
+            pdf_cache.put_bytes(pdf_key(pack["signature"]), result)
+            filename = _unique_name(pdf_filename(pack["case_id"]), names)
+            with zf.open(filename, "w") as dst:
+                for i in range(0, len(result), CHUNK_SIZE):
+                    dst.write(result[i:i + CHUNK_SIZE])
+                    yield sink.drain()
+            manifest.append(_entry(pack, filename, hashlib.sha256(result), len(result), "render"))
+            yield sink.drain()
+
+        for pack, result in iter_render(_to_render()):
+            yield from _copy_cached()
+            yield from _write_rendered(pack, result)
+        yield from _copy_cached()
+        if evicted:
+            logger.info("Toplu PDF: %d onbellek kaydi kopyalanmadan silindi, yeniden render", len(evicted))
+            for pack, result in iter_render(evicted):
+                yield from _write_rendered(pack, result)
+
+        zf.writestr("manifest.json", json.dumps({
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "requested": len(case_ids),
+            "exported": len(manifest),
+            "files": manifest,
+            "errors": errors,
+        }, ensure_ascii=False, indent=2))
+    yield sink.drain()
+    logger.info("Toplu PDF export: %d/%d vaka", len(manifest), len(case_ids))
@@ -0,0 +1,27 @@
+"""
+İmzaya göre adreslenen PDF önbelleği.
+
+İmzalı bir pack asla değişmez; aynı signature ve aynı renderer sürümü için
+üretilen PDF de aynıdır. Anahtar ikisinden oluşur (pdf_key), renderer
+değiştiğinde eski PDF'ler sunulmaz. Render yalnızca önbellekte yoksa yapılır;
+önbelleğe yazma yanıt gönderildikten sonra (background task) yapılır.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+
+from core.disk_cache import DiskLRUCache
+from core.export.pdf_export import PDF_RENDERER_VERSION
+
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(tempfile.gettempdir(), "radiology_pdf_cache"))
+PDF_CACHE_MAX_MB = int(os.getenv("PDF_CACHE_MAX_MB", "256"))
+
+pdf_cache = DiskLRUCache(PDF_CACHE_DIR, PDF_CACHE_MAX_MB * 1024 * 1024, suffix=".pdf")
+
+
+def pdf_key(signature: str) -> str:
+    """PDF önbellek anahtarı ve ETag değeri: imza + renderer sürümü."""
+    return f"{signature}-r{PDF_RENDERER_VERSION}"
+
+
@@ -1,15 +1,37 @@
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image
+from reportlab.platypus import BaseDocTemplate, Frame, PageTemplate, Paragraph, Spacer, Table, TableStyle
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib.colors import HexColor
-import qrcode, os, json, re, logging, tempfile
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.graphics.barcode.qr import QrCode
+from xml.sax.saxutils import escape
+from functools import lru_cache
+from typing import NamedTuple
+import io, os, json, re, logging
 
 logger = logging.getLogger(__name__)
 
-# Güvenli output dizini
-OUTPUT_DIR = os.path.join(tempfile.gettempdir(), "radiology_exports")
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+# PDF çıktısını değiştiren render değişikliğinde artırılır (PDF önbelleğini ve ETag'i geçersiz kılar)
+PDF_RENDERER_VERSION = 2
+
+# Türkçe karakterler (ğ, ş, ı, İ) standart Type1 fontlarda yok; DejaVu aranır
+PDF_FONT_DIRS = [
+    d for d in (
+        os.getenv("PDF_FONT_DIR"),
+        "/usr/share/fonts/truetype/dejavu",
+        "/usr/share/fonts/TTF",
+        "/usr/share/fonts/dejavu",
+        "/Library/Fonts",
+        "C:\\Windows\\Fonts",
+    ) if d
+]
+
+_MARGIN = 0.8 * inch
+_BOLD = re.compile(r"\*\*(.+?)\*\*")
+_NUMBERED = re.compile(r"^(\d+)[.)]\s+")
+_TABLE_RULE = re.compile(r"^\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?$")
 
 
 def _sanitize_filename(name: str) -> str:
@@ -18,6 +40,11 @@ def _sanitize_filename(name: str) -> str:
     return safe or "unknown"
 
 
+def pdf_filename(case_id: str) -> str:
+    """İndirme için güvenli PDF dosya adı."""
+    return f"{_sanitize_filename(case_id)}.pdf"
+
+
 def _lirads_color(category: str) -> str:
     """LI-RADS kategorisine göre renk kodu."""
     colors = {
@@ -32,10 +59,43 @@ def _lirads_color(category: str) -> str:
     return colors.get(category, "#71717a")
 
 
-def generate_pdf(pack):
+def _qr_flowable(data: str, size: float) -> QrCode:
+    """Doğrulama URL'i için vektörel QR kodu; modüller doğrudan canvas'a çizilir."""
+    return QrCode(data, width=size, height=size)
+
+
+class PdfTemplate(NamedTuple):
+    styles: object  # StyleSheet1
+    font: str
+    bold_font: str
+    table_style: TableStyle
+
+
+def _register_fonts() -> tuple[str, str]:
+    """DejaVu Sans bulunursa kaydeder; yoksa Helvetica'ya düşer."""
+    for directory in PDF_FONT_DIRS:
+        regular = os.path.join(directory, "DejaVuSans.ttf")
+        bold = os.path.join(directory, "DejaVuSans-Bold.ttf")
+        if os.path.exists(regular) and os.path.exists(bold):
+            pdfmetrics.registerFont(TTFont("ReportSans", regular))
+            pdfmetrics.registerFont(TTFont("ReportSans-Bold", bold))
+            pdfmetrics.registerFontFamily(
+                "ReportSans", normal="ReportSans", bold="ReportSans-Bold",
+                italic="ReportSans", boldItalic="ReportSans-Bold",
+            )
+            return "ReportSans", "ReportSans-Bold"
+    logger.warning("DejaVu fontu bulunamadi, Helvetica kullaniliyor (Turkce karakterler eksik olabilir)")
+    return "Helvetica", "Helvetica-Bold"
+
+
+@lru_cache(maxsize=None)
+def pdf_template() -> PdfTemplate:
+    """Stiller ve fontlar süreç başına bir kez hazırlanır."""
+    font, bold_font = _register_fonts()
     styles = getSampleStyleSheet()
+    for name in ("Normal", "BodyText", "Title", "Heading3", "Heading4"):
+        styles[name].fontName = bold_font if name.startswith(("Title", "Heading")) else font
 
-    # Ek stiller
     styles.add(ParagraphStyle(
         "SectionHead",
         parent=styles["Heading3"],
@@ -43,6 +103,13 @@ def generate_pdf(pack):
         spaceBefore=12,
         textColor=HexColor("#18181b"),
     ))
+    styles.add(ParagraphStyle(
+        "SubHead",
+        parent=styles["Heading4"],
+        spaceAfter=4,
+        spaceBefore=8,
+        textColor=HexColor("#27272a"),
+    ))
     styles.add(ParagraphStyle(
         "ReportBody",
         parent=styles["Normal"],
@@ -50,21 +117,133 @@ def generate_pdf(pack):
         leading=13,
         spaceAfter=4,
     ))
+    styles.add(ParagraphStyle(
+        "ReportBullet",
+        parent=styles["ReportBody"],
+        leftIndent=12,
+        bulletIndent=2,
+    ))
+    styles.add(ParagraphStyle(
+        "TableCell",
+        parent=styles["Normal"],
+        fontSize=8,
+        leading=10,
+    ))
     styles.add(ParagraphStyle(
         "Meta",
         parent=styles["Normal"],
         fontSize=7,
         textColor=HexColor("#a1a1aa"),
     ))
+    table_style = TableStyle([
+        ("GRID", (0, 0), (-1, -1), 0.4, HexColor("#d4d4d8")),
+        ("BACKGROUND", (0, 0), (-1, 0), HexColor("#f4f4f5")),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("TOPPADDING", (0, 0), (-1, -1), 2),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
+    ])
+    return PdfTemplate(styles, font, bold_font, table_style)
+
 
-    safe_id = _sanitize_filename(pack['case_id'])
-    path = os.path.join(OUTPUT_DIR, f"{safe_id}.pdf")
-    doc = SimpleDocTemplate(path, pagesize=A4)
+def _inline(text: str) -> str:
+    """Markdown satır içi biçimini Paragraph XML'ine çevirir (önce kaçışlar)."""
+    return _BOLD.sub(r"<b>\1</b>", escape(text))
+
+
+def _table_cells(line: str) -> list[str]:
+    return [c.strip() for c in line.strip().strip("|").split("|")]
+
+
+def _table(rows: list[list[str]], tpl: PdfTemplate) -> Table:
+    width = max(len(r) for r in rows)
+    cell = tpl.styles["TableCell"]
+    data = [
+        [Paragraph(_inline(c), cell) for c in r] + [""] * (width - len(r))
+        for r in rows
+    ]
+    table = Table(data, colWidths=[(A4[0] - 2 * _MARGIN) / width] * width, repeatRows=1)
+    table.setStyle(tpl.table_style)
+    return table
+
+
+def markdown_to_flowables(text: str, tpl: PdfTemplate | None = None) -> list:
+    """
+    Markdown alt kümesini tek geçişte flowable listesine çevirir.
+
+    Desteklenen: #/##/### başlık, - / * / 1. madde, **kalın**, | tablo |.
+    Diğer her şey düz paragraf; metin XML için kaçışlanır.
+    """
+    tpl = tpl or pdf_template()
+    styles = tpl.styles
+    out = []
+    table_rows: list[list[str]] = []
+
+    for line in text.split("\n"):
+        stripped = line.strip()
+        if stripped.startswith("|"):
+            if not _TABLE_RULE.match(stripped):
+                table_rows.append(_table_cells(stripped))
+            continue
+        if table_rows:
+            out.append(_table(table_rows, tpl))
+            table_rows = []
+
+        if not stripped:
+            out.append(Spacer(1, 0.05 * inch))
+        elif stripped.startswith("#"):
+            level = len(stripped) - len(stripped.lstrip("#"))
+            title = stripped[level:].strip()
+            if level <= 2:
+                out.append(Spacer(1, 0.08 * inch))
+                out.append(Paragraph(f"<b>{_inline(title)}</b>", styles["SectionHead"]))
+            else:
+                out.append(Paragraph(_inline(title), styles["SubHead"]))
+        elif stripped.startswith(("- ", "* ")):
+            out.append(Paragraph(_inline(stripped[2:]), styles["ReportBullet"], bulletText="\u2022"))
+        elif (m := _NUMBERED.match(stripped)):
+            out.append(Paragraph(
+                _inline(stripped[m.end():]), styles["ReportBullet"], bulletText=f"{m.group(1)}.",
+            ))
+        else:
+            out.append(Paragraph(_inline(stripped), styles["ReportBody"]))
+
+    if table_rows:
+        out.append(_table(table_rows, tpl))
+    return out
+
+
+def _doc(buf, pack: dict, tpl: PdfTemplate) -> BaseDocTemplate:
+    case_id = str(pack.get("case_id", ""))
+
+    def _footer(canvas, doc):
+        canvas.saveState()
+        canvas.setFont(tpl.font, 7)
+        canvas.setFillColor(HexColor("#a1a1aa"))
+        canvas.drawString(_MARGIN, 0.5 * inch, case_id)
+        canvas.drawRightString(A4[0] - _MARGIN, 0.5 * inch, f"Sayfa {doc.page}")
+        canvas.restoreState()
+
+    frame = Frame(_MARGIN, _MARGIN, A4[0] - 2 * _MARGIN, A4[1] - 2 * _MARGIN, id="body")
+    return BaseDocTemplate(
+        buf, pagesize=A4,
+        leftMargin=_MARGIN, rightMargin=_MARGIN, topMargin=_MARGIN, bottomMargin=_MARGIN,
+        pageTemplates=[PageTemplate(id="report", frames=[frame], onPage=_footer)],
+        title=f"Radiology-Clean Audit Pack {case_id}",
+    )
+
+
+def generate_pdf(pack) -> bytes:
+    """Pack için PDF raporunu bellekte üretir ve bytes olarak döner."""
+    tpl = pdf_template()
+    styles = tpl.styles
+
+    buf = io.BytesIO()
+    doc = _doc(buf, pack, tpl)
     el = []
 
     # Baslik
     el.append(Paragraph("Radiology-Clean Audit Pack", styles["Title"]))
-    el.append(Paragraph(f"Vaka: {pack['case_id']}", styles["Normal"]))
+    el.append(Paragraph(f"Vaka: {escape(str(pack['case_id']))}", styles["Normal"]))
     el.append(Spacer(1, 0.15 * inch))
 
     # LI-RADS skoru
@@ -75,7 +254,7 @@ def generate_pdf(pack):
     color = _lirads_color(category)
 
     el.append(Paragraph(
-        f'<font color="{color}" size="14"><b>{decision}</b></font>',
+        f'<font color="{color}" size="14"><b>{escape(str(decision))}</b></font>',
         styles["Normal"],
     ))
     el.append(Spacer(1, 0.1 * inch))
@@ -84,14 +263,14 @@ def generate_pdf(pack):
     applied = lirads.get("applied_criteria", [])
     if applied:
         el.append(Paragraph(
-            f"Uygulanan kriterler: {', '.join(applied)}",
+            f"Uygulanan kriterler: {escape(', '.join(applied))}",
             styles["Meta"],
         ))
 
     hcc_ancillary = lirads.get("ancillary_favor_hcc", [])
     if hcc_ancillary:
         el.append(Paragraph(
-            f"HCC lehine yardimci: {', '.join(hcc_ancillary)}",
+            f"HCC lehine yardimci: {escape(', '.join(hcc_ancillary))}",
             styles["Meta"],
         ))
 
@@ -113,14 +292,14 @@ def generate_pdf(pack):
         if clinical.get("risk_factors"):
             parts.append(f"Risk faktorleri: {clinical['risk_factors']}")
         if parts:
-            el.append(Paragraph(" | ".join(parts), styles["ReportBody"]))
+            el.append(Paragraph(escape(" | ".join(parts)), styles["ReportBody"]))
         el.append(Spacer(1, 0.1 * inch))
 
     # DSL
     el.append(Paragraph("DSL Verileri", styles["SectionHead"]))
     dsl = content.get("dsl", {})
     el.append(Paragraph(
-        json.dumps(dsl, ensure_ascii=False, indent=2),
+        escape(json.dumps(dsl, ensure_ascii=False, indent=2)),
         styles["ReportBody"],
     ))
     el.append(Spacer(1, 0.15 * inch))
@@ -129,57 +308,21 @@ def generate_pdf(pack):
     agent_report = content.get("agent_report")
     if agent_report:
         el.append(Paragraph("Radyolog Ajan Raporu", styles["SectionHead"]))
-        # Rapor metnini paragraflara bol
-        for line in agent_report.split("\n"):
-            stripped = line.strip()
-            if not stripped:
-                el.append(Spacer(1, 0.05 * inch))
-                continue
-            if stripped.startswith("## "):
-                el.append(Spacer(1, 0.08 * inch))
-                el.append(Paragraph(
-                    f"<b>{stripped[3:]}</b>",
-                    styles["SectionHead"],
-                ))
-            elif stripped.startswith("**") and stripped.endswith("**"):
-                el.append(Paragraph(
-                    f"<b>{stripped[2:-2]}</b>",
-                    styles["ReportBody"],
-                ))
-            elif stripped.startswith("- ") or stripped.startswith("* "):
-                el.append(Paragraph(
-                    f"&bull; {stripped[2:]}",
-                    styles["ReportBody"],
-                ))
-            else:
-                # Inline bold
-                text = stripped.replace("**", "<b>", 1)
-                while "**" in text:
-                    text = text.replace("**", "</b>", 1)
-                    if "**" in text:
-                        text = text.replace("**", "<b>", 1)
-                el.append(Paragraph(text, styles["ReportBody"]))
+        el.extend(markdown_to_flowables(agent_report, tpl))
         el.append(Spacer(1, 0.15 * inch))
 
     # QR kod
-    qr = qrcode.make(pack["verify_url"])
-    qpath = os.path.join(OUTPUT_DIR, f"qr_{safe_id}.png")
-    qr.save(qpath)
-    el.append(Image(qpath, 1.5 * inch, 1.5 * inch))
-    el.append(Paragraph(pack["verify_url"], styles["Meta"]))
+    el.append(_qr_flowable(pack["verify_url"], 1.5 * inch))
+    el.append(Paragraph(escape(pack["verify_url"]), styles["Meta"]))
     el.append(Spacer(1, 0.05 * inch))
 
     # Imza bilgisi
     el.append(Paragraph(
         f"Imza: {pack.get('signature', '-')[:32]}... | "
         f"v{pack.get('version', 1)} | "
-        f"{pack.get('generated_at', '-')}",
+        f"{escape(str(pack.get('generated_at', '-')))}",
         styles["Meta"],
     ))
 
     doc.build(el)
-    try:
-        os.remove(qpath)
-    except OSError:
-        logger.warning("QR temp dosyası silinemedi: %s", qpath)
-    return path
+    return buf.getvalue()
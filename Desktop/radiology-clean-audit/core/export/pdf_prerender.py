@@ -0,0 +1,135 @@
+"""
+Kayıt sonrası arka planda PDF ön-render'ı.
+
+save_case kancası yeni versiyonu kuyruğa alır; tek bir daemon thread pack'i
+render servisine gönderip sonucu PDF önbelleğine yazar. Böylece kayıttan
+hemen sonraki ilk "PDF" tıklaması önbellekten döner.
+
+- Kuyruk case_id başına tekilleşir: art arda kayıtlarda yalnızca son
+  versiyon render edilir.
+- Kuyruk sınırlıdır (PDF_PRERENDER_QUEUE); doluysa yeni iş düşürülür.
+- Düşük öncelik: render servisinde interaktif iş varken ön-render yapılmaz,
+  iş düşürülür (ilk export o zaman normal yoldan render eder).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from core.export import pdf_service
+from core.export.pdf_cache import pdf_cache, pdf_key
+from store.store import register_save_hook, unregister_save_hook
+
+logger = logging.getLogger(__name__)
+
+PDF_PRERENDER = os.getenv("PDF_PRERENDER", "1") == "1"
+PDF_PRERENDER_QUEUE = int(os.getenv("PDF_PRERENDER_QUEUE", "32"))
+
+_pending: "OrderedDict[str, dict]" = OrderedDict()
+_cond = threading.Condition()
+_busy = False
+_thread: threading.Thread | None = None
+_stopping = False
+_stats = {"queued": 0, "deduplicated": 0, "dropped": 0, "rendered": 0, "cached": 0, "failed": 0}
+
+
+def enqueue(case_id: str, pack: dict) -> bool:
+    """Pack'i ön-render kuyruğuna alır. Kuyruk doluysa False (iş düşürüldü)."""
+    with _cond:
+        if case_id in _pending:
+            # Aynı vakanın eski versiyonu bekliyor: yerine geç
+            _pending[case_id] = pack
+            _stats["deduplicated"] += 1
+            return True
+        if len(_pending) >= PDF_PRERENDER_QUEUE:
+            _stats["dropped"] += 1
+            return False
+        _pending[case_id] = pack
+        _stats["queued"] += 1
+        _cond.notify()
+        return True
+
+
+def _render_one(pack: dict) -> None:
+    signature = pack.get("signature")
+    # Arka plan araması PDF isabet oranı istatistiğine girmez
+    if not signature or pdf_cache.get(pdf_key(signature), count=False) is not None:
+        with _cond:
+            _stats["cached"] += 1
+        return
+    # İnteraktif render varken havuzla yarışma
+    if pdf_service.render_stats()["inflight"] >= max(pdf_service.PDF_WORKERS, 1):
+        with _cond:
+            _stats["dropped"] += 1
+        return
+    try:
+        data = pdf_service.render_pdf(pack)
+    except pdf_service.PdfServiceOverloaded:
+        with _cond:
+            _stats["dropped"] += 1
+        return
+    except Exception:
+        logger.warning("PDF on-render basarisiz: %s", pack.get("case_id"), exc_info=True)
+        with _cond:
+            _stats["failed"] += 1
+        return
+    pdf_cache.put_bytes(pdf_key(signature), data)
+    with _cond:
+        _stats["rendered"] += 1
+
+
+def _worker() -> None:
+    global _busy
+    while True:
+        with _cond:
+            while not _pending and not _stopping:
+                _cond.wait()
+            if _stopping:
+                return
+            _, pack = _pending.popitem(last=False)
+            _busy = True
+        try:
+            _render_one(pack)
+        finally:
+            with _cond:
+                _busy = False
+                _cond.notify_all()
+
+
+def start() -> None:
+    """İşçi thread'ini başlatır ve save_case kancasını kaydeder."""
+    global _thread, _stopping
+    with _cond:
+        if _thread is not None and _thread.is_alive():
+            return
+        _stopping = False
+        _thread = threading.Thread(target=_worker, name="pdf-prerender", daemon=True)
+        _thread.start()
+    register_save_hook(enqueue)
+    logger.info("PDF on-render baslatildi (kuyruk: %d)", PDF_PRERENDER_QUEUE)
+
+
+def stop(timeout: float = 5.0) -> None:
+    """Kancayı kaldırır, bekleyen işleri bırakır ve thread'i durdurur."""
+    global _thread, _stopping
+    unregister_save_hook(enqueue)
+    with _cond:
+        _stopping = True
+        _pending.clear()
+        _cond.notify_all()
+        thread, _thread = _thread, None
+    if thread is not None:
+        thread.join(timeout)
+
+
+def wait_idle(timeout: float = 30.0) -> bool:
+    """Kuyruk boşalana ve işçi boşta kalana kadar bekler."""
+    with _cond:
+        return _cond.wait_for(lambda: not _pending and not _busy, timeout)
+
+
+def prerender_stats() -> dict:
+    with _cond:
+        return {**_stats, "pending": len(_pending), "max_queue": PDF_PRERENDER_QUEUE}
@@ -0,0 +1,340 @@
+"""
+PDF render servisi: ayrı işçi süreç havuzu, iş başına zaman aşımı, kuyruk sınırı.
+
+ReportLab render'ı saf Python ve CPU yoğundur; API worker'ında çalıştığında
+GIL'i tutup diğer istekleri yavaşlatır. Render'lar sınırlı bir süreç
+havuzunda yapılır. Aynı anda en fazla PDF_MAX_QUEUE iş (çalışan + bekleyen)
+kabul edilir; fazlası PdfServiceOverloaded ile hemen reddedilir (HTTP 503).
+
+Çalışmakta olan bir iş future.cancel() ile durdurulamaz. Zaman aşımında
+slot hemen geri verilir ve havuz yenilenir: yeni işler taze havuza gider,
+eski havuzdaki diğer işlere bitmeleri için en fazla PDF_RENDER_TIMEOUT
+tanınır, ardından eski süreçler (asılı render dahil) sonlandırılır. Böylece
+asılı render'lar kapasiteyi kalıcı olarak tüketmez. Slot sahipliği ve
+havuz başına bekleyen işler servisin kendi _jobs tablosunda, işçi PID'leri
+havuz başlatıcısının bildirdiği kuyrukta tutulur.
+PDF_WORKERS=0 render'ı çağıran thread'de yapar (geliştirme/test).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import signal
+import threading
+import time
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+
+from core.export.pdf_export import generate_pdf
+
+logger = logging.getLogger(__name__)
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "2"))
+PDF_MAX_QUEUE = int(os.getenv("PDF_MAX_QUEUE", "8"))
+PDF_RENDER_TIMEOUT = float(os.getenv("PDF_RENDER_TIMEOUT", "30"))
+
+
+class PdfServiceOverloaded(Exception):
+    pass
+
+
+class PdfRenderTimeout(Exception):
+    pass
+
+
+class _Pool:
+    """Yürütücü ve işçi PID'leri; her işçi başlarken PID'ini kuyruğa bildirir."""
+
+    def __init__(self):
+        ctx = get_context("spawn")
+        self._pid_queue = ctx.SimpleQueue()
+        self._pids: set[int] = set()
+        self.executor = ProcessPoolExecutor(
+            max_workers=PDF_WORKERS, mp_context=ctx, initializer=_report_pid, initargs=(self._pid_queue,),
+        )
+
+    def worker_pids(self) -> set[int]:
+        while not self._pid_queue.empty():
+            self._pids.add(self._pid_queue.get())
+        return set(self._pids)
+
+
+def _report_pid(queue) -> None:
+    queue.put(os.getpid())
+
+
+_pool: _Pool | None = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(PDF_MAX_QUEUE)
+# Slotu tutan işler → gönderildikleri havuz (bitiş veya zaman aşımında çıkarılır)
+_jobs: dict[Future, _Pool] = {}
+
+_metrics_lock = threading.Lock()
+_durations_ms: deque = deque(maxlen=500)
+_counters = {"renders": 0, "failures": 0, "timeouts": 0, "rejected": 0, "inflight": 0}
+
+
+def _get_pool() -> _Pool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = _Pool()
+            logger.info("PDF render havuzu baslatildi (%d isci)", PDF_WORKERS)
+        return _pool
+
+
+def _reset_pool(expected: _Pool | None = None) -> None:
+    """Havuzu kapatır; expected verilirse yalnızca hâlâ güncel havuz oysa."""
+    global _pool
+    with _pool_lock:
+        if expected is not None and _pool is not expected:
+            return
+        if _pool is not None:
+            _pool.executor.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _kill_workers(pool: _Pool) -> None:
+    for pid in pool.worker_pids():
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError:
+            pass  # zaten çıkmış
+
+
+def _retire_pool(pool: _Pool, stuck: Future, grace: float) -> None:
+    """
+    Asılı işi olan havuzu devreden çıkarır: yeni işler yeni havuza gider,
+    eski havuzdaki diğer işler en fazla grace saniye beklenir, sonra
+    eski süreçler sonlandırılır.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not pool:
+            return  # başka bir zaman aşımı zaten yeniledi
+        _pool = None
+        others = [f for f, p in _jobs.items() if p is pool and f is not stuck]
+
+    def _reap():
+        wait(others, timeout=grace)
+        pool.executor.shutdown(wait=False, cancel_futures=True)
+        # İşi alan işçi PID'ini henüz bildirmemiş olabilir: asılı iş, süreci
+        # sonlanıp BrokenProcessPool ile bitene kadar bildirilen PID'ler sonlandırılır
+        deadline = time.monotonic() + max(grace, 10.0)
+        while not stuck.done() and time.monotonic() < deadline:
+            _kill_workers(pool)
+            wait([stuck], timeout=0.1)
+        _kill_workers(pool)
+        # İşçiler çıkana kadar havuz (ve PID kuyruğu) canlı tutulur
+        pool.executor.shutdown(wait=stuck.done())
+        logger.warning("PDF render havuzu yenilendi (asili is sonlandirildi)")
+
+    threading.Thread(target=_reap, name="pdf-pool-reaper", daemon=True).start()
+
+
+def _count(name: str, delta: int = 1) -> None:
+    with _metrics_lock:
+        _counters[name] += delta
+
+
+def _release_slot() -> None:
+    _count("inflight", -1)
+    _slots.release()
+
+
+def _release_job(future: Future) -> None:
+    """Slot, iş bitişi ve zaman aşımından hangisi önce gelirse onda bir kez bırakılır."""
+    with _pool_lock:
+        owned = _jobs.pop(future, None) is not None
+    if owned:
+        _release_slot()
+
+
+def _acquire_slot(block: bool) -> None:
+    acquired = _slots.acquire(timeout=PDF_RENDER_TIMEOUT) if block else _slots.acquire(blocking=False)
+    if not acquired:
+        _count("rejected")
+        raise PdfServiceOverloaded("PDF render kuyrugu dolu")
+    _count("inflight")
+
+
+def _submit(pack: dict) -> tuple[Future, _Pool]:
+    """Slot alınmış olmalı; slot iş bittiğinde veya zaman aşımında serbest kalır."""
+    try:
+        try:
+            pool = _get_pool()
+            future = pool.executor.submit(generate_pdf, pack)
+        except BrokenProcessPool:
+            _reset_pool()
+            pool = _get_pool()
+            future = pool.executor.submit(generate_pdf, pack)
+    except BaseException:
+        _release_slot()
+        raise
+    with _pool_lock:
+        _jobs[future] = pool
+    future.add_done_callback(_release_job)
+    return future, pool
+
+
+def _record(started: float) -> None:
+    with _metrics_lock:
+        _counters["renders"] += 1
+        _durations_ms.append((time.perf_counter() - started) * 1000)
+
+
+def _timed_out(pack: dict, future: Future, pool: _Pool, timeout: float) -> PdfRenderTimeout:
+    _count("timeouts")
+    logger.warning("PDF render zaman asimi: %s (%.1f s)", pack.get("case_id"), timeout)
+    if not future.cancel():
+        # İşçide çalışıyor: iptal edilemez, süreç havuzla birlikte sonlandırılır
+        _retire_pool(pool, future, grace=PDF_RENDER_TIMEOUT)
+    _release_job(future)
+    return PdfRenderTimeout(f"PDF render {timeout:.0f} s icinde bitmedi")
+
+
+def _result(future: Future, pool: _Pool) -> bytes:
+    try:
+        return future.result(timeout=0)
+    except BrokenProcessPool:
+        _reset_pool(pool)
+        _count("failures")
+        raise
+    except Exception:
+        _count("failures")
+        raise
+
+
+def _render(pack: dict, timeout: float, block: bool) -> bytes:
+    _acquire_slot(block)
+    started = time.perf_counter()
+
+    if PDF_WORKERS <= 0:
+        try:
+            data = generate_pdf(pack)
+        except Exception:
+            _count("failures")
+            raise
+        finally:
+            _release_slot()
+    else:
+        future, pool = _submit(pack)
+        done, _ = wait([future], timeout=timeout)
+        if not done:
+            raise _timed_out(pack, future, pool, timeout)
+        data = _result(future, pool)
+
+    _record(started)
+    return data
+
+
+def render_pdf(pack: dict, timeout: float = PDF_RENDER_TIMEOUT) -> bytes:
+    """
+    Pack'in PDF'ini işçi havuzunda render eder.
+
+    Raises:
+        PdfServiceOverloaded: kuyruk dolu
+        PdfRenderTimeout: iş timeout saniye içinde bitmedi
+    """
+    return _render(pack, timeout, block=False)
+
+
+def iter_render(
+    packs: Iterable[dict],
+    max_inflight: int | None = None,
+    timeout: float = PDF_RENDER_TIMEOUT,
+) -> Iterator[tuple[dict, bytes | Exception]]:
+    """
+    Pack'leri paralel render eder; sonuçları bitiş sırasıyla (pack, pdf_bytes) verir.
+
+    Aynı anda en fazla max_inflight (varsayılan: işçi sayısı) iş açıktır;
+    pack'ler iterable'dan ancak yer açıldıkça çekilir. Toplu işler tekil
+    isteklerle aynı kuyruk slotlarını kullanır ama reddedilmek yerine slot
+    bekler. Başarısız/zaman aşımına uğrayan iş için bytes yerine exception döner.
+    """
+    if PDF_WORKERS <= 0:
+        for pack in packs:
+            try:
+                yield pack, _render(pack, timeout, block=True)
+            except Exception as e:
+                yield pack, e
+        return
+
+    max_inflight = max(1, max_inflight or PDF_WORKERS)
+    source = iter(packs)
+    exhausted = False
+    pending: dict[Future, tuple[dict, float, _Pool]] = {}
+    try:
+        while True:
+            while not exhausted and len(pending) < max_inflight:
+                pack = next(source, None)
+                if pack is None:
+                    exhausted = True
+                    break
+                try:
+                    _acquire_slot(block=True)
+                except PdfServiceOverloaded as e:
+                    yield pack, e
+                    continue
+                future, pool = _submit(pack)
+                pending[future] = (pack, time.perf_counter(), pool)
+            if not pending:
+                return
+
+            oldest = min(started for _, started, _ in pending.values())
+            remaining = max(0.0, oldest + timeout - time.perf_counter())
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            if not done:
+                now = time.perf_counter()
+                for future, (pack, started, pool) in list(pending.items()):
+                    if now - started >= timeout:
+                        del pending[future]
+                        yield pack, _timed_out(pack, future, pool, timeout)
+                continue
+            for future in done:
+                pack, started, pool = pending.pop(future)
+                try:
+                    data = _result(future, pool)
+                except Exception as e:
+                    yield pack, e
+                    continue
+                _record(started)
+                yield pack, data
+    finally:
+        # İstemci bağlantıyı keserse bekleyen işler iptal edilir
+        for future in pending:
+            future.cancel()
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    idx = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return round(sorted_values[idx], 1)
+
+
+def render_stats() -> dict:
+    """Render sayaçları ve son 500 render'ın süre dağılımı (ms)."""
+    with _metrics_lock:
+        counters = dict(_counters)
+        durations = sorted(_durations_ms)
+    timing = {}
+    if durations:
+        timing = {
+            "mean_ms": round(sum(durations) / len(durations), 1),
+            "p50_ms": _percentile(durations, 0.50),
+            "p95_ms": _percentile(durations, 0.95),
+            "max_ms": round(durations[-1], 1),
+        }
+    return {
+        **counters,
+        **timing,
+        "workers": PDF_WORKERS,
+        "max_queue": PDF_MAX_QUEUE,
+        "timeout_s": PDF_RENDER_TIMEOUT,
+    }
+
+
+def shutdown() -> None:
+    _reset_pool()
@@ -0,0 +1,94 @@
+"""
+/verify sonuçları için süreç içi önbellek.
+
+QR kodla açılan /verify/{case_id} her çağrıda pack'i yükleyip hash ve HMAC'i
+yeniden hesaplıyordu. Sonuç (case_id, saklı imza, pack hash) anahtarıyla
+saklanır; store'un kayıt/silme kancaları ilgili vakayı geçersiz kılar
+(modül import edildiğinde kaydolur).
+
+Geçersiz kılma süreç içidir: birden fazla uvicorn worker'ı varsa diğer
+worker'lardaki kayıtlar en fazla VERIFY_CACHE_TTL saniye eski kalabilir.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from core.export.audit_pack import _canon, _sha256_hex, verify_pack_full
+from store.store import register_delete_hook, register_save_hook
+
+VERIFY_CACHE_SIZE = int(os.getenv("VERIFY_CACHE_SIZE", "2048"))
+VERIFY_CACHE_TTL = float(os.getenv("VERIFY_CACHE_TTL", "300"))
+
+
+class VerifyEntry(NamedTuple):
+    key: tuple[str, str, str]  # (case_id, saklı imza, pack sha256)
+    result: dict
+    expires_at: float
+
+    @property
+    def signature(self) -> str:
+        return self.key[1]
+
+    @property
+    def pack_sha256(self) -> str:
+        return self.key[2]
+
+
+_entries: "OrderedDict[str, VerifyEntry]" = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def get_verification(case_id: str) -> Optional[VerifyEntry]:
+    """Önbellekteki doğrulama sonucunu döner (yoksa veya süresi dolduysa None)."""
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(case_id)
+        if entry is None or entry.expires_at <= now:
+            if entry is not None:
+                del _entries[case_id]
+            _stats["misses"] += 1
+            return None
+        _entries.move_to_end(case_id)
+        _stats["hits"] += 1
+        return entry
+
+
+def store_verification(case_id: str, pack: dict) -> VerifyEntry:
+    """Pack'i doğrular ve sonucu önbelleğe yazar."""
+    key = (case_id, pack.get("signature") or "", _sha256_hex(_canon(pack)))
+    entry = VerifyEntry(key, verify_pack_full(pack), time.monotonic() + VERIFY_CACHE_TTL)
+    with _lock:
+        _entries[case_id] = entry
+        _entries.move_to_end(case_id)
+        while len(_entries) > VERIFY_CACHE_SIZE:
+            _entries.popitem(last=False)
+    return entry
+
+
+def invalidate(case_id: str) -> None:
+    """Vaka kaydedildiğinde/silindiğinde önbellek kaydını düşürür."""
+    with _lock:
+        _entries.pop(case_id, None)
+
+
+def _on_save(case_id: str, _audit_pack: dict) -> None:
+    invalidate(case_id)
+
+
+register_save_hook(_on_save)
+register_delete_hook(invalidate)
+
+
+def clear() -> None:
+    with _lock:
+        _entries.clear()
+
+
+def cache_stats() -> dict:
+    with _lock:
+        return {**_stats, "size": len(_entries)}
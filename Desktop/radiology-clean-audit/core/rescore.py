@@ -0,0 +1,186 @@
+"""
+Geriye dönük LI-RADS yeniden skorlama işi.
+
+LI-RADS motoru değiştiğinde hangi saklı vakaların kategorisinin değişeceğini
+raporlar. Vakalar store'dan parça parça okunur, DSL'ler bir işçi süreç
+havuzunda toplu motorla skorlanır. İstenirse değişen vakaların yeni
+versiyonları toplu kayıt yoluyla yazılır.
+
+CLI:
+    python -m core.rescore --workers 4 --chunk-size 500 [--write] [--out rapor.json]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context
+
+from dotenv import load_dotenv
+load_dotenv()  # AUDIT_SECRET audit_pack import edilmeden önce okunmalı
+
+from core.export.audit_pack import (
+    LIRADS_CATEGORIES,
+    dsls_to_columns,
+    rescore_pack,
+    run_lirads_decision,
+    run_lirads_decision_batch,
+)
+from store.store import iter_case_packs, save_cases_batch
+
+logger = logging.getLogger(__name__)
+
+RESCORE_WORKERS = int(os.getenv("RESCORE_WORKERS", str(os.cpu_count() or 1)))
+RESCORE_CHUNK_SIZE = int(os.getenv("RESCORE_CHUNK_SIZE", "500"))
+# POST /admin/rescore istek içinde çalışır: API sürecinin yanında açılan
+# havuz küçük tutulur. Büyük işler için CLI (--workers) kullanılmalı.
+RESCORE_HTTP_MAX_WORKERS = max(1, int(os.getenv("RESCORE_HTTP_MAX_WORKERS", "2")))
+
+
+def _score_chunk(dsls: list[dict]) -> list[str | None]:
+    """Bir parça DSL'i skorlar (işçi süreçte çalışır). Okunamayan DSL → None."""
+    try:
+        codes = run_lirads_decision_batch(**dsls_to_columns(dsls))
+        return [LIRADS_CATEGORIES[c] for c in codes]
+    except (TypeError, ValueError, AttributeError, OverflowError):
+        # Bozuk kayıt(lar) var — tek tek skorla, sadece bozukları işaretle
+        results = []
+        for dsl in dsls:
+            try:
+                results.append(run_lirads_decision(dsl)["category"])
+            except (TypeError, ValueError, AttributeError, OverflowError):
+                results.append(None)
+        return results
+
+
+def rescore_cases(
+    workers: int = RESCORE_WORKERS,
+    chunk_size: int = RESCORE_CHUNK_SIZE,
+    write: bool = False,
+    created_by: str = "rescore",
+    verify_base_url: str = None,
+) -> dict:
+    """
+    Tüm saklı vakaları güncel motorla yeniden skorlar ve fark raporu döner.
+
+    workers <= 1 ise skorlama aynı süreçte yapılır.
+    write=True ise kategorisi değişen vakalar için yeni versiyon kaydedilir;
+    okunduktan sonra başka bir kayıtla güncellenen vakalar yazılmaz,
+    "conflicts" listesinde raporlanır.
+    """
+    verify_base_url = verify_base_url or os.getenv("VERIFY_BASE_URL", "http://localhost:8000")
+    started = time.perf_counter()
+
+    total = 0
+    errors: list[str] = []
+    changes: list[dict] = []
+    transitions: Counter = Counter()
+    conflicts: list[str] = []
+    written = 0
+
+    def _collect(chunk: list[tuple[str, dict]], categories: list[str | None]) -> None:
+        nonlocal total, written
+        to_write = []
+        base_versions: dict[str, int] = {}
+        for (case_id, pack), new_cat in zip(chunk, categories):
+            total += 1
+            if pack is None or new_cat is None:
+                errors.append(case_id)
+                continue
+            old_cat = ((pack.get("content") or {}).get("lirads") or {}).get("category")
+            if old_cat == new_cat:
+                continue
+            transitions[f"{old_cat}→{new_cat}"] += 1
+            changes.append({
+                "case_id": case_id,
+                "version": pack.get("version", 1),
+                "old_category": old_cat,
+                "new_category": new_cat,
+            })
+            if write:
+                to_write.append((case_id, rescore_pack(pack, verify_base_url)))
+                base_versions[case_id] = pack.get("version", 1)
+        if to_write:
+            # Okuma ile yazma arasında güncellenen vakalar atlanır (bir sonraki
+            # çalıştırmada güncel versiyondan yeniden skorlanır)
+            saved = save_cases_batch(to_write, created_by=created_by, base_versions=base_versions)
+            written += len(saved)
+            saved_ids = set(saved)
+            conflicts.extend(cid for cid, _ in to_write if cid not in saved_ids)
+
+    def _dsls(chunk):
+        return [((pack or {}).get("content") or {}).get("dsl") or {} for _, pack in chunk]
+
+    if workers <= 1:
+        for chunk in iter_case_packs(chunk_size):
+            _collect(chunk, _score_chunk(_dsls(chunk)))
+    else:
+        # Bellekte en fazla 2×workers parça tutulur
+        max_pending = workers * 2
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+            pending = {}
+            for chunk in iter_case_packs(chunk_size):
+                pending[pool.submit(_score_chunk, _dsls(chunk))] = chunk
+                if len(pending) >= max_pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        _collect(pending.pop(fut), fut.result())
+            for fut in list(pending):
+                _collect(pending.pop(fut), fut.result())
+
+    report = {
+        "total": total,
+        "changed": len(changes),
+        "unchanged": total - len(changes) - len(errors),
+        "errors": errors,
+        "transitions": dict(transitions.most_common()),
+        "changes": changes,
+        "written": written,
+        "conflicts": conflicts,
+        "workers": max(workers, 1),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    logger.info(
+        "Yeniden skorlama: %d vaka, %d degisti, %d yazildi (%.0f ms)",
+        total, len(changes), written, report["elapsed_ms"],
+    )
+    return report
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Saklı vakaları güncel LI-RADS motoruyla yeniden skorla.")
+    parser.add_argument("--workers", type=int, default=RESCORE_WORKERS, help="İşçi süreç sayısı (1 = aynı süreç)")
+    parser.add_argument("--chunk-size", type=int, default=RESCORE_CHUNK_SIZE, help="Parça başına vaka sayısı")
+    parser.add_argument("--write", action="store_true", help="Değişen vakalar için yeni versiyon kaydet")
+    parser.add_argument("--user", default="rescore", help="Yeni versiyonlarda created_by değeri")
+    parser.add_argument("--out", help="Raporu JSON olarak bu dosyaya yaz")
+    args = parser.parse_args(argv)
+
+    from db import init_db
+    init_db()
+
+    report = rescore_cases(
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        write=args.write,
+        created_by=args.user,
+    )
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"Toplam: {report['total']}  Degisen: {report['changed']}  "
+          f"Hatali: {len(report['errors'])}  Yazilan: {report['written']}  "
+          f"Cakisan: {len(report['conflicts'])}")
+    for transition, count in report["transitions"].items():
+        print(f"  {transition}: {count}")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    raise SystemExit(main())
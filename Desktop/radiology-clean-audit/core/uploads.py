@@ -0,0 +1,186 @@
+"""
+Büyük DICOM yüklemeleri için boyut sınırları ve diske akıtma.
+
+- UploadSizeLimitMiddleware: belirtilen yollarda Content-Length sınırı aşıyorsa
+  gövde hiç okunmadan, aşmıyorsa (veya yoksa) okunan toplam sınırı geçtiği an
+  413 yanıtını kendisi gönderir (uygulamanın okuması kesilir).
+- spool_upload: UploadFile'ı parça parça adlandırılmış geçici dosyaya kopyalar
+  (dosya başına sınırla) ve kopyalarken SHA-256'sını hesaplar; DICOM okuyucu
+  dosyayı yoldan mmap ile açar. spool_chunks aynısını herhangi bir async
+  parça akışı için yapar (ZIP üyeleri, bkz. core.agent.dicom_archive).
+  Yazma ve hash, parçalar toplanarak worker thread'de yapılır; event loop
+  disk G/Ç'si ile bloklanmaz.
+
+Starlette multipart ayrıştırıcısı dosya parçalarını zaten 1 MB üstünde diske
+taşan SpooledTemporaryFile'lara yazar; böylece hiçbir aşamada bütün seri
+bellekte tutulmaz.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import NamedTuple
+
+from fastapi import HTTPException, UploadFile
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+DICOM_MAX_REQUEST_MB = int(os.getenv("DICOM_MAX_REQUEST_MB", "1024"))
+DICOM_MAX_FILE_MB = int(os.getenv("DICOM_MAX_FILE_MB", "512"))
+DICOM_UPLOAD_DIR = os.getenv("DICOM_UPLOAD_DIR") or None  # None: sistem geçici dizini
+# ZIP arşivindeki tüm üyelerin (atlananlar dahil) açılmış boyut toplamı (sıkıştırılmış gövde DICOM_MAX_REQUEST_MB ile sınırlı)
+DICOM_MAX_ARCHIVE_MB = int(os.getenv("DICOM_MAX_ARCHIVE_MB", "4096"))
+
+CHUNK_SIZE = 1024 * 1024
+# Thread'e tek seferde verilen yazma+hash miktarı (thread geçiş maliyetini böler)
+SPOOL_BATCH_BYTES = 8 * CHUNK_SIZE
+
+_TOO_LARGE = "Yukleme boyutu siniri asildi"
+
+
+class SpooledFile(NamedTuple):
+    filename: str
+    path: str
+    sha256: str
+
+
+class _BodyTooLarge(Exception):
+    """Okunan gövde sınırı aştı; uygulamanın okumasını keser (middleware yakalar)."""
+
+
+class UploadSizeLimitMiddleware:
+    """Yalnızca paths ile başlayan POST isteklerinin gövde boyutunu sınırlar."""
+
+    def __init__(self, app, max_bytes: int, paths: tuple[str, ...]):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or not scope["path"].startswith(self.paths)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > self.max_bytes:
+            logger.warning("Yukleme reddedildi: Content-Length %s > %d (%s)", declared.decode(), self.max_bytes, scope["path"])
+            response = JSONResponse(status_code=413, content={"detail": _TOO_LARGE})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+        too_large = False
+        started = False
+
+        async def limited_receive():
+            nonlocal received, too_large
+            if too_large:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    too_large = True
+                    logger.warning("Yukleme reddedildi: govde %d bayti asti (%s)", self.max_bytes, scope["path"])
+                    raise _BodyTooLarge
+            return message
+
+        async def tracked_send(message):
+            nonlocal started
+            if too_large:
+                return  # 413'ü middleware gönderir; uygulamanın yanıtı yutulur
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except Exception:
+            # Uygulama hatayı başka bir istisnaya sarmış olabilir
+            if not too_large:
+                raise
+        if too_large and not started:
+            response = JSONResponse(status_code=413, content={"detail": _TOO_LARGE})
+            await response(scope, receive, send)
+
+
+def _write_batch(out, digest, batch: list[bytes]) -> None:
+    for chunk in batch:
+        out.write(chunk)
+        digest.update(chunk)
+
+
+async def spool_chunks(
+    filename: str,
+    chunks: AsyncIterator[bytes],
+    max_bytes: int = DICOM_MAX_FILE_MB * 1024 * 1024,
+) -> SpooledFile:
+    """
+    Parça akışını geçici dosyaya yazar; yolunu ve içerik hash'ini döner.
+
+    Sınır aşılırsa dosya silinir ve 413 fırlatılır. Dosyayı silmek çağıranın
+    sorumluluğundadır (bkz. spooled_uploads).
+    """
+    fd, path = tempfile.mkstemp(suffix=".dcm", dir=DICOM_UPLOAD_DIR)
+    digest = hashlib.sha256()
+    written = 0
+    batch: list[bytes] = []
+    batch_bytes = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            async for chunk in chunks:
+                written += len(chunk)
+                if written > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"{filename}: dosya boyutu siniri ({max_bytes // (1024 * 1024)} MB) asildi",
+                    )
+                batch.append(chunk)
+                batch_bytes += len(chunk)
+                if batch_bytes >= SPOOL_BATCH_BYTES:
+                    await asyncio.to_thread(_write_batch, out, digest, batch)
+                    batch, batch_bytes = [], 0
+            if batch:
+                await asyncio.to_thread(_write_batch, out, digest, batch)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return SpooledFile(filename, path, digest.hexdigest())
+
+
+async def _upload_chunks(upload: UploadFile) -> AsyncIterator[bytes]:
+    while chunk := await upload.read(CHUNK_SIZE):
+        yield chunk
+
+
+async def spool_upload(upload: UploadFile, max_bytes: int = DICOM_MAX_FILE_MB * 1024 * 1024) -> SpooledFile:
+    """Yüklemeyi parça parça geçici dosyaya yazar (bkz. spool_chunks)."""
+    return await spool_chunks(upload.filename, _upload_chunks(upload), max_bytes)
+
+
+@asynccontextmanager
+async def spooled_uploads(uploads: list[UploadFile], max_file_bytes: int = DICOM_MAX_FILE_MB * 1024 * 1024):
+    """Dosya adı olan yüklemeleri diske yazar, SpooledFile listesi verir; çıkışta siler."""
+    files: list[SpooledFile] = []
+    try:
+        for upload in uploads:
+            if not upload.filename:
+                continue
+            files.append(await spool_upload(upload, max_file_bytes))
+        yield files
+    finally:
+        for f in files:
+            try:
+                os.unlink(f.path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,279 @@
+"""
+ZIP arşivini baştan sona tek geçişte, bayt akışından okur.
+
+zipfile merkezi dizini (dosya sonu) okumak için dosyanın tamamını ister;
+burada yerel dosya başlıkları sırayla ayrıştırılır ve her üye yükleme
+sürerken parça parça verilir. Bellekte en fazla bir ağ parçası + bir
+decompress parçası tutulur.
+
+- Desteklenen yöntemler: stored (0) ve deflate (8); Zip64 boyutları.
+- Veri tanımlayıcılı (bit 3) üyeler: deflate sonu decompressor'dan bulunur;
+  boyutu bilinmeyen stored üye ayrıştırılamaz (ZipStreamError).
+- Şifreli üyeler reddedilir; okunan her üyenin CRC-32'si doğrulanır.
+- Okunmayan üye, sıkıştırılmış boyutu biliniyorsa açılmadan (ham baytları
+  atılarak) atlanır; yalnızca boyutu bilinmeyen deflate üye açılarak atlanır.
+- max_unpacked: okunan ve atlanan tüm üyelerin açılmış boyut toplamı
+  sınırı (açılmadan atlanan üyede başlıktaki boyut sayılır); aşılırsa
+  ZipSizeLimitError.
+- Inflate event loop dışında (thread'de) yapılır; zlib GIL'i bırakır.
+- Merkezi dizine gelindiğinde okuma biter, kalan gövde tüketilir.
+"""
+from __future__ import annotations
+
+import asyncio
+import struct
+import zlib
+from collections.abc import AsyncIterator
+
+_LOCAL_HEADER = b"PK\x03\x04"
+_DATA_DESCRIPTOR = b"PK\x07\x08"
+_END_SIGNATURES = (b"PK\x01\x02", b"PK\x05\x06", b"PK\x06\x06", b"PK\x06\x07")
+_LOCAL_STRUCT = struct.Struct("<HHHHHIIIHH")
+_ZIP64_EXTRA = 0x0001
+_ZIP64_MARKER = 0xFFFFFFFF
+_FLAG_ENCRYPTED = 0x1
+_FLAG_DESCRIPTOR = 0x8
+_FLAG_UTF8 = 0x800
+
+STORED, DEFLATED = 0, 8
+CHUNK_SIZE = 1024 * 1024
+
+
+class ZipStreamError(ValueError):
+    """Akış geçerli (veya desteklenen) bir ZIP değil."""
+
+
+class ZipSizeLimitError(ZipStreamError):
+    """Üyelerin açılmış boyut toplamı max_unpacked'i aştı."""
+
+
+class _Budget:
+    """Okunan ve atlanan tüm üyelerin açılmış boyut toplamı."""
+
+    def __init__(self, limit: int | None):
+        self.limit = limit
+        self.used = 0
+
+    def spend(self, n: int, name: str) -> None:
+        self.used += n
+        if self.limit is not None and self.used > self.limit:
+            raise ZipSizeLimitError(f"{name}: arsiv acilmis boyut siniri ({self.limit} bayt) asildi")
+
+
+class _Buffer:
+    """Async bayt akışı üstünde ileri okunabilir tampon."""
+
+    def __init__(self, chunks: AsyncIterator[bytes]):
+        self._chunks = chunks.__aiter__()
+        self._buf = bytearray()
+        self._eof = False
+
+    async def _fill(self) -> bool:
+        while not self._eof:
+            try:
+                chunk = await self._chunks.__anext__()
+            except StopAsyncIteration:
+                self._eof = True
+                return False
+            if chunk:
+                self._buf += chunk
+                return True
+        return False
+
+    async def read_exact(self, n: int) -> bytes:
+        while len(self._buf) < n:
+            if not await self._fill():
+                raise ZipStreamError("Arsiv beklenmedik sekilde bitti")
+        data = bytes(self._buf[:n])
+        del self._buf[:n]
+        return data
+
+    async def read_some(self, limit: int) -> bytes:
+        """En fazla limit bayt; akış bittiyse b""."""
+        if not self._buf and not await self._fill():
+            return b""
+        data = bytes(self._buf[:limit])
+        del self._buf[:limit]
+        return data
+
+    async def discard(self, n: int) -> None:
+        """n baytı kopyalamadan atar."""
+        while n:
+            if not self._buf and not await self._fill():
+                raise ZipStreamError("Arsiv beklenmedik sekilde bitti")
+            take = min(n, len(self._buf))
+            del self._buf[:take]
+            n -= take
+
+    def unread(self, data: bytes) -> None:
+        self._buf[:0] = data
+
+    async def drain(self) -> None:
+        self._buf.clear()
+        while await self._fill():
+            self._buf.clear()
+
+
+class ZipEntry:
+    """Akıştaki tek üye; data() bir kez ve sırayla tüketilir."""
+
+    def __init__(
+        self,
+        name: str,
+        method: int,
+        flags: int,
+        crc: int,
+        size: int | None,
+        unpacked: int,
+        zip64: bool,
+        buf: _Buffer,
+        budget: _Budget,
+    ):
+        self.name = name
+        self.method = method
+        self._flags = flags
+        self._crc = crc
+        self._size = size  # sıkıştırılmış boyut; veri tanımlayıcıda ise None
+        self._unpacked = unpacked  # başlıktaki açılmış boyut (yalnızca açılmadan atlamada sayılır)
+        self._zip64 = zip64
+        self._buf = buf
+        self._budget = budget
+        self._started = False
+        self._finished = False
+
+    @property
+    def is_dir(self) -> bool:
+        return self.name.endswith("/")
+
+    async def data(self, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Açılmış içerik parçaları; sonunda CRC doğrulanır."""
+        if self._started:
+            raise ZipStreamError(f"{self.name}: uye zaten okundu")
+        self._started = True
+        crc = 0
+        async for piece in self._raw(chunk_size):
+            self._budget.spend(len(piece), self.name)
+            crc = zlib.crc32(piece, crc)
+            yield piece
+        if self._flags & _FLAG_DESCRIPTOR:
+            await self._read_descriptor()
+        if crc != self._crc:
+            raise ZipStreamError(f"{self.name}: CRC uyusmuyor")
+        self._finished = True
+
+    async def skip(self) -> None:
+        """Okunmamış üyeyi atlar; sıkıştırılmış boyut biliniyorsa açmadan."""
+        if self._started:
+            if not self._finished:
+                raise ZipStreamError(f"{self.name}: uye yarim birakildi")
+            return
+        if self._size is None:
+            # Veri tanımlayıcılı deflate: üyenin sonu ancak açılarak bulunur
+            async for _ in self.data():
+                pass
+            return
+        self._started = True
+        self._budget.spend(self._unpacked, self.name)
+        await self._buf.discard(self._size)
+        if self._flags & _FLAG_DESCRIPTOR:
+            # Başlıkta boyut yoksa açılmış boyut tanımlayıcıdan sayılır
+            self._budget.spend(max(await self._read_descriptor() - self._unpacked, 0), self.name)
+        self._finished = True
+
+    async def _raw(self, chunk_size: int) -> AsyncIterator[bytes]:
+        if self.method == STORED:
+            if self._size is None:
+                raise ZipStreamError(f"{self.name}: boyutu bilinmeyen stored uye desteklenmiyor")
+            remaining = self._size
+            while remaining:
+                piece = await self._buf.read_some(min(remaining, chunk_size))
+                if not piece:
+                    raise ZipStreamError("Arsiv beklenmedik sekilde bitti")
+                remaining -= len(piece)
+                yield piece
+            return
+
+        inflater = zlib.decompressobj(-zlib.MAX_WBITS)
+        remaining = self._size
+        while not inflater.eof:
+            want = chunk_size if remaining is None else min(remaining, chunk_size)
+            piece = await self._buf.read_some(want) if want else b""
+            if not piece:
+                raise ZipStreamError(f"{self.name}: deflate verisi eksik")
+            if remaining is not None:
+                remaining -= len(piece)
+            # max_length: küçük girdi çok büyük çıktıya açılsa da parça sınırlı kalır (zip bombası)
+            while piece and not inflater.eof:
+                try:
+                    out = await asyncio.to_thread(inflater.decompress, piece, chunk_size)
+                except zlib.error as exc:
+                    raise ZipStreamError(f"{self.name}: {exc}") from exc
+                piece = inflater.unconsumed_tail
+                if out:
+                    yield out
+        if inflater.unused_data:
+            self._buf.unread(inflater.unused_data)
+
+    async def _read_descriptor(self) -> int:
+        """CRC'yi tanımlayıcıdan alır; açılmış boyutu döner."""
+        head = await self._buf.read_exact(4)
+        if head == _DATA_DESCRIPTOR:
+            head = await self._buf.read_exact(4)
+        (self._crc,) = struct.unpack("<I", head)
+        sizes = await self._buf.read_exact(16 if self._zip64 else 8)
+        return struct.unpack("<QQ" if self._zip64 else "<II", sizes)[1]
+
+
+def _zip64_sizes(extra: bytes, usize: int, csize: int) -> tuple[int, int, bool]:
+    pos = 0
+    while pos + 4 <= len(extra):
+        tag, length = struct.unpack_from("<HH", extra, pos)
+        body = extra[pos + 4:pos + 4 + length]
+        if tag == _ZIP64_EXTRA:
+            values = iter(struct.unpack_from(f"<{len(body) // 8}Q", body))
+            if usize == _ZIP64_MARKER:
+                usize = next(values, usize)
+            if csize == _ZIP64_MARKER:
+                csize = next(values, csize)
+            return usize, csize, True
+        pos += 4 + length
+    return usize, csize, False
+
+
+async def iter_zip(chunks: AsyncIterator[bytes], max_unpacked: int | None = None) -> AsyncIterator[ZipEntry]:
+    """
+    Üyeleri akış sırasıyla verir. Bir sonraki üyeye geçmeden önce okunmayan
+    veri atlanır; çağıran data()'yı tüketmek zorunda değildir.
+    """
+    buf = _Buffer(chunks)
+    budget = _Budget(max_unpacked)
+    entry: ZipEntry | None = None
+    while True:
+        if entry is not None:
+            await entry.skip()
+        try:
+            signature = await buf.read_exact(4)
+        except ZipStreamError:
+            if entry is None:
+                raise ZipStreamError("Bos veya ZIP olmayan govde") from None
+            raise
+        if signature in _END_SIGNATURES:
+            await buf.drain()
+            return
+        if signature != _LOCAL_HEADER:
+            raise ZipStreamError("ZIP yerel dosya basligi bekleniyordu")
+
+        _, flags, method, _, _, crc, csize, usize, name_len, extra_len = _LOCAL_STRUCT.unpack(
+            await buf.read_exact(_LOCAL_STRUCT.size)
+        )
+        raw_name = await buf.read_exact(name_len)
+        extra = await buf.read_exact(extra_len)
+        name = raw_name.decode("utf-8" if flags & _FLAG_UTF8 else "cp437")
+        if flags & _FLAG_ENCRYPTED:
+            raise ZipStreamError(f"{name}: sifreli uyeler desteklenmiyor")
+        if method not in (STORED, DEFLATED):
+            raise ZipStreamError(f"{name}: desteklenmeyen sikistirma yontemi ({method})")
+        usize, csize, zip64 = _zip64_sizes(extra, usize, csize)
+        size = None if flags & _FLAG_DESCRIPTOR and csize in (0, _ZIP64_MARKER) else csize
+        entry = ZipEntry(name, method, flags, crc, size, usize if size is not None else 0, zip64, buf, budget)
+        yield entry
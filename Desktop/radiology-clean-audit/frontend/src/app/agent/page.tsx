@@ -7,6 +7,7 @@ import { Button } from "@/components/ui/Button";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/Card";
 import { getToken, clearToken } from "@/lib/auth";
 import { API_BASE } from "@/lib/constants";
+import ImageViewer from "@/components/ImageViewer";
 import type {
   LabResult,
   ChecklistItem,
@@ -92,6 +93,10 @@ export default function AgentPage() {
 
   const [form, setForm] = useState<ClinicalForm>(defaultForm);
   const [dicomFiles, setDicomFiles] = useState<File[]>([]);
+  // Yuklenen DICOM seti sunucuda saklanir; form duzenlenip yeniden analiz edilince tekrar yuklenmez
+  const [studyId, setStudyId] = useState<string | null>(null);
+  // Goruntuleyici: /studies/{id}/slices seviyeleri (thumb -> medium -> full)
+  const [viewerImages, setViewerImages] = useState<any[] | null>(null);
 
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
@@ -111,6 +116,7 @@ export default function AgentPage() {
 
   // ── Yeni Özellikler State ──
   const [educationMode, setEducationMode] = useState(false);
+  const [montageMode, setMontageMode] = useState(false);
   const [confidenceData, setConfidenceData] = useState<ConfidenceData | null>(null);
   const [criticalFindings, setCriticalFindings] = useState<CriticalFinding[]>([]);
   const [labResults, setLabResults] = useState<LabResult[]>([]);
@@ -267,15 +273,47 @@ export default function AgentPage() {
       prior_cases: priorIncluded ? priorCases : [],
     };
 
-    const body = new FormData();
-    body.append("clinical_json", JSON.stringify(enrichedForm));
-    body.append("education_mode", educationMode ? "true" : "false");
-    for (const f of dicomFiles) {
-      body.append("dicoms", f, f.name);
-    }
-
     setLoading(true);
     try {
+      let currentStudy = studyId;
+      if (!currentStudy && dicomFiles.length > 0) {
+        // Tek ZIP: ham govde olarak gonderilir, sunucu uyeleri yukleme surerken acar
+        const archive = dicomFiles.length === 1 && /\.zip$/i.test(dicomFiles[0].name) ? dicomFiles[0] : null;
+        let up: Response;
+        if (archive) {
+          up = await fetch(`${API}/studies/archive`, {
+            method: "POST",
+            headers: { Authorization: `Bearer ${token}`, "Content-Type": "application/zip" },
+            body: archive,
+          });
+        } else {
+          const upload = new FormData();
+          for (const f of dicomFiles) {
+            upload.append("dicoms", f, f.webkitRelativePath || f.name);
+          }
+          up = await fetch(`${API}/studies`, {
+            method: "POST",
+            headers: { Authorization: `Bearer ${token}` },
+            body: upload,
+          });
+        }
+        if (up.status === 401) { clearToken(); router.replace("/"); return; }
+        if (!up.ok) {
+          const detail = await up.json().catch(() => ({}));
+          throw new Error(detail?.detail ?? `HTTP ${up.status}`);
+        }
+        currentStudy = (await up.json()).study_id as string;
+        setStudyId(currentStudy);
+      }
+
+      const body = new FormData();
+      body.append("clinical_json", JSON.stringify(enrichedForm));
+      body.append("education_mode", educationMode ? "true" : "false");
+      body.append("layout", montageMode ? "montage" : "single");
+      if (currentStudy) {
+        body.append("study_id", currentStudy);
+      }
+
       const res = await fetch(`${API}/agent/analyze`, {
         method: "POST",
         headers: { Authorization: `Bearer ${token}` },
@@ -454,6 +492,27 @@ export default function AgentPage() {
     return [...new Set(seqs)];
   })();
 
+
+  async function openViewer() {
+    const token = getToken();
+    if (!token || !studyId) return;
+    const res = await fetch(`${API}/studies/${studyId}/slices`, {
+      headers: { Authorization: `Bearer ${token}` },
+    });
+    if (res.status === 401) { clearToken(); router.replace("/"); return; }
+    if (!res.ok) { setError(`Goruntuler alinamadi (HTTP ${res.status})`); return; }
+    const data = await res.json();
+    setViewerImages(
+      data.slices.map((s: any) => ({
+        label: s.label,
+        width: s.columns,
+        height: s.rows,
+        levels: Object.fromEntries(
+          Object.entries(s.levels).map(([level, url]) => [level, `${API}${url}`]),
+        ),
+      })),
+    );
+  }
   return (
     <div className="space-y-6">
       {/* Baslik */}
@@ -478,6 +537,24 @@ export default function AgentPage() {
             />
             <span className="text-sm font-medium text-zinc-700 dark:text-zinc-300">Egitim Modu</span>
           </label>
+          {/* Montaj Modu: her goruntu bir serinin 2x2 dilim montaji */}
+          <label
+            className="flex items-center gap-2 cursor-pointer bg-zinc-100 dark:bg-zinc-800 border border-zinc-200 dark:border-zinc-700 rounded-lg px-3 py-2"
+            title="Ayni token butcesinde daha fazla dilim: 4 komsu dilim tek goruntude"
+          >
+            <input
+              type="checkbox"
+              checked={montageMode}
+              onChange={(e) => setMontageMode(e.target.checked)}
+              className="h-4 w-4 accent-indigo-600 rounded"
+            />
+            <span className="text-sm font-medium text-zinc-700 dark:text-zinc-300">Montaj (2x2)</span>
+          </label>
+          {studyId && (
+            <Button variant="secondary" onClick={openViewer}>
+              Goruntuleri Ac
+            </Button>
+          )}
           {report && (
             <Button variant="secondary" onClick={copyReport}>
               Raporu Kopyala
@@ -489,6 +566,14 @@ export default function AgentPage() {
       {/* Kritik Bulgu Alarm Banner - en üstte */}
       <CriticalAlertBanner findings={criticalFindings} />
 
+      {viewerImages && (
+        <ImageViewer
+          images={viewerImages}
+          authToken={getToken() ?? undefined}
+          onClose={() => setViewerImages(null)}
+        />
+      )}
+
       {/* Form */}
       <form onSubmit={handleSubmit} className="space-y-5">
         {/* ─── 1. Klinik Bilgiler ──────────────────────────────────────────── */}
@@ -962,7 +1047,7 @@ export default function AgentPage() {
             <CardTitle>DICOM Goruntuleri (Opsiyonel)</CardTitle>
           </CardHeader>
           <CardContent>
-            <DicomDropzone files={dicomFiles} onFiles={setDicomFiles} />
+            <DicomDropzone files={dicomFiles} onFiles={(files) => { setDicomFiles(files); setStudyId(null); setViewerImages(null); }} />
             <p className="text-xs text-zinc-400 dark:text-zinc-500 dark:text-zinc-500 mt-2">
               Goruntu yuklerseniz ajan hem metin bulgularini hem de goruntuyu birlikte degerlendirir.
             </p>
@@ -6,9 +6,17 @@ import { useCallback, useEffect, useRef, useState } from "react";
 // Types
 // ---------------------------------------------------------------------------
 
+type PyramidLevel = "thumb" | "medium" | "full";
+
 interface ImageEntry {
-  src: string;
+  /** Inline (data:) or direct URL; optional when `levels` is given. */
+  src?: string;
   label?: string;
+  /** Multi-resolution URLs from GET /studies/{id}/slices (binary WebP/JPEG). */
+  levels?: Partial<Record<PyramidLevel, string>>;
+  /** Source dimensions, so the image box does not jump as better levels arrive. */
+  width?: number;
+  height?: number;
 }
 
 interface Annotation {
@@ -30,6 +38,8 @@ type ActiveTool = "pan" | "window" | "measure" | "annotate";
 interface ImageViewerProps {
   images: ImageEntry[];
   onClose?: () => void;
+  /** Bearer token for `levels` URLs (they sit behind the API auth). */
+  authToken?: string;
 }
 
 // ---------------------------------------------------------------------------
@@ -45,6 +55,11 @@ const ZOOM_STEP = 0.1;
 const MIN_ZOOM = 0.1;
 const MAX_ZOOM = 10;
 
+/** Best first: the viewport shows the highest level loaded so far. */
+const LEVEL_ORDER: PyramidLevel[] = ["full", "medium", "thumb"];
+/** Parallel thumbnail requests while filling the strip. */
+const THUMB_CONCURRENCY = 4;
+
 // ---------------------------------------------------------------------------
 // Toolbar icon helpers (inline SVG paths to keep the component self-contained)
 // ---------------------------------------------------------------------------
@@ -196,7 +211,7 @@ function IconClose() {
 // Component
 // ---------------------------------------------------------------------------
 
-export default function ImageViewer({ images, onClose }: ImageViewerProps) {
+export default function ImageViewer({ images, onClose, authToken }: ImageViewerProps) {
   // ---- View state ----
   const [zoom, setZoom] = useState(1);
   const [pan, setPan] = useState({ x: 0, y: 0 });
@@ -236,6 +251,96 @@ export default function ImageViewer({ images, onClose }: ImageViewerProps) {
   const wlStart = useRef({ brightness: DEFAULT_BRIGHTNESS, contrast: DEFAULT_CONTRAST });
   const annotationInputRef = useRef<HTMLInputElement>(null);
 
+  // ---- Progressive loading (object URLs per "index:level") ----
+  const [loadedUrls, setLoadedUrls] = useState<Record<string, string>>({});
+  const objectUrls = useRef<Record<string, string>>({});
+  const inflight = useRef<Record<string, Promise<void>>>({});
+  const imagesRef = useRef(images);
+  imagesRef.current = images;
+
+  const loadLevel = useCallback(
+    (idx: number, level: PyramidLevel): Promise<void> => {
+      const url = images[idx]?.levels?.[level];
+      const key = `${idx}:${level}`;
+      if (!url || objectUrls.current[key]) return Promise.resolve();
+      if (!inflight.current[key]) {
+        inflight.current[key] = fetch(url, {
+          headers: authToken ? { Authorization: `Bearer ${authToken}` } : undefined,
+        })
+          .then((res) => (res.ok ? res.blob() : null))
+          .then((blob) => {
+            // Ignore responses for an image set that has since been replaced
+            if (!blob || imagesRef.current !== images) return;
+            const objectUrl = URL.createObjectURL(blob);
+            objectUrls.current[key] = objectUrl;
+            setLoadedUrls((prev) => ({ ...prev, [key]: objectUrl }));
+          })
+          .catch(() => {})
+          .finally(() => {
+            delete inflight.current[key];
+          });
+      }
+      return inflight.current[key];
+    },
+    [images, authToken],
+  );
+
+  // New image set: drop previous blobs, then fill the strip with thumbnails first
+  useEffect(() => {
+    let cancelled = false;
+    const queue = images.map((_, idx) => idx).filter((idx) => images[idx].levels?.thumb);
+    const worker = async () => {
+      while (!cancelled && queue.length > 0) {
+        await loadLevel(queue.shift() as number, "thumb");
+      }
+    };
+    for (let i = 0; i < THUMB_CONCURRENCY; i++) worker();
+    return () => {
+      cancelled = true;
+    };
+  }, [images, loadLevel]);
+
+  // Selected slice: medium, then full; neighbours get medium for fast paging
+  useEffect(() => {
+    if (!images[selectedImage]?.levels) return;
+    let cancelled = false;
+    (async () => {
+      await loadLevel(selectedImage, "medium");
+      if (cancelled) return;
+      await loadLevel(selectedImage, "full");
+      if (cancelled) return;
+      for (const idx of [selectedImage + 1, selectedImage - 1]) {
+        if (idx >= 0 && idx < images.length) loadLevel(idx, "medium");
+      }
+    })();
+    return () => {
+      cancelled = true;
+    };
+  }, [images, selectedImage, loadLevel]);
+
+  // Release blobs when the image set changes or the viewer closes
+  useEffect(() => {
+    const urls = objectUrls.current;
+    return () => {
+      Object.values(urls).forEach((u) => URL.revokeObjectURL(u));
+      objectUrls.current = {};
+      inflight.current = {};
+      setLoadedUrls({});
+    };
+  }, [images]);
+
+  /** Highest loaded level for an image (or the inline src). */
+  const bestSrc = useCallback(
+    (idx: number, levels: PyramidLevel[] = LEVEL_ORDER) => {
+      for (const level of levels) {
+        const url = loadedUrls[`${idx}:${level}`];
+        if (url) return url;
+      }
+      return images[idx]?.src;
+    },
+    [loadedUrls, images],
+  );
+
   // ---- Helpers ----
 
   /** Get mouse coordinates relative to the viewport element. */
@@ -439,6 +544,7 @@ export default function ImageViewer({ images, onClose }: ImageViewerProps) {
 
   // ---- Derived ----
   const currentImage = images[selectedImage] ?? images[0];
+  const currentSrc = bestSrc(selectedImage);
 
   // Guard: no images
   if (!images || images.length === 0) {
@@ -562,14 +668,19 @@ export default function ImageViewer({ images, onClose }: ImageViewerProps) {
             transition: isDragging.current ? "none" : "transform 0.1s ease-out",
           }}
         >
-          {/* eslint-disable-next-line @next/next/no-img-element */}
-          <img
-            src={currentImage.src}
-            alt={currentImage.label ?? `Image ${selectedImage + 1}`}
-            className="max-w-none pointer-events-none"
-            draggable={false}
-            style={{ imageRendering: "auto" }}
-          />
+          {currentSrc ? (
+            // eslint-disable-next-line @next/next/no-img-element
+            <img
+              src={currentSrc}
+              alt={currentImage.label ?? `Image ${selectedImage + 1}`}
+              className="max-w-none pointer-events-none"
+              draggable={false}
+              // Lower levels are stretched to the source size until the full level arrives
+              style={{ imageRendering: "auto", width: currentImage.width, height: currentImage.height }}
+            />
+          ) : (
+            <span className="text-xs text-zinc-500">Loading...</span>
+          )}
         </div>
 
         {/* ---- Overlay: Measurements ---- */}
@@ -729,13 +840,15 @@ export default function ImageViewer({ images, onClose }: ImageViewerProps) {
               `}
               title={img.label ?? `Image ${idx + 1}`}
             >
-              {/* eslint-disable-next-line @next/next/no-img-element */}
-              <img
-                src={img.src}
-                alt={img.label ?? `Thumbnail ${idx + 1}`}
-                className="w-full h-full object-cover"
-                draggable={false}
-              />
+              {bestSrc(idx, ["thumb", "medium"]) && (
+                // eslint-disable-next-line @next/next/no-img-element
+                <img
+                  src={bestSrc(idx, ["thumb", "medium"])}
+                  alt={img.label ?? `Thumbnail ${idx + 1}`}
+                  className="w-full h-full object-cover"
+                  draggable={false}
+                />
+              )}
               {img.label && (
                 <span className="absolute bottom-0 inset-x-0 bg-black/70 text-[8px] text-zinc-300 text-center truncate px-0.5">
                   {img.label}
@@ -13,6 +13,7 @@ export function DicomDropzone({
   onFiles: (f: File[]) => void;
 }) {
   const inputRef = useRef<HTMLInputElement>(null);
+  const folderRef = useRef<HTMLInputElement>(null);
   const [dragging, setDragging] = useState(false);
 
   function add(incoming: FileList | null) {
@@ -47,15 +48,31 @@ export function DicomDropzone({
           DICOM dosyalarini buraya surukleyin veya tiklayin
         </div>
         <div className="text-xs text-zinc-400 dark:text-zinc-500 mt-1">
-          (.dcm, .dicom — birden fazla secilebilir)
+          (.dcm, .dicom — birden fazla secilebilir; tek .zip arsivi de olur)
         </div>
+        <button
+          type="button"
+          onClick={(e) => { e.stopPropagation(); folderRef.current?.click(); }}
+          className="text-xs text-zinc-500 dark:text-zinc-400 underline mt-1"
+        >
+          DICOMDIR klasoru sec
+        </button>
         <input
           ref={inputRef}
           type="file"
           multiple
-          accept=".dcm,.dicom,application/dicom"
+          accept=".dcm,.dicom,application/dicom,.zip,application/zip"
+          className="hidden"
+          onChange={(e) => add(e.target.files)}
+        />
+        {/* Klasor: dosya adlari goreli yol olarak gonderilir, sunucu DICOMDIR'e gore secer */}
+        <input
+          ref={folderRef}
+          type="file"
+          multiple
           className="hidden"
           onChange={(e) => add(e.target.files)}
+          {...({ webkitdirectory: "" } as any)}
         />
       </div>
 
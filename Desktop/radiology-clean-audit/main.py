@@ -1,16 +1,19 @@
 import os
 import json
+import asyncio
 import logging
+from datetime import datetime, timezone
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI, HTTPException, Query, Depends, UploadFile, File, Form, BackgroundTasks, Request
+from fastapi import FastAPI, HTTPException, Query, Depends, UploadFile, File, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel, Field
 from typing import Literal
+from starlette.background import BackgroundTask
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
@@ -26,8 +29,22 @@ logging.basicConfig(
 )
 logger = logging.getLogger("radiology-clean")
 
-from core.export.audit_pack import build_pack, build_agent_pack, verify_pack_full
-from core.export.pdf_export import generate_pdf
+from core.export.audit_pack import (
+    LIRADS_CATEGORIES,
+    LIRADS_LABELS,
+    build_agent_pack,
+    build_pack,
+    dsls_to_columns,
+    lesion_to_dsl,
+    run_lirads_decision,
+    run_lirads_decision_batch,
+)
+from core.export import verify_cache
+from core.export.pdf_bulk import stream_pdf_zip
+from core.export.pdf_cache import pdf_cache, pdf_key
+from core.export import pdf_prerender, pdf_service
+from core.export.pdf_export import pdf_filename
+from core.export.pdf_service import PdfRenderTimeout, PdfServiceOverloaded, render_pdf, render_stats
 from core.auth import (
     TokenResponse,
     UserInToken,
@@ -36,18 +53,26 @@ from core.auth import (
     require_role,
     verify_password,
 )
-from core.agent.dicom_utils import extract_images_from_dicom
+from core.agent import dicom_archive, dicom_pool
+from core.agent.dicom_cache import dicom_cache
+from core.agent.dicom_decoders import available_plugins
+from core.agent.image_pyramid import PYRAMID_FORMAT, PYRAMID_LEVELS, media_type, pyramid_key
+from core.agent.montage import LAYOUTS
+from core.uploads import DICOM_MAX_REQUEST_MB, UploadSizeLimitMiddleware, spooled_uploads
+from core.zip_stream import ZipStreamError
 from core.agent.radiologist import stream_radiologist_analysis, stream_followup
 from db import init_db
 from store.store import save_case, get_case, delete_case, list_cases, get_case_stats, get_case_versions
 from store.user_store import ensure_default_admin, get_user
 from store.patient_store import create_patient, get_patient, list_patients, get_patient_cases
+from store.study_store import create_study, delete_study, get_study, get_study_instance, get_study_instances
 from store.lab_store import create_lab_result, get_patient_labs, delete_lab_result
 from store.second_read_store import (
     create_second_reading, complete_second_reading,
     list_second_readings, get_case_second_readings,
 )
 from core.critical_findings import detect_critical_findings, get_checklist
+from core.rescore import RESCORE_CHUNK_SIZE, RESCORE_HTTP_MAX_WORKERS, RESCORE_WORKERS, rescore_cases
 
 
 @asynccontextmanager
@@ -56,7 +81,12 @@ async def lifespan(app: FastAPI):
     init_db()
     ensure_default_admin()
     logger.info("Varsayılan admin kontrol edildi.")
+    if pdf_prerender.PDF_PRERENDER:
+        pdf_prerender.start()
     yield
+    pdf_prerender.stop()
+    pdf_service.shutdown()
+    dicom_pool.shutdown()
     logger.info("Uygulama kapatılıyor.")
 
 
@@ -73,6 +103,13 @@ limiter = Limiter(
 app.state.limiter = limiter
 app.add_middleware(SlowAPIMiddleware)
 
+# DICOM yüklemeleri: Content-Length / okunan toplam sınırı aşınca erken 413
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_bytes=DICOM_MAX_REQUEST_MB * 1024 * 1024,
+    paths=("/agent/analyze", "/studies"),
+)
+
 
 @app.exception_handler(RateLimitExceeded)
 async def rate_limit_handler(request: Request, exc: RateLimitExceeded):
@@ -230,36 +267,176 @@ def stats(user: UserInToken = Depends(get_current_user)):
 # ---------------------------------------------------------------------------
 # Verify (auth gerektirmez — QR kodla dışarıdan erişilebilir)
 # ---------------------------------------------------------------------------
+def _etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match başlığı ETag'i kapsıyor mu (zayıf karşılaştırma: W/, liste, *)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
 @app.get("/verify/{case_id}", tags=["verify"])
-def verify(case_id: str, sig: str = Query(..., description="HMAC-SHA256 imzası")):
-    pack = get_case(case_id)
-    if pack is None:
-        raise HTTPException(status_code=404, detail="Case not found")
-    result = verify_pack_full(pack)
-    stored_sig = pack.get("signature", "")
-    sig_match = stored_sig == sig
-    return {
-        "case_id": case_id,
-        "sig_match": sig_match,
-        **result,
+def verify(
+    case_id: str,
+    request: Request,
+    sig: str = Query(..., description="HMAC-SHA256 imzası"),
+):
+    entry = verify_cache.get_verification(case_id)
+    if entry is None:
+        pack = get_case(case_id)
+        if pack is None:
+            raise HTTPException(status_code=404, detail="Case not found")
+        entry = verify_cache.store_verification(case_id, pack)
+    sig_match = entry.signature == sig
+    # Sonuç vaka güncellenince/silinince değişir: paylaşılan önbellekte
+    # tutulmaz, tarayıcı her taramada ETag ile yeniden doğrular (304)
+    headers = {
+        "ETag": f'"{entry.pack_sha256[:32]}-{int(sig_match)}"',
+        "Cache-Control": "private, no-cache",
     }
+    if _etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(
+        content={"case_id": case_id, "sig_match": sig_match, **entry.result},
+        headers=headers,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Admin: geriye dönük yeniden skorlama
+# ---------------------------------------------------------------------------
+class RescoreRequest(BaseModel):
+    write: bool = Field(False, description="Kategorisi değişen vakalar için yeni versiyon kaydet")
+    workers: int = Field(
+        min(RESCORE_WORKERS, RESCORE_HTTP_MAX_WORKERS), ge=1,
+        description="İşçi süreç sayısı (1 = aynı süreç, RESCORE_HTTP_MAX_WORKERS ile sınırlı)",
+    )
+    chunk_size: int = Field(RESCORE_CHUNK_SIZE, ge=1, le=10000)
+
+
+@app.post("/admin/rescore", tags=["admin"])
+def rescore_endpoint(
+    body: RescoreRequest,
+    user: UserInToken = Depends(require_role("admin")),
+):
+    """Tüm vakaları güncel LI-RADS motoruyla yeniden skorlar; eski→yeni kategori farkını döner."""
+    report = rescore_cases(
+        workers=min(body.workers, RESCORE_HTTP_MAX_WORKERS),
+        chunk_size=body.chunk_size,
+        write=body.write,
+        created_by=user.username,
+        verify_base_url=VERIFY_BASE_URL,
+    )
+    logger.info("Yeniden skorlama calistirildi (kullanici: %s, write=%s)", user.username, body.write)
+    return report
 
 
 # ---------------------------------------------------------------------------
 # Export routes (auth zorunlu)
 # ---------------------------------------------------------------------------
+def _iter_chunks(data: bytes, size: int = 64 * 1024):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def _iter_file(f, size: int = 64 * 1024):
+    with f:
+        while chunk := f.read(size):
+            yield chunk
+
+
 @app.get("/export/pdf/{case_id}", tags=["export"])
 def export_pdf(
     case_id: str,
-    background_tasks: BackgroundTasks,
+    request: Request,
     user: UserInToken = Depends(get_current_user),
 ):
     pack = get_case(case_id)
     if pack is None:
         raise HTTPException(status_code=404, detail="Case not found")
-    path = generate_pdf(pack)
-    background_tasks.add_task(os.remove, path)
-    return FileResponse(path, media_type="application/pdf", filename=f"{case_id}.pdf")
+    # PDF içeriği imzaya ve renderer sürümüne bağlı: aynı anahtar → aynı dosya
+    key = pdf_key(pack["signature"])
+    headers = {"ETag": f'"{key}"', "Cache-Control": "private, no-cache"}
+    if _etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    filename = pdf_filename(case_id)
+    headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    # Açık tanıtıcıdan gönderilir: kayıt bu arada önbellekten silinse de yanıt tamamlanır
+    cached = pdf_cache.open(key)
+    if cached is not None:
+        headers["Content-Length"] = str(os.fstat(cached.fileno()).st_size)
+        return StreamingResponse(_iter_file(cached), media_type="application/pdf", headers=headers)
+    # Önbellekte yok: işçi havuzunda render et, yanıttan sonra önbelleğe yaz
+    try:
+        data = render_pdf(pack)
+    except PdfServiceOverloaded:
+        raise HTTPException(status_code=503, detail="PDF servisi yogun, tekrar deneyin",
+                            headers={"Retry-After": "5"})
+    except PdfRenderTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    headers["Content-Length"] = str(len(data))
+    return StreamingResponse(
+        _iter_chunks(data),
+        media_type="application/pdf",
+        headers=headers,
+        background=BackgroundTask(pdf_cache.put_bytes, key, data),
+    )
+
+
+PDF_BULK_MAX_CASES = int(os.getenv("PDF_BULK_MAX_CASES", "200"))
+
+
+class BulkPdfRequest(BaseModel):
+    case_ids: list[str] = Field(default_factory=list, max_length=PDF_BULK_MAX_CASES)
+    patient_id: str | None = Field(None, description="case_ids yerine: hastanın tüm vakaları")
+    limit: int = Field(PDF_BULK_MAX_CASES, ge=1, le=PDF_BULK_MAX_CASES)
+
+
+@app.post("/export/pdf/bulk", tags=["export"])
+def export_pdf_bulk(
+    body: BulkPdfRequest,
+    user: UserInToken = Depends(get_current_user),
+):
+    """Vakaların PDF'lerini paralel render edip tek ZIP olarak akıtır (manifest.json dahil)."""
+    if body.case_ids:
+        case_ids = list(dict.fromkeys(body.case_ids))
+    elif body.patient_id:
+        if get_patient(body.patient_id) is None:
+            raise HTTPException(status_code=404, detail="Patient not found")
+        case_ids = [c["case_id"] for c in get_patient_cases(body.patient_id)]
+    else:
+        raise HTTPException(status_code=422, detail="case_ids veya patient_id gerekli")
+    case_ids = case_ids[:body.limit]
+    if not case_ids:
+        raise HTTPException(status_code=404, detail="No cases to export")
+
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+    logger.info("Toplu PDF export: %d vaka (kullanici: %s)", len(case_ids), user.username)
+    return StreamingResponse(
+        stream_pdf_zip(case_ids),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="radiology_reports_{stamp}.zip"'},
+    )
+
+
+@app.get("/metrics/pdf", tags=["export"])
+def pdf_metrics(user: UserInToken = Depends(require_role("admin"))):
+    """PDF render süreleri (p50/p95/max), kuyruk durumu, ön-render ve önbellek isabet oranı."""
+    return {"render": render_stats(), "cache": pdf_cache.stats(), "prerender": pdf_prerender.prerender_stats()}
+
+
+@app.get("/metrics/dicom", tags=["agent"])
+def dicom_metrics(user: UserInToken = Depends(require_role("admin"))):
+    """İşlenmiş DICOM önbelleğinin boyutu, isabet oranı ve kurulu decoder eklentileri."""
+    return {"cache": dicom_cache.stats(), "decoders": available_plugins()}
 
 
 @app.get("/export/json/{case_id}", tags=["export"])
@@ -315,6 +492,161 @@ def get_patient_endpoint(
     return {**p, "cases": cases}
 
 
+# ---------------------------------------------------------------------------
+# Çalışma deposu (DICOM bir kez yüklenir, study_id ile yeniden analiz edilir)
+# ---------------------------------------------------------------------------
+
+# Yüklemeden sonra varsayılan yerleşim arka planda hazırlanır: ilk analiz de bekletmez
+STUDY_PREWARM = os.getenv("STUDY_PREWARM", "1") == "1"
+
+
+async def _prewarm_study(study_id: str) -> None:
+    try:
+        instances = await asyncio.to_thread(get_study_instances, study_id)
+        if instances:
+            await dicom_pool.assemble_stored_study(instances)
+    except Exception as exc:
+        logger.error("Calisma on isleme hatasi (%s): %s", study_id, exc)
+
+
+@app.post("/studies", tags=["studies"])
+async def create_study_endpoint(
+    dicoms: list[UploadFile] = File(default=[]),
+    patient_id: str = Form(default=""),
+    user: UserInToken = Depends(require_role("admin", "radiologist")),
+):
+    """
+    DICOM setini kalıcı depoya yükler; /agent/analyze study_id ile yeniden
+    yükleme ve decode olmadan tekrar çalıştırılabilir. Görüntü içermeyen veya
+    decode edilemeyen dosyalar saklanmaz (skipped). Klasör yüklemesinde
+    (dosya adları göreli yol) DICOMDIR varsa yalnızca işaret ettiği dosyalar okunur.
+    """
+    if patient_id and get_patient(patient_id) is None:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    async with spooled_uploads(dicoms) as files:
+        selected = await dicom_archive.dicomdir_members(files)
+        headers = await dicom_pool.read_study_headers([f.path for f in selected])
+        valid = [(f.path, f.sha256, h) for f, h in zip(selected, headers) if h is not None]
+        if not valid:
+            raise HTTPException(status_code=422, detail="Goruntu iceren DICOM dosyasi yok")
+        study = await asyncio.to_thread(create_study, valid, user.username, patient_id or None)
+    return _study_created(study, skipped=len(files) - len(valid))
+
+
+@app.post("/studies/archive", tags=["studies"])
+async def create_study_from_archive(
+    request: Request,
+    patient_id: str = Query(default=""),
+    user: UserInToken = Depends(require_role("admin", "radiologist")),
+):
+    """
+    Tek ZIP'ten (gövde: application/zip) çalışma oluşturur. Üyeler yükleme
+    sürerken tek tek açılır ve başlıkları okunur; DICOMDIR varsa yalnızca
+    işaret ettiği dosyalar işlenir (bkz. core/agent/dicom_archive.py).
+    """
+    if patient_id and get_patient(patient_id) is None:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    try:
+        async with dicom_archive.spooled_archive(request.stream()) as archive:
+            if not archive.files:
+                raise HTTPException(status_code=422, detail="Goruntu iceren DICOM dosyasi yok")
+            study = await asyncio.to_thread(create_study, archive.files, user.username, patient_id or None)
+    except ZipStreamError as exc:
+        raise HTTPException(status_code=422, detail=f"Gecersiz ZIP arsivi: {exc}")
+    return _study_created(study, skipped=archive.members - len(archive.files))
+
+
+def _study_created(study: dict, skipped: int) -> JSONResponse:
+    study["skipped"] = skipped
+    background = BackgroundTask(_prewarm_study, study["study_id"]) if STUDY_PREWARM else None
+    return JSONResponse(study, background=background)
+
+
+@app.get("/studies/{study_id}", tags=["studies"])
+def get_study_endpoint(
+    study_id: str,
+    user: UserInToken = Depends(get_current_user),
+):
+    study = get_study(study_id)
+    if study is None:
+        raise HTTPException(status_code=404, detail="Study not found")
+    return study
+
+
+async def _prewarm_pyramids(items: list[tuple[str, str, int]]) -> None:
+    for path, sha256, frame in items:
+        await dicom_pool.slice_pyramid(path, sha256, frame, "thumb")
+
+
+@app.get("/studies/{study_id}/slices", tags=["studies"])
+async def study_slices(
+    study_id: str,
+    user: UserInToken = Depends(get_current_user),
+):
+    """
+    Görüntüleyici için çalışmada seçilen dilimler ve türev adresleri
+    (levels: thumb / medium / full). Türevler yanıttan sonra arka planda
+    üretilmeye başlar; istemci önce thumb'ları ister.
+    """
+    instances = await asyncio.to_thread(get_study_instances, study_id)
+    if instances is None:
+        raise HTTPException(status_code=404, detail="Study not found")
+    images, _ = await dicom_pool.assemble_stored_study(instances)
+    slices, items = [], []
+    for img in images:
+        if img.get("file_index") is None:
+            continue
+        inst = instances[img["file_index"]]
+        base = f"/studies/{study_id}/images/{inst['sha256']}/{img['frame_index']}"
+        slices.append({
+            "label": f"{img['series_description']} {img['slice_info']}",
+            "series_uid": img["series_uid"],
+            "slice_info": img["slice_info"],
+            "rows": inst["header"]["rows"],
+            "columns": inst["header"]["columns"],
+            "levels": {level: f"{base}/{level}" for level in PYRAMID_LEVELS},
+        })
+        items.append((inst["path"], inst["sha256"], img["frame_index"]))
+    return JSONResponse(
+        {"study_id": study_id, "format": PYRAMID_FORMAT, "slices": slices},
+        background=BackgroundTask(_prewarm_pyramids, items),
+    )
+
+
+@app.get("/studies/{study_id}/images/{sha256}/{frame}/{level}", tags=["studies"])
+async def study_image(
+    study_id: str,
+    sha256: str,
+    frame: int,
+    level: str,
+    request: Request,
+    user: UserInToken = Depends(get_current_user),
+):
+    """Dilim türevi (ikili WebP/JPEG). İçerik adresli: immutable önbellek + Range desteği."""
+    if level not in PYRAMID_LEVELS:
+        raise HTTPException(status_code=404, detail="Level not found")
+    inst = await asyncio.to_thread(get_study_instance, study_id, sha256)
+    if inst is None or not 0 <= frame < inst["frames"]:
+        raise HTTPException(status_code=404, detail="Image not found")
+    headers = {"ETag": f'"{pyramid_key(sha256, frame, level)}"', "Cache-Control": "private, max-age=31536000, immutable"}
+    if _etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    path = await dicom_pool.slice_pyramid(inst["path"], sha256, frame, level)
+    if path is None:
+        raise HTTPException(status_code=422, detail="Goruntu uretilemedi")
+    return FileResponse(path, media_type=media_type(), headers=headers)
+
+
+@app.delete("/studies/{study_id}", tags=["studies"])
+def delete_study_endpoint(
+    study_id: str,
+    user: UserInToken = Depends(require_role("admin")),
+):
+    if not delete_study(study_id):
+        raise HTTPException(status_code=404, detail="Study not found")
+    return {"deleted": study_id}
+
+
 # ---------------------------------------------------------------------------
 # Radyolog Ajan (SSE streaming)
 # ---------------------------------------------------------------------------
@@ -324,12 +656,16 @@ async def agent_analyze(
     dicoms: list[UploadFile] = File(default=[]),
     clinical_json: str = Form(...),
     education_mode: str = Form(default="false"),
+    layout: str = Form(default="single"),
+    study_id: str = Form(default=""),
     user: UserInToken = Depends(require_role("admin", "radiologist")),
 ):
     """
     Radyolog ajanı: DICOM görüntüleri + klinik verilerle MRI analizi yapar.
     Yanıt Server-Sent Events (SSE) stream olarak gelir.
     education_mode=true ise eğitim notları da eklenir.
+    layout=montage ise her görüntü bir serinin 2×2 dilim montajıdır.
+    study_id verilirse görüntüler kayıtlı çalışmadan gelir (dicoms yok sayılır).
     """
     try:
         clinical_data = json.loads(clinical_json)
@@ -337,20 +673,27 @@ async def agent_analyze(
         raise HTTPException(status_code=422, detail="clinical_json geçerli JSON değil")
 
     is_education = education_mode.lower() in ("true", "1", "yes")
-
-    # DICOM dosyalarını işle
-    images: list[dict] = []
-    for upload in dicoms:
-        if not upload.filename:
-            continue
-        file_bytes = await upload.read()
-        extracted = extract_images_from_dicom(file_bytes, max_slices=3)
-        images.extend(extracted)
-
-    # Maksimum 20 görüntü gönder (token limiti)
-    images = images[:20]
+    if layout not in LAYOUTS:
+        raise HTTPException(status_code=422, detail=f"layout su degerlerden biri olmali: {', '.join(LAYOUTS)}")
+
+    # DICOM dosyalarını diske akıt; decode/JPEG event loop dışında, süreç havuzunda
+    # Görüntü sayısı/boyutu/kalitesi token ve bayt bütçesine göre planlanır ve
+    # seriler arasında paylaştırılır; yalnızca seçilen dilimler decode edilir.
+    # Aynı dosyalar yeniden yüklenirse (içerik hash'i) önbellekten gelir.
+    if study_id:
+        instances = await asyncio.to_thread(get_study_instances, study_id)
+        if instances is None:
+            raise HTTPException(status_code=404, detail="Study not found")
+        images, image_plan = await dicom_pool.assemble_stored_study(instances, layout=layout)
+    else:
+        async with spooled_uploads(dicoms) as files:
+            images, image_plan = await dicom_pool.assemble_study(
+                [f.path for f in files], digests=[f.sha256 for f in files], layout=layout,
+            )
 
     async def event_stream():
+        # İlk olay: görüntü planı (istemci metin alanı boş olayları yok sayar)
+        yield f"data: {json.dumps({'text': '', 'done': False, 'image_plan': image_plan})}\n\n"
         async for chunk in stream_radiologist_analysis(clinical_data, images, education_mode=is_education):
             # Her chunk'ı SSE formatında gönder
             payload = json.dumps({"text": chunk, "done": False}, ensure_ascii=False)
@@ -430,6 +773,70 @@ def agent_save(
     return pack
 
 
+# ---------------------------------------------------------------------------
+# Durumsuz toplu LI-RADS skorlama (DB ve imza yok)
+# ---------------------------------------------------------------------------
+LIRADS_SCORE_MAX_ITEMS = int(os.getenv("LIRADS_SCORE_MAX_ITEMS", "5000"))
+
+
+class LiradsScoreRequest(BaseModel):
+    dsls: list[dict] = Field(
+        default_factory=list, max_length=LIRADS_SCORE_MAX_ITEMS,
+        description="Hazır LI-RADS DSL'leri (/analyze gövdesi formatında)",
+    )
+    cirrhosis: bool = Field(False, description="lesions için siroz bilgisi")
+    lesions: list[LesionInput] = Field(
+        default_factory=list, max_length=LIRADS_SCORE_MAX_ITEMS,
+        description="Ajan formu lezyonları (ClinicalDataInput.lesions formatında)",
+    )
+
+
+@app.post("/lirads/score", tags=["lirads"])
+def lirads_score(
+    body: LiradsScoreRequest,
+    user: UserInToken = Depends(get_current_user),
+):
+    """
+    DSL ve/veya form lezyonlarını toplu skorlar; audit pack oluşturmaz, kaydetmez.
+    Her girdi için ayrı sonuç döner (sıra: önce dsls, sonra lesions).
+    """
+    if len(body.dsls) + len(body.lesions) > LIRADS_SCORE_MAX_ITEMS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"İstek başına en fazla {LIRADS_SCORE_MAX_ITEMS} lezyon skorlanabilir",
+        )
+    lesion_dsls = []
+    for i, les in enumerate(body.lesions):
+        try:
+            lesion_dsls.append(lesion_to_dsl(les.model_dump(), body.cirrhosis))
+        except (TypeError, ValueError, AttributeError, OverflowError) as e:
+            raise HTTPException(status_code=422, detail=f"Geçersiz lezyon (lesions[{i}]): {e}")
+    all_dsls = body.dsls + lesion_dsls
+    sources = [("dsl", i) for i in range(len(body.dsls))]
+    sources += [("lesion", i) for i in range(len(lesion_dsls))]
+    try:
+        codes = run_lirads_decision_batch(**dsls_to_columns(all_dsls))
+    except (TypeError, ValueError, AttributeError, OverflowError) as e:
+        # Hatalı girdiyi bul: skaler motor tek tek dener
+        for (source, index), dsl in zip(sources, all_dsls):
+            try:
+                run_lirads_decision(dsl)
+            except (TypeError, ValueError, AttributeError, OverflowError) as item_error:
+                raise HTTPException(status_code=422, detail=f"Geçersiz DSL ({source}s[{index}]): {item_error}")
+        raise HTTPException(status_code=422, detail=f"Geçersiz DSL: {e}")
+    results = []
+    for (source, index), dsl, code in zip(sources, all_dsls, codes):
+        category = LIRADS_CATEGORIES[code]
+        results.append({
+            "source": source,
+            "index": index,
+            "lesion_size_mm": dsl.get("lesion_size_mm", 0),
+            "category": category,
+            "label": LIRADS_LABELS[category],
+        })
+    return {"count": len(results), "results": results}
+
+
 # ---------------------------------------------------------------------------
 # Lab routes (auth zorunlu)
 # ---------------------------------------------------------------------------
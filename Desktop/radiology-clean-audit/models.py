@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, Integer, ForeignKey
+from sqlalchemy import Column, String, Text, Integer, Float, ForeignKey
 from sqlalchemy.orm import relationship
 from db import Base
 
@@ -91,3 +91,59 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     role = Column(String, nullable=False, default="viewer")  # admin | radiologist | viewer
     full_name = Column(String, nullable=True)
+
+
+class Study(Base):
+    """Kalıcı çalışma deposu: bir kez yüklenen DICOM seti (dosyalar diskte, bkz. store/study_store)."""
+    __tablename__ = "studies"
+
+    study_id = Column(String, primary_key=True, index=True)  # ör: "ST-3f9a1c2b7d4e"
+    study_uid = Column(String, nullable=True, index=True)    # StudyInstanceUID (ilk dosyadan)
+    patient_id = Column(String, ForeignKey("patients.patient_id"), nullable=True, index=True)
+    instance_count = Column(Integer, nullable=False, default=0)
+    total_bytes = Column(Integer, nullable=False, default=0)
+    created_at = Column(String, nullable=False, index=True)
+    created_by = Column(String, nullable=True)
+
+    patient = relationship("Patient")
+    series = relationship(
+        "Series", back_populates="study", cascade="all, delete-orphan", order_by="Series.ordinal",
+    )
+
+
+class Series(Base):
+    __tablename__ = "series"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    study_id = Column(String, ForeignKey("studies.study_id"), nullable=False, index=True)
+    ordinal = Column(Integer, nullable=False)  # ilk yükleme sırası
+    series_uid = Column(String, nullable=False)
+    description = Column(String, nullable=True)
+    instance_count = Column(Integer, nullable=False, default=0)
+
+    study = relationship("Study", back_populates="series")
+    instances = relationship(
+        "Instance", back_populates="series", cascade="all, delete-orphan", order_by="Instance.ordinal",
+    )
+
+
+class Instance(Base):
+    """Tek DICOM dosyası; başlık alanları seri planlaması için yeniden okunmadan kullanılır."""
+    __tablename__ = "instances"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    study_id = Column(String, ForeignKey("studies.study_id"), nullable=False, index=True)
+    series_id = Column(Integer, ForeignKey("series.id"), nullable=False, index=True)
+    ordinal = Column(Integer, nullable=False)  # çalışma içindeki yükleme sırası
+    sop_instance_uid = Column(String, nullable=True)
+    sha256 = Column(String, nullable=False, index=True)
+    path = Column(String, nullable=False)  # STUDY_STORE_DIR'e göre göreli
+    size_bytes = Column(Integer, nullable=False)
+    instance_number = Column(Integer, nullable=True)
+    position = Column(Float, nullable=True)
+    frames = Column(Integer, nullable=False, default=1)
+    rows = Column(Integer, nullable=False)
+    columns = Column(Integer, nullable=False)
+    transfer_syntax = Column(String, nullable=True)
+
+    series = relationship("Series", back_populates="instances")
@@ -6,6 +6,47 @@ from models import Case, CaseVersion, Patient
 
 logger = logging.getLogger(__name__)
 
+# save_case / save_cases_batch commit'inden sonra çağrılan kancalar: fn(case_id, audit_pack)
+_save_hooks: list = []
+# delete_case commit'inden sonra çağrılan kancalar: fn(case_id)
+_delete_hooks: list = []
+
+
+def register_save_hook(fn) -> None:
+    """Başarılı kayıt commit'i sonrası çağrılacak kancayı ekler (aynı fn bir kez)."""
+    if fn not in _save_hooks:
+        _save_hooks.append(fn)
+
+
+def unregister_save_hook(fn) -> None:
+    if fn in _save_hooks:
+        _save_hooks.remove(fn)
+
+
+def register_delete_hook(fn) -> None:
+    """Başarılı silme commit'i sonrası çağrılacak kancayı ekler (aynı fn bir kez)."""
+    if fn not in _delete_hooks:
+        _delete_hooks.append(fn)
+
+
+def unregister_delete_hook(fn) -> None:
+    if fn in _delete_hooks:
+        _delete_hooks.remove(fn)
+
+
+def _run_hooks(hooks: list, *args) -> None:
+    # Kanca hatası kaydı geri almaz, çağırana da yansımaz
+    for fn in list(hooks):
+        try:
+            fn(*args)
+        except Exception:
+            logger.exception("Kayit kancasi basarisiz: %s", getattr(fn, "__name__", fn))
+
+
+def _run_save_hooks(case_id: str, audit_pack: dict) -> None:
+    _run_hooks(_save_hooks, case_id, audit_pack)
+
+
 def save_case(case_id: str, audit_pack: dict, created_by: str = "", patient_id: str = None) -> None:
     with get_db() as db:
         pack_json = json.dumps(audit_pack, ensure_ascii=False)
@@ -40,6 +81,101 @@ def save_case(case_id: str, audit_pack: dict, created_by: str = "", patient_id:
         )
         db.add(ver)
         db.commit()
+    _run_save_hooks(case_id, audit_pack)
+
+def save_cases_batch(
+    items: list[tuple[str, dict]],
+    created_by: str = "",
+    base_versions: dict[str, int] | None = None,
+) -> list[str]:
+    """
+    Birden fazla vakanın yeni versiyonunu tek transaction'da kaydeder.
+
+    items: [(case_id, audit_pack), ...] — vakalar mevcut olmalı.
+    base_versions: {case_id: versiyon} — yeni pack'in türetildiği versiyon.
+    Verilirse transaction içinde vakanın son versiyonu bununla karşılaştırılır;
+    arada başka bir kayıt olmuşsa (eşzamanlı save_case) vaka atlanır, böylece
+    aynı versiyon numarası iki kez yazılmaz ve hash zinciri kopmaz.
+    Dönüş: kaydedilen case_id listesi. Commit sonrası kaydedilen her vaka
+    için save_case'teki gibi kayıt kancaları çalışır.
+    """
+    if not items:
+        return []
+    case_ids = [cid for cid, _ in items]
+    with get_db() as db:
+        # Önce satırlara (etkisiz) yazarak kilidi al: SQLite'ta yazma kilidi,
+        # diğer veritabanlarında satır kilidi. Aşağıdaki versiyon okuması
+        # commit'e kadar başka bir yazıcı tarafından değiştirilemez.
+        db.query(Case).filter(Case.case_id.in_(case_ids)).update(
+            {Case.case_id: Case.case_id}, synchronize_session=False,
+        )
+        recs = {
+            r.case_id: r
+            for r in db.query(Case).filter(Case.case_id.in_(case_ids)).all()
+        }
+        latest = dict(
+            db.query(CaseVersion.case_id, func.max(CaseVersion.version))
+            .filter(CaseVersion.case_id.in_(case_ids))
+            .group_by(CaseVersion.case_id)
+            .all()
+        ) if base_versions else {}
+        saved: list[tuple[str, dict]] = []
+        for case_id, audit_pack in items:
+            rec = recs.get(case_id)
+            if rec is None:
+                logger.warning("Toplu kayit: vaka bulunamadi, atlandi: %s", case_id)
+                continue
+            if base_versions and case_id in base_versions:
+                current = latest.get(case_id)
+                if current is not None and current != base_versions[case_id]:
+                    logger.warning(
+                        "Toplu kayit: %s okunduktan sonra guncellenmis (v%s -> v%s), atlandi",
+                        case_id, base_versions[case_id], current,
+                    )
+                    continue
+            pack_json = json.dumps(audit_pack, ensure_ascii=False)
+            generated_at = audit_pack.get("generated_at", "")
+            rec.audit_pack_json = pack_json
+            rec.created_at = generated_at or rec.created_at
+            db.add(CaseVersion(
+                case_id=case_id,
+                version=audit_pack.get("version", 1),
+                created_at=generated_at,
+                created_by=created_by,
+                audit_pack_json=pack_json,
+            ))
+            saved.append((case_id, audit_pack))
+        db.commit()
+    for case_id, audit_pack in saved:
+        _run_save_hooks(case_id, audit_pack)
+    logger.info("Toplu kayit: %d vaka guncellendi (kullanici: %s)", len(saved), created_by)
+    return [case_id for case_id, _ in saved]
+
+def iter_case_packs(chunk_size: int = 500):
+    """
+    Tüm vakaları case_id sırasıyla parça parça döner (bellekte tek parça tutulur).
+
+    Her yield: [(case_id, audit_pack), ...]. JSON'u okunamayan kayıtta
+    audit_pack None'dır (çağıran hata olarak raporlar).
+    """
+    last_id = None
+    while True:
+        with get_db() as db:
+            q = db.query(Case.case_id, Case.audit_pack_json).order_by(Case.case_id)
+            if last_id is not None:
+                q = q.filter(Case.case_id > last_id)
+            rows = q.limit(chunk_size).all()
+        if not rows:
+            return
+        last_id = rows[-1].case_id
+        chunk = []
+        for case_id, pack_json in rows:
+            try:
+                chunk.append((case_id, json.loads(pack_json)))
+            except (json.JSONDecodeError, TypeError):
+                logger.warning("Vaka JSON okunamadi: %s", case_id)
+                chunk.append((case_id, None))
+        yield chunk
 
 def get_case(case_id: str):
     with get_db() as db:
@@ -57,8 +193,9 @@ def delete_case(case_id: str) -> bool:
         db.query(CaseVersion).filter(CaseVersion.case_id == case_id).delete()
         db.delete(rec)
         db.commit()
-        logger.info("Vaka silindi: %s", case_id)
-        return True
+    logger.info("Vaka silindi: %s", case_id)
+    _run_hooks(_delete_hooks, case_id)
+    return True
 
 def list_cases(limit: int = 50):
     with get_db() as db:
@@ -0,0 +1,183 @@
+"""
+Kalıcı çalışma deposu: DICOM dosyaları bir kez yüklenir, çalışma kimliğiyle saklanır.
+
+Dosyalar STUDY_STORE_DIR/<study_id>/<sha256>.dcm altına taşınır (çalışma içinde
+aynı içerik bir kez saklanır); seri planlaması için gereken başlık alanları
+studies / series / instances tablolarına yazılır. Yeniden analizde başlıklar
+veritabanından gelir, dosyalar yeniden okunmaz.
+"""
+import datetime
+import logging
+import os
+import shutil
+import uuid
+from datetime import timezone
+
+from db import get_db
+from models import Instance, Series, Study
+
+logger = logging.getLogger(__name__)
+
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUDY_STORE_DIR = os.getenv("STUDY_STORE_DIR", os.path.join(_BASE_DIR, "study_store"))
+
+
+def _abs_path(relpath: str) -> str:
+    return os.path.join(STUDY_STORE_DIR, relpath)
+
+
+def create_study(
+    files: list[tuple[str, str, dict]],
+    created_by: str = "",
+    patient_id: str = None,
+) -> dict:
+    """
+    files: yükleme sırasında (geçici yol, sha256, read_header çıktısı) listesi.
+    Dosyalar depoya taşınır; aynı sha256'lı tekrarlar atlanır.
+    """
+    study_id = f"ST-{uuid.uuid4().hex[:12]}"
+    directory = _abs_path(study_id)
+    os.makedirs(directory, exist_ok=True)
+    now = datetime.datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    try:
+        with get_db() as db:
+            study = Study(
+                study_id=study_id,
+                study_uid=next((h["study_uid"] for _, _, h in files if h.get("study_uid")), None),
+                patient_id=patient_id,
+                instance_count=0,
+                total_bytes=0,
+                created_at=now,
+                created_by=created_by,
+            )
+            series_by_key: dict[str, Series] = {}
+            seen: set[str] = set()
+            for path, sha256, header in files:
+                if sha256 in seen:
+                    continue
+                seen.add(sha256)
+                relpath = f"{study_id}/{sha256}.dcm"
+                size = os.path.getsize(path)
+                shutil.move(path, _abs_path(relpath))
+
+                ordinal = study.instance_count
+                key = header["series_uid"] or f"__file{ordinal}"
+                series = series_by_key.get(key)
+                if series is None:
+                    series = Series(
+                        ordinal=len(series_by_key),
+                        series_uid=header["series_uid"],
+                        description=header["series_description"],
+                        instance_count=0,
+                    )
+                    series_by_key[key] = series
+                    study.series.append(series)
+                series.instances.append(Instance(
+                    study_id=study_id,
+                    ordinal=ordinal,
+                    sop_instance_uid=header.get("sop_instance_uid") or None,
+                    sha256=sha256,
+                    path=relpath,
+                    size_bytes=size,
+                    instance_number=header["instance_number"],
+                    position=header["position"],
+                    frames=header["frames"],
+                    rows=header["rows"],
+                    columns=header["columns"],
+                    transfer_syntax=header.get("transfer_syntax"),
+                ))
+                series.instance_count += 1
+                study.instance_count = ordinal + 1
+                study.total_bytes += size
+            db.add(study)
+            db.commit()
+            logger.info(
+                "Calisma kaydedildi: %s (%d dosya, %d seri, kullanici: %s)",
+                study_id, study.instance_count, len(series_by_key), created_by,
+            )
+            return _study_to_dict(study)
+    except Exception:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+
+
+def get_study(study_id: str) -> dict | None:
+    with get_db() as db:
+        study = db.query(Study).filter(Study.study_id == study_id).first()
+        return _study_to_dict(study) if study else None
+
+
+def get_study_instances(study_id: str) -> list[dict] | None:
+    """
+    Çalışmanın dosyaları yükleme sırasında: [{"path", "sha256", "header"}, ...].
+    header, read_header ile aynı biçimdedir. Çalışma yoksa None.
+    """
+    with get_db() as db:
+        study = db.query(Study).filter(Study.study_id == study_id).first()
+        if study is None:
+            return None
+        rows = (
+            db.query(Instance, Series)
+            .join(Series, Instance.series_id == Series.id)
+            .filter(Instance.study_id == study_id)
+            .order_by(Instance.ordinal)
+            .all()
+        )
+        return [
+            {
+                "path": _abs_path(inst.path),
+                "sha256": inst.sha256,
+                "header": {
+                    "series_uid": series.series_uid,
+                    "series_description": series.description or "",
+                    "instance_number": inst.instance_number,
+                    "position": inst.position,
+                    "frames": inst.frames,
+                    "rows": inst.rows,
+                    "columns": inst.columns,
+                    "transfer_syntax": inst.transfer_syntax,
+                    "study_uid": study.study_uid or "",
+                    "sop_instance_uid": inst.sop_instance_uid or "",
+                },
+            }
+            for inst, series in rows
+        ]
+
+
+def get_study_instance(study_id: str, sha256: str) -> dict | None:
+    """Çalışmadaki tek dosya: {"path", "frames"} veya None."""
+    with get_db() as db:
+        inst = db.query(Instance).filter(Instance.study_id == study_id, Instance.sha256 == sha256).first()
+        return {"path": _abs_path(inst.path), "frames": inst.frames} if inst else None
+
+
+def delete_study(study_id: str) -> bool:
+    with get_db() as db:
+        study = db.query(Study).filter(Study.study_id == study_id).first()
+        if not study:
+            return False
+        db.delete(study)  # seriler ve dosya kayıtları cascade ile silinir
+        db.commit()
+    shutil.rmtree(_abs_path(study_id), ignore_errors=True)
+    logger.info("Calisma silindi: %s", study_id)
+    return True
+
+
+def _study_to_dict(study: Study) -> dict:
+    return {
+        "study_id": study.study_id,
+        "study_uid": study.study_uid,
+        "patient_id": study.patient_id,
+        "instance_count": study.instance_count,
+        "total_bytes": study.total_bytes,
+        "created_at": study.created_at,
+        "created_by": study.created_by,
+        "series": [
+            {
+                "series_uid": s.series_uid,
+                "description": s.description,
+                "instance_count": s.instance_count,
+            }
+            for s in study.series
+        ],
+    }
@@ -41,6 +41,19 @@ def admin_token():
     return res.json()["access_token"]
 
 
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    """Geçici çalışma deposu + DICOM önbelleği, thread'de DICOM işleme."""
+    from core.agent import dicom_cache, dicom_pool
+    from core.disk_cache import DiskLRUCache
+    from store import study_store
+
+    monkeypatch.setattr(study_store, "STUDY_STORE_DIR", str(tmp_path / "studies"))
+    monkeypatch.setattr(dicom_cache, "dicom_cache", DiskLRUCache(str(tmp_path / "cache"), 1 << 24, suffix=".json"))
+    monkeypatch.setattr(dicom_pool, "DICOM_WORKERS", 0)
+    return tmp_path
+
+
 @pytest.fixture(scope="session")
 def auth_headers(admin_token):
     """Admin auth header dict."""
@@ -0,0 +1,56 @@
+"""Testlerde paylaşılan sentetik DICOM üreticileri."""
+import io
+
+import numpy as np
+
+
+def dicom_bytes(
+    frames: int = 1,
+    rows: int = 32,
+    cols: int = 32,
+    series_uid: str | None = None,
+    instance_number: int | None = None,
+    position: float | None = None,
+    description: str = "T1 VIBE",
+) -> bytes:
+    """Sentetik MR DICOM dosyası (16 bit, MONOCHROME2, açık VR little endian)."""
+    from pydicom.dataset import Dataset, FileMetaDataset
+    from pydicom.uid import ExplicitVRLittleEndian, generate_uid
+
+    meta = FileMetaDataset()
+    meta.MediaStorageSOPClassUID = "1.2.840.10008.5.1.4.1.1.4"
+    meta.MediaStorageSOPInstanceUID = generate_uid()
+    meta.TransferSyntaxUID = ExplicitVRLittleEndian
+    ds = Dataset()
+    ds.file_meta = meta
+    ds.SOPClassUID = meta.MediaStorageSOPClassUID
+    ds.SOPInstanceUID = meta.MediaStorageSOPInstanceUID
+    ds.Modality = "MR"
+    ds.SeriesDescription = description
+    if position is not None:
+        ds.ImageOrientationPatient = [1, 0, 0, 0, 1, 0]
+        ds.ImagePositionPatient = [0, 0, position]
+    if series_uid:
+        ds.SeriesInstanceUID = series_uid
+    if instance_number is not None:
+        ds.InstanceNumber = instance_number
+    ds.Rows, ds.Columns = rows, cols
+    ds.SamplesPerPixel = 1
+    ds.PhotometricInterpretation = "MONOCHROME2"
+    ds.BitsAllocated, ds.BitsStored, ds.HighBit = 16, 12, 11
+    ds.PixelRepresentation = 0
+    if frames > 1:
+        ds.NumberOfFrames = frames
+    pixels = np.arange(frames * rows * cols, dtype=np.uint16).reshape(frames, rows, cols) % 4096
+    ds.PixelData = pixels.tobytes()
+    buf = io.BytesIO()
+    ds.save_as(buf, enforce_file_format=True)
+    return buf.getvalue()
+
+
+def series_bytes(uid: str, n: int, description: str = "T1 VIBE") -> list[bytes]:
+    """Aynı seride, ardışık pozisyonlu n dilim."""
+    return [
+        dicom_bytes(rows=16, cols=16, series_uid=uid, instance_number=i + 1, position=float(i), description=description)
+        for i in range(n)
+    ]
@@ -1,4 +1,5 @@
 """FastAPI endpoint testleri (httpx + TestClient)."""
+import json
 import os
 import pytest
 
@@ -207,6 +208,48 @@ class TestVerify:
         res = client.get(f"/verify/NONEXISTENT-999?sig=abc")
         assert res.status_code == 404
 
+    def test_etag_and_cache_headers(self):
+        res = client.get(f"/verify/{CASE_ID}?sig={self.sig}")
+        assert res.headers["etag"]
+        # Paylaşılan önbellekte tutulmaz, her taramada ETag ile yeniden doğrulanır
+        assert res.headers["cache-control"] == "private, no-cache"
+
+    def test_if_none_match_returns_304(self):
+        etag = client.get(f"/verify/{CASE_ID}?sig={self.sig}").headers["etag"]
+        res = client.get(f"/verify/{CASE_ID}?sig={self.sig}", headers={"If-None-Match": etag})
+        assert res.status_code == 304
+
+    def test_if_none_match_weak_list_and_wildcard(self):
+        etag = client.get(f"/verify/{CASE_ID}?sig={self.sig}").headers["etag"]
+        for value in (f'"other", W/{etag}', f"W/{etag}", "*"):
+            res = client.get(f"/verify/{CASE_ID}?sig={self.sig}", headers={"If-None-Match": value})
+            assert res.status_code == 304, value
+        res = client.get(f"/verify/{CASE_ID}?sig={self.sig}", headers={"If-None-Match": '"other"'})
+        assert res.status_code == 200
+
+    def test_delete_invalidates_cached_result(self):
+        from core.export import verify_cache
+        from core.export.audit_pack import build_pack
+        from store.store import delete_case, save_case
+
+        pack = build_pack("VERIFY-DEL", ANALYZE_BODY, "http://localhost:8000")
+        save_case("VERIFY-DEL", pack)
+        assert client.get(f"/verify/VERIFY-DEL?sig={pack['signature']}").status_code == 200
+        assert delete_case("VERIFY-DEL")
+        assert verify_cache.get_verification("VERIFY-DEL") is None
+        assert client.get(f"/verify/VERIFY-DEL?sig={pack['signature']}").status_code == 404
+
+    def test_new_version_invalidates_cached_result(self):
+        """Yeni versiyon kaydedilince eski QR imzası artık eşleşmemeli."""
+        old_etag = client.get(f"/verify/{CASE_ID}?sig={self.sig}").headers["etag"]
+        res = client.post(f"/analyze/{CASE_ID}", json=ANALYZE_BODY, headers=self._token())
+        new_sig = res.json()["signature"]
+        res = client.get(f"/verify/{CASE_ID}?sig={self.sig}")
+        assert res.json()["sig_match"] is (new_sig == self.sig)
+        res = client.get(f"/verify/{CASE_ID}?sig={new_sig}")
+        assert res.json()["sig_match"] is True
+        assert res.headers["etag"] != old_etag
+
 
 class TestAgentSave:
     def _token(self):
@@ -273,6 +316,24 @@ class TestAgentSave:
         assert res.status_code == 422
 
 
+class TestAgentAnalyze:
+    def _token(self):
+        res = client.post(
+            "/auth/token",
+            data={"username": "testadmin", "password": "testpass123"},
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+        return {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+    def test_unknown_layout_rejected(self):
+        res = client.post(
+            "/agent/analyze",
+            data={"clinical_json": "{}", "layout": "mosaic"},
+            headers=self._token(),
+        )
+        assert res.status_code == 422
+
+
 class TestDeleteCase:
     def _token(self):
         res = client.post(
@@ -466,3 +527,337 @@ class TestExport:
     def test_export_json_nonexistent(self):
         res = client.get("/export/json/NONEXISTENT-999", headers=self._token())
         assert res.status_code == 404
+
+    def test_export_pdf_cached_by_signature(self):
+        from core.export.pdf_cache import pdf_cache
+        from core.export.pdf_export import PDF_RENDERER_VERSION
+        headers = self._token()
+        sig = client.post(f"/analyze/{CASE_ID}", json=ANALYZE_BODY, headers=headers).json()["signature"]
+        res = client.get(f"/export/pdf/{CASE_ID}", headers=headers)
+        assert res.status_code == 200
+        assert res.headers["content-type"] == "application/pdf"
+        assert res.content.startswith(b"%PDF")
+        assert res.headers["etag"] == f'"{sig}-r{PDF_RENDERER_VERSION}"'
+
+        hits = pdf_cache.hits
+        again = client.get(f"/export/pdf/{CASE_ID}", headers=headers)
+        assert again.content == res.content
+        assert pdf_cache.hits == hits + 1
+
+    def test_export_pdf_renderer_version_invalidates_cache(self, monkeypatch):
+        from core.export import pdf_cache as pdf_cache_module
+        headers = self._token()
+        client.post(f"/analyze/{CASE_ID}", json=ANALYZE_BODY, headers=headers)
+        etag = client.get(f"/export/pdf/{CASE_ID}", headers=headers).headers["etag"]
+        monkeypatch.setattr(pdf_cache_module, "PDF_RENDERER_VERSION", 999)
+        misses = pdf_cache_module.pdf_cache.misses
+        res = client.get(f"/export/pdf/{CASE_ID}", headers={**headers, "If-None-Match": etag})
+        assert res.status_code == 200  # eski renderer'ın ETag'i artık eşleşmez
+        assert res.headers["etag"].endswith('-r999"')
+        assert pdf_cache_module.pdf_cache.misses == misses + 1
+
+    def test_export_pdf_cache_entry_evicted_during_send(self, monkeypatch):
+        from core.export.pdf_cache import pdf_cache
+        headers = self._token()
+        client.post(f"/analyze/{CASE_ID}", json=ANALYZE_BODY, headers=headers)
+        expected = client.get(f"/export/pdf/{CASE_ID}", headers=headers).content
+        real_open = pdf_cache.open
+
+        def open_then_evict(key, count=True):
+            f = real_open(key, count)
+            if f is not None:
+                os.remove(pdf_cache.path_for(key))  # eşzamanlı put_bytes'ın evict'i
+            return f
+
+        monkeypatch.setattr(pdf_cache, "open", open_then_evict)
+        res = client.get(f"/export/pdf/{CASE_ID}", headers=headers)
+        assert res.status_code == 200
+        assert res.content == expected
+
+        # Kayıt artık yok: ıska sayılır ve yeniden render edilir
+        res = client.get(f"/export/pdf/{CASE_ID}", headers=headers)
+        assert res.status_code == 200
+        assert res.content.startswith(b"%PDF")
+
+    def test_export_pdf_not_modified(self):
+        headers = self._token()
+        client.post(f"/analyze/{CASE_ID}", json=ANALYZE_BODY, headers=headers)
+        etag = client.get(f"/export/pdf/{CASE_ID}", headers=headers).headers["etag"]
+        res = client.get(f"/export/pdf/{CASE_ID}", headers={**headers, "If-None-Match": etag})
+        assert res.status_code == 304
+
+    def test_export_pdf_nonexistent(self):
+        res = client.get("/export/pdf/NONEXISTENT-999", headers=self._token())
+        assert res.status_code == 404
+
+    def test_export_pdf_overloaded_returns_503(self):
+        from core.export import pdf_service
+        headers = self._token()
+        client.post(f"/analyze/{CASE_ID}", json=ANALYZE_BODY, headers=headers)
+        taken = 0
+        while pdf_service._slots.acquire(blocking=False):
+            taken += 1
+        try:
+            res = client.get(f"/export/pdf/{CASE_ID}", headers=headers)
+        finally:
+            for _ in range(taken):
+                pdf_service._slots.release()
+        assert res.status_code == 503
+        assert res.headers["retry-after"] == "5"
+
+    def test_export_pdf_bulk_zip(self):
+        import io
+        import zipfile
+        headers = self._token()
+        sigs = {}
+        for i in range(3):
+            case_id = f"BULK-PDF-{i}"
+            sigs[case_id] = client.post(f"/analyze/{case_id}", json=ANALYZE_BODY, headers=headers).json()["signature"]
+        res = client.post(
+            "/export/pdf/bulk",
+            json={"case_ids": [*sigs, "NONEXISTENT-999"]},
+            headers=headers,
+        )
+        assert res.status_code == 200
+        assert res.headers["content-type"] == "application/zip"
+        zf = zipfile.ZipFile(io.BytesIO(res.content))
+        manifest = json.loads(zf.read("manifest.json"))
+        assert {f["case_id"]: f["signature"] for f in manifest["files"]} == sigs
+        assert manifest["errors"] == [{"case_id": "NONEXISTENT-999", "error": "Case not found"}]
+        for f in manifest["files"]:
+            assert zf.read(f["file"]).startswith(b"%PDF")
+
+        # İkinci istek render etmeden önbellekten kopyalar
+        again = client.post("/export/pdf/bulk", json={"case_ids": list(sigs)}, headers=headers)
+        files = json.loads(zipfile.ZipFile(io.BytesIO(again.content)).read("manifest.json"))["files"]
+        assert {f["source"] for f in files} == {"cache"}
+
+    def test_export_pdf_bulk_evicted_cache_and_name_collisions(self, monkeypatch):
+        import io
+        import zipfile
+        from core.export.pdf_cache import pdf_cache
+        headers = self._token()
+        case_ids = ["BULK.DUP", "BULK_DUP"]  # ikisi de BULK_DUP.pdf'e temizlenir
+        for case_id in case_ids:
+            client.post(f"/analyze/{case_id}", json=ANALYZE_BODY, headers=headers)
+        client.post("/export/pdf/bulk", json={"case_ids": case_ids}, headers=headers)  # önbelleği doldur
+
+        real_open = pdf_cache.open
+
+        def evict_then_open(key, count=True):
+            os.remove(pdf_cache.path_for(key))  # aramadan sonra başka istek sildi
+            return real_open(key, count)
+
+        monkeypatch.setattr(pdf_cache, "open", evict_then_open)
+        stats = pdf_cache.stats()
+        res = client.post("/export/pdf/bulk", json={"case_ids": case_ids}, headers=headers)
+        monkeypatch.setattr(pdf_cache, "open", real_open)
+
+        zf = zipfile.ZipFile(io.BytesIO(res.content))
+        manifest = json.loads(zf.read("manifest.json"))
+        assert manifest["errors"] == []
+        assert sorted(f["file"] for f in manifest["files"]) == ["BULK_DUP-2.pdf", "BULK_DUP.pdf"]
+        assert {f["source"] for f in manifest["files"]} == {"render"}
+        assert sorted(zf.namelist()) == ["BULK_DUP-2.pdf", "BULK_DUP.pdf", "manifest.json"]
+        for f in manifest["files"]:
+            assert zf.read(f["file"]).startswith(b"%PDF")
+        # Toplu export aramaları isabet oranını etkilemez
+        after = pdf_cache.stats()
+        assert (after["hits"], after["misses"]) == (stats["hits"], stats["misses"])
+
+    def test_export_pdf_bulk_requires_selection(self):
+        res = client.post("/export/pdf/bulk", json={}, headers=self._token())
+        assert res.status_code == 422
+
+    def test_pdf_metrics(self):
+        headers = self._token()
+        client.post(f"/analyze/{CASE_ID}", json=ANALYZE_BODY, headers=headers)
+        client.get(f"/export/pdf/{CASE_ID}", headers=headers)
+        res = client.get("/metrics/pdf", headers=headers)
+        assert res.status_code == 200
+        render = res.json()["render"]
+        assert render["renders"] >= 1
+        assert render["p50_ms"] <= render["p95_ms"] <= render["max_ms"]
+        assert "hit_rate" in res.json()["cache"]
+
+
+class TestRescore:
+    def _token(self):
+        res = client.post(
+            "/auth/token",
+            data={"username": "testadmin", "password": "testpass123"},
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+        return {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+    def _save_stale_case(self, case_id: str):
+        """Motor değişmiş gibi: DSL LR-5 ama saklı kategori LR-3."""
+        from core.export.audit_pack import build_pack
+        from store.store import save_case
+        pack = build_pack(case_id, ANALYZE_BODY, "http://localhost:8000")
+        pack["content"]["lirads"]["category"] = "LR-3"
+        save_case(case_id, pack, created_by="testadmin")
+
+    def test_dry_run_reports_transition(self):
+        self._save_stale_case("RESCORE-001")
+        res = client.post("/admin/rescore", json={"workers": 1}, headers=self._token())
+        assert res.status_code == 200
+        data = res.json()
+        assert data["total"] >= 1
+        assert data["transitions"].get("LR-3→LR-5", 0) >= 1
+        assert any(c["case_id"] == "RESCORE-001" for c in data["changes"])
+        assert data["written"] == 0
+
+    def test_write_creates_new_version(self):
+        headers = self._token()
+        self._save_stale_case("RESCORE-002")
+        res = client.post("/admin/rescore", json={"workers": 1, "write": True}, headers=headers)
+        assert res.json()["written"] >= 1
+        pack = client.get("/cases/RESCORE-002", headers=headers).json()
+        assert pack["version"] == 2
+        assert pack["content"]["lirads"]["category"] == "LR-5"
+        assert "previous_hash" in pack
+        # Yeni versiyon imzalı ve doğrulanabilir olmalı
+        res = client.get(f"/verify/RESCORE-002?sig={pack['signature']}")
+        assert res.json()["status"] == "VALID"
+
+    def test_process_pool_matches_inline(self):
+        headers = self._token()
+        inline = client.post("/admin/rescore", json={"workers": 1, "chunk_size": 3}, headers=headers).json()
+        pooled = client.post("/admin/rescore", json={"workers": 2, "chunk_size": 3}, headers=headers).json()
+        assert pooled["total"] == inline["total"]
+        assert pooled["transitions"] == inline["transitions"]
+
+    def test_unreadable_cases_reported_as_errors(self):
+        from db import get_db
+        from models import Case, CaseVersion
+        from store.store import save_case
+
+        pack = {"content": {"dsl": {"lesion_size_mm": float("inf")}, "lirads": {"category": "LR-3"}}}
+        save_case("RESCORE-INF", pack, created_by="testadmin")
+        with get_db() as db:
+            db.add(Case(case_id="RESCORE-BROKEN", created_at="", audit_pack_json="{not json"))
+            db.commit()
+        try:
+            res = client.post("/admin/rescore", json={"workers": 1, "chunk_size": 2}, headers=self._token())
+            assert res.status_code == 200
+            errors = res.json()["errors"]
+            assert "RESCORE-INF" in errors
+            assert "RESCORE-BROKEN" in errors
+        finally:
+            with get_db() as db:
+                for case_id in ("RESCORE-INF", "RESCORE-BROKEN"):
+                    db.query(CaseVersion).filter(CaseVersion.case_id == case_id).delete()
+                    db.query(Case).filter(Case.case_id == case_id).delete()
+                db.commit()
+
+    def test_concurrent_save_skips_stale_write(self, monkeypatch):
+        import core.rescore as rescore
+        from db import get_db
+        from models import CaseVersion
+        from store.store import get_case, save_case
+
+        headers = self._token()
+        self._save_stale_case("RESCORE-RACE")
+        original = rescore.rescore_pack
+
+        def _racing(pack, url):
+            # Okuma ile toplu yazma arasında başka bir kullanıcı v2'yi kaydeder
+            if pack.get("case_id") == "RESCORE-RACE":
+                latest = get_case("RESCORE-RACE")
+                save_case("RESCORE-RACE", original(latest, url), created_by="testadmin")
+            return original(pack, url)
+
+        monkeypatch.setattr(rescore, "rescore_pack", _racing)
+        data = client.post("/admin/rescore", json={"workers": 1, "write": True}, headers=headers).json()
+        assert "RESCORE-RACE" in data["conflicts"]
+        with get_db() as db:
+            versions = [
+                v for (v,) in db.query(CaseVersion.version)
+                .filter(CaseVersion.case_id == "RESCORE-RACE").all()
+            ]
+        assert sorted(versions) == [1, 2]  # aynı versiyon iki kez yazılmadı
+        res = client.get(f"/verify/RESCORE-RACE?sig={get_case('RESCORE-RACE')['signature']}")
+        assert res.json()["status"] == "VALID"
+
+    def test_http_workers_capped(self, monkeypatch):
+        import main
+        monkeypatch.setattr(main, "RESCORE_HTTP_MAX_WORKERS", 1)
+        res = client.post("/admin/rescore", json={"workers": 32}, headers=self._token())
+        assert res.status_code == 200
+        assert res.json()["workers"] == 1
+
+    def test_rescore_without_auth_denied(self):
+        res = client.post("/admin/rescore", json={})
+        assert res.status_code == 401
+
+
+class TestLiradsScore:
+    def _token(self):
+        res = client.post(
+            "/auth/token",
+            data={"username": "testadmin", "password": "testpass123"},
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+        return {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+    def test_scores_every_dsl_and_lesion(self):
+        body = {
+            "dsls": [ANALYZE_BODY, {"lesion_size_mm": 5}],
+            "cirrhosis": True,
+            "lesions": [
+                {"size_mm": "22", "arterial_enhancement": "hiperenhansman (non-rim APHE)",
+                 "washout": True, "capsule": True},
+                {"size_mm": 15, "arterial_enhancement": "rim enhansman"},
+                {"size_mm": 30, "tumor_in_vein": True},
+            ],
+        }
+        res = client.post("/lirads/score", json=body, headers=self._token())
+        assert res.status_code == 200
+        data = res.json()
+        assert data["count"] == 5
+        assert [r["category"] for r in data["results"]] == ["LR-5", "LR-2", "LR-5", "LR-M", "LR-TIV"]
+        assert [r["source"] for r in data["results"]] == ["dsl", "dsl", "lesion", "lesion", "lesion"]
+        assert data["results"][2]["label"] == "LR-5 (Definite HCC)"
+
+    def test_huge_dsl_size_scores_like_scalar_engine(self):
+        from core.export.audit_pack import run_lirads_decision
+        dsl = {"lesion_size_mm": 3000000000}
+        res = client.post("/lirads/score", json={"dsls": [dsl]}, headers=self._token())
+        assert res.status_code == 200
+        assert res.json()["results"][0]["category"] == run_lirads_decision(dsl)["category"]
+
+    def test_infinite_lesion_size_rejected(self):
+        body = {"lesions": [{"size_mm": 12}, {"size_mm": "inf"}]}
+        res = client.post("/lirads/score", json=body, headers=self._token())
+        assert res.status_code == 422
+        assert "lesions[1]" in res.json()["detail"]
+
+    def test_infinite_dsl_size_rejected(self):
+        res = client.post(
+            "/lirads/score",
+            content='{"dsls": [{"lesion_size_mm": 5}, {"lesion_size_mm": Infinity}]}',
+            headers={**self._token(), "Content-Type": "application/json"},
+        )
+        assert res.status_code == 422
+        assert "dsls[1]" in res.json()["detail"]
+
+    def test_does_not_create_case(self):
+        before = client.get("/stats", headers=self._token()).json()["total_cases"]
+        client.post("/lirads/score", json={"dsls": [ANALYZE_BODY]}, headers=self._token())
+        after = client.get("/stats", headers=self._token()).json()["total_cases"]
+        assert after == before
+
+    def test_invalid_dsl_rejected(self):
+        res = client.post("/lirads/score", json={"dsls": [{"lesion_size_mm": "abc"}]}, headers=self._token())
+        assert res.status_code == 422
+
+    def test_too_many_items_rejected(self):
+        from main import LIRADS_SCORE_MAX_ITEMS
+        body = {"dsls": [{"lesion_size_mm": 1}] * (LIRADS_SCORE_MAX_ITEMS + 1)}
+        res = client.post("/lirads/score", json=body, headers=self._token())
+        assert res.status_code == 422
+
+    def test_score_without_auth_denied(self):
+        res = client.post("/lirads/score", json={"dsls": [ANALYZE_BODY]})
+        assert res.status_code == 401
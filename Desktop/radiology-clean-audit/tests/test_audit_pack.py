@@ -512,3 +512,24 @@ class TestBuildAgentPack:
         pack = build_agent_pack("AGENT-003", clinical, "Beyin raporu", "http://localhost:8000")
         assert pack["content"]["clinical_data"]["region"] == "brain"
         assert pack["content"]["clinical_data"]["age"] == "45"
+
+
+class TestExtractLesionDsls:
+    def test_one_dsl_per_lesion_in_order(self):
+        from core.export.audit_pack import extract_lesion_dsls
+        clinical = {
+            "cirrhosis": True,
+            "lesions": [
+                {"size_mm": "8", "arterial_enhancement": "hiperenhansman (non-rim APHE)"},
+                {"size_mm": "25", "washout": True},
+            ],
+        }
+        dsls = extract_lesion_dsls(clinical)
+        assert [d["lesion_size_mm"] for d in dsls] == [8, 25]
+        assert all(d["cirrhosis"] for d in dsls)
+        # En yüksek riskli seçim değişmemeli
+        assert extract_dsl_from_findings(clinical) == dsls[1]
+
+    def test_no_lesions_returns_empty_list(self):
+        from core.export.audit_pack import extract_lesion_dsls
+        assert extract_lesion_dsls({"cirrhosis": True}) == []
@@ -0,0 +1,266 @@
+"""ZIP akış okuyucu ve ZIP / DICOMDIR ile çalışma yükleme testleri."""
+import asyncio
+import io
+import os
+import threading
+import zipfile
+
+import pytest
+
+import main
+from core.agent import dicom_archive, dicom_pool
+from core import zip_stream
+from core.zip_stream import ZipSizeLimitError, ZipStreamError, iter_zip
+from tests.dicom_factory import series_bytes
+
+
+def _zip(members, compression=zipfile.ZIP_DEFLATED) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=compression) as zf:
+        for name, data in members:
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+class _Unseekable(io.RawIOBase):
+    """zipfile'ı veri tanımlayıcılı (akış) yazmaya zorlar."""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.data += b
+        return len(b)
+
+
+def _streamed_zip(members) -> bytes:
+    out = _Unseekable()
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members:
+            with zf.open(name, "w") as f:
+                f.write(data)
+    return bytes(out.data)
+
+
+def _dicomdir_bytes(file_ids) -> bytes:
+    from pydicom.dataset import Dataset, FileMetaDataset
+    from pydicom.uid import ExplicitVRLittleEndian, generate_uid
+
+    meta = FileMetaDataset()
+    meta.MediaStorageSOPClassUID = "1.2.840.10008.1.3.10"
+    meta.MediaStorageSOPInstanceUID = generate_uid()
+    meta.TransferSyntaxUID = ExplicitVRLittleEndian
+    ds = Dataset()
+    ds.file_meta = meta
+    ds.FileSetID = "EXPORT"
+    records = []
+    for file_id in file_ids:
+        record = Dataset()
+        record.DirectoryRecordType = "IMAGE"
+        record.ReferencedFileID = file_id.split("/")
+        records.append(record)
+    report = Dataset()
+    report.DirectoryRecordType = "SR DOCUMENT"
+    report.ReferencedFileID = ["DICOM", "SR0001"]
+    ds.DirectoryRecordSequence = records + [report]
+    buf = io.BytesIO()
+    ds.save_as(buf, enforce_file_format=True)
+    return buf.getvalue()
+
+
+async def _chunks(data: bytes, size: int = 4096, log: list | None = None):
+    for i in range(0, len(data), size):
+        if log is not None:
+            log.append(i)
+        await asyncio.sleep(0)  # ağdan okuma gibi event loop'a dön
+        yield data[i:i + size]
+
+
+class _SpyInflater:
+    """zlib decompressobj sarmalayıcı: hangi üyeler, hangi thread'de açıldı."""
+
+    created = 0
+    threads: set = set()
+
+    def __init__(self, wbits):
+        type(self).created += 1
+        self._inner = _real_decompressobj(wbits)
+
+    def decompress(self, data, max_length=0):
+        type(self).threads.add(threading.current_thread().name)
+        return self._inner.decompress(data, max_length)
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+
+_real_decompressobj = zip_stream.zlib.decompressobj
+
+
+@pytest.fixture
+def spy_inflater(monkeypatch):
+    monkeypatch.setattr(_SpyInflater, "created", 0)
+    monkeypatch.setattr(_SpyInflater, "threads", set())
+    monkeypatch.setattr(zip_stream.zlib, "decompressobj", _SpyInflater)
+    return _SpyInflater
+
+
+async def _read_all(data: bytes, skip=(), max_unpacked=None):
+    out = {}
+    async for entry in iter_zip(_chunks(data, 777), max_unpacked):
+        if entry.is_dir or entry.name in skip:
+            continue
+        out[entry.name] = b"".join([piece async for piece in entry.data(chunk_size=1000)])
+    return out
+
+
+class TestZipStream:
+    @pytest.mark.parametrize("compression", [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+    def test_members_match_zipfile(self, compression):
+        members = [("a/1.dcm", os.urandom(50_000)), ("a/", b""), ("a/2.dcm", b"ab" * 40_000), ("b.txt", b"x")]
+        data = _zip(members, compression)
+        got = asyncio.run(_read_all(data, skip={"a/2.dcm"}))
+        assert got == {"a/1.dcm": members[0][1], "b.txt": b"x"}
+
+    def test_data_descriptor_members(self):
+        members = [("1.dcm", os.urandom(20_000)), ("2.dcm", b"z" * 300_000)]
+        assert asyncio.run(_read_all(_streamed_zip(members))) == dict(members)
+
+    def test_skipped_members_not_inflated(self, spy_inflater):
+        members = [("a.dcm", b"a" * 50_000), ("viewer.bin", os.urandom(200_000)), ("b.dcm", b"b" * 50_000)]
+        got = asyncio.run(_read_all(_zip(members), skip={"viewer.bin"}))
+        assert got == {"a.dcm": members[0][1], "b.dcm": members[2][1]}
+        assert spy_inflater.created == 2  # atlanan üye için inflater kurulmadı
+
+    def test_inflate_runs_off_event_loop(self, spy_inflater):
+        members = [("1.dcm", os.urandom(20_000)), ("2.dcm", b"z" * 300_000)]
+        assert asyncio.run(_read_all(_streamed_zip(members))) == dict(members)
+        assert spy_inflater.threads
+        assert threading.main_thread().name not in spy_inflater.threads
+
+    @pytest.mark.parametrize("build", [_zip, _streamed_zip])
+    def test_unpacked_limit_counts_skipped_members(self, build):
+        members = [("a.dcm", b"a" * 3000), ("viewer.bin", b"v" * 3000)]
+        data = build(members)
+        assert asyncio.run(_read_all(data, skip={"viewer.bin"}, max_unpacked=6000))
+        with pytest.raises(ZipSizeLimitError):
+            asyncio.run(_read_all(data, skip={"viewer.bin"}, max_unpacked=5000))
+
+    def test_corrupt_member_rejected(self):
+        data = bytearray(_zip([("1.dcm", b"hello world" * 100)], zipfile.ZIP_STORED))
+        data[40] ^= 0xFF  # üye verisinin içi
+        with pytest.raises(ZipStreamError):
+            asyncio.run(_read_all(bytes(data)))
+
+    def test_not_a_zip(self):
+        with pytest.raises(ZipStreamError):
+            asyncio.run(_read_all(b"not a zip at all"))
+        with pytest.raises(ZipStreamError):
+            asyncio.run(_read_all(b""))
+
+
+class TestSpooledArchive:
+    def _ingest(self, data, log=None):
+        async def run():
+            async with dicom_archive.spooled_archive(_chunks(data, 256, log)) as archive:
+                paths = [p for p, _, _ in archive.files]
+                assert all(os.path.exists(p) for p in paths)
+            assert not any(os.path.exists(p) for p in paths)
+            return archive
+        return asyncio.run(run())
+
+    def _spy(self, monkeypatch, log=None):
+        calls = []
+        real = dicom_pool.read_study_headers
+
+        async def spy(paths):
+            calls.append((len(log) if log is not None else 0, list(paths)))
+            return await real(paths)
+
+        monkeypatch.setattr(dicom_pool, "DICOM_WORKERS", 0)
+        monkeypatch.setattr(dicom_pool, "read_study_headers", spy)
+        return calls
+
+    def test_headers_read_while_uploading(self, monkeypatch):
+        log = []
+        calls = self._spy(monkeypatch, log)
+        blobs = series_bytes("1.2.3", 4)
+        data = _zip([(f"IMG{i}", b) for i, b in enumerate(blobs)] + [("notes.txt", b"x")], zipfile.ZIP_STORED)
+        archive = self._ingest(data, log)
+        assert len(archive.files) == 4
+        assert archive.members == 5
+        assert calls[0][0] < len(log)  # ilk başlık, gövdenin sonu gelmeden okundu
+
+    @pytest.mark.parametrize("dicomdir_first", [True, False])
+    def test_dicomdir_selects_instances(self, monkeypatch, dicomdir_first):
+        calls = self._spy(monkeypatch)
+        blobs = series_bytes("1.2.3", 3)
+        images = [(f"export/DICOM/IM{i}", b) for i, b in enumerate(blobs)]
+        dicomdir = ("export/DICOMDIR", _dicomdir_bytes(["DICOM/IM0", "DICOM/IM2"]))
+        extras = [("export/DICOM/SR0001", b"report"), ("export/VIEWER/viewer.exe", b"MZ" * 1000)]
+        members = [dicomdir] + images + extras if dicomdir_first else images + extras + [dicomdir]
+        archive = self._ingest(_zip(members))
+
+        assert [h["instance_number"] for _, _, h in archive.files] == [1, 3]
+        read = [p for _, paths in calls for p in paths]
+        if dicomdir_first:
+            assert len(read) == 2  # işaret edilmeyen üyeler açılmadı
+
+    @pytest.mark.parametrize("with_dicomdir", [False, True])
+    def test_total_size_limit(self, monkeypatch, with_dicomdir):
+        self._spy(monkeypatch)
+        members = [("A", b"x" * 3000), ("B", b"x" * 3000)]
+        limit = 4000
+        if with_dicomdir:
+            # B DICOMDIR'de yok: atlanır ama açılmış boyutu yine sayılır
+            dicomdir = _dicomdir_bytes(["A"])
+            members.insert(0, ("DICOMDIR", dicomdir))
+            limit += len(dicomdir)
+        data = _zip(members)
+
+        async def run():
+            async with dicom_archive.spooled_archive(_chunks(data), max_total_bytes=limit):
+                pass
+
+        with pytest.raises(main.HTTPException) as exc:
+            asyncio.run(run())
+        assert exc.value.status_code == 413
+
+
+class TestArchiveApi:
+    def test_zip_upload_creates_study(self, client, auth_headers, store, monkeypatch):
+        monkeypatch.setattr(main, "STUDY_PREWARM", False)
+        blobs = series_bytes("1.2.7", 3)
+        data = _streamed_zip([(f"DICOM/IM{i}", b) for i, b in enumerate(blobs)] + [("README.TXT", b"x")])
+        res = client.post(
+            "/studies/archive",
+            content=data,
+            headers={**auth_headers, "Content-Type": "application/zip"},
+        )
+        assert res.status_code == 200
+        study = res.json()
+        assert study["instance_count"] == 3
+        assert study["skipped"] == 1
+        assert len(main.get_study_instances(study["study_id"])) == 3
+
+    def test_invalid_zip(self, client, auth_headers, store):
+        res = client.post("/studies/archive", content=b"garbage", headers=auth_headers)
+        assert res.status_code == 422
+
+    def test_zip_without_images(self, client, auth_headers, store):
+        res = client.post("/studies/archive", content=_zip([("a.txt", b"x")]), headers=auth_headers)
+        assert res.status_code == 422
+
+    def test_folder_upload_honours_dicomdir(self, client, auth_headers, store, monkeypatch):
+        monkeypatch.setattr(main, "STUDY_PREWARM", False)
+        blobs = series_bytes("1.2.8", 3)
+        parts = [("DICOM/IM0", blobs[0]), ("DICOM/IM1", blobs[1]), ("DICOM/IM2", blobs[2])]
+        parts.append(("DICOMDIR", _dicomdir_bytes(["DICOM/IM1"])))
+        files = [("dicoms", (name, data, "application/octet-stream")) for name, data in parts]
+        res = client.post("/studies", files=files, headers=auth_headers)
+        assert res.status_code == 200
+        assert res.json()["instance_count"] == 1
+        assert res.json()["skipped"] == 3
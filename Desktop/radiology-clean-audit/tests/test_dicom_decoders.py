@@ -0,0 +1,130 @@
+"""Transfer syntax tespiti ve decoder eklentisi seçimi testleri."""
+import io
+
+import numpy as np
+import pydicom
+import pytest
+from pydicom.uid import JPEGBaseline8Bit, JPEGLosslessSV1, RLELossless
+
+from core.agent import dicom_decoders
+from core.agent.dicom_decoders import UnsupportedTransferSyntax, decode_frames, decode_plan
+from core.agent.dicom_utils import extract_images_from_dicom, read_header
+from tests.dicom_factory import dicom_bytes
+
+
+@pytest.fixture(autouse=True)
+def _clear_plan_cache():
+    dicom_decoders._plan_for.cache_clear()
+    yield
+    dicom_decoders._plan_for.cache_clear()
+
+
+def _rle_bytes(frames: int = 6) -> bytes:
+    ds = pydicom.dcmread(io.BytesIO(dicom_bytes(frames=frames, rows=16, cols=16)))
+    ds.compress(RLELossless, encoding_plugin="pydicom")
+    buf = io.BytesIO()
+    ds.save_as(buf, enforce_file_format=True)
+    return buf.getvalue()
+
+
+def _header(data: bytes):
+    return pydicom.dcmread(io.BytesIO(data), stop_before_pixels=True)
+
+
+class _NoPlugins:
+    available_plugins = set()
+    missing_dependencies = ["pylibjpeg - requires pylibjpeg-libjpeg"]
+
+
+class TestDecodePlan:
+    def test_native_is_uncompressed(self):
+        plan = decode_plan(_header(dicom_bytes()))
+        assert not plan.compressed
+        assert plan.plugin == ""
+
+    def test_compressed_picks_first_available(self):
+        plan = decode_plan(_header(_rle_bytes()))
+        assert plan.compressed
+        assert plan.name == "RLE Lossless"
+        available = pydicom.pixels.get_decoder(RLELossless).available_plugins
+        expected = next(p for p in dicom_decoders.DEFAULT_PLUGIN_ORDER if p in available)
+        assert plan.plugin == expected
+
+    def test_env_order_overrides(self, monkeypatch):
+        monkeypatch.setattr(dicom_decoders, "DICOM_DECODER_PLUGINS", ["pydicom"])
+        assert decode_plan(_header(_rle_bytes())).plugin == "pydicom"
+
+    def test_jpeg_baseline_prefers_pillow(self):
+        ds = _header(dicom_bytes())
+        ds.file_meta.TransferSyntaxUID = JPEGBaseline8Bit
+        assert decode_plan(ds).plugin == "pillow"
+
+    def test_missing_decoder_raises_with_dependencies(self, monkeypatch):
+        monkeypatch.setattr(dicom_decoders, "get_decoder", lambda ts: _NoPlugins())
+        ds = _header(dicom_bytes())
+        ds.file_meta.TransferSyntaxUID = JPEGLosslessSV1
+        with pytest.raises(UnsupportedTransferSyntax, match="pylibjpeg-libjpeg"):
+            decode_plan(ds)
+
+
+class TestDecodeFrames:
+    def test_rle_matches_native(self):
+        native = extract_images_from_dicom(dicom_bytes(frames=6, rows=16, cols=16), max_slices=3)
+        rle = extract_images_from_dicom(_rle_bytes(frames=6), max_slices=3)
+        assert [img["base64"] for img in rle] == [img["base64"] for img in native]
+
+    def test_threaded_matches_sequential(self):
+        data = _rle_bytes(frames=6)
+        plan = decode_plan(_header(data))
+        seq = decode_frames(io.BytesIO(data), [0, 2, 5], plan, threads=1)
+        par = decode_frames(io.BytesIO(data), [0, 2, 5], plan, threads=3)
+        assert seq.shape == (3, 16, 16)
+        np.testing.assert_array_equal(seq, par)
+
+    def test_threads_read_only_their_frames(self, tmp_path, monkeypatch):
+        path = tmp_path / "rle.dcm"
+        path.write_bytes(_rle_bytes(frames=12))
+        plan = decode_plan(_header(path.read_bytes()))
+        calls = []
+        real = dicom_decoders.iter_pixels
+
+        def spy(src, indices, **kwargs):
+            calls.append(list(indices))
+            return real(src, indices=indices, **kwargs)
+
+        monkeypatch.setattr(dicom_decoders, "iter_pixels", spy)
+        with open(path, "rb") as fp:
+            par = decode_frames(fp, [1, 4, 7, 10], plan, threads=2)
+        monkeypatch.setattr(dicom_decoders, "iter_pixels", real)
+        np.testing.assert_array_equal(par, decode_frames(str(path), [1, 4, 7, 10], plan, threads=1))
+        # Her thread yalnızca kendi payını decode eder; tüm veri bir kez okunmaz
+        assert sorted(calls) == [[1, 7], [4, 10]]
+
+    def test_extract_from_path_decodes_in_threads(self, tmp_path, monkeypatch):
+        path = tmp_path / "rle.dcm"
+        path.write_bytes(_rle_bytes(frames=12))
+        single = extract_images_from_dicom(str(path), frames=[0, 3, 7, 11])
+        calls = []
+        real = dicom_decoders.iter_pixels
+
+        def spy(src, indices, **kwargs):
+            calls.append(list(indices))
+            return real(src, indices=indices, **kwargs)
+
+        monkeypatch.setattr(dicom_decoders, "DICOM_DECODE_THREADS", 2)
+        monkeypatch.setattr(dicom_decoders, "iter_pixels", spy)
+        threaded = extract_images_from_dicom(str(path), frames=[0, 3, 7, 11])
+        # Yol mmap ile açılır; frame'ler yine thread'lere bölünür
+        assert sorted(calls) == [[0, 7], [3, 11]]
+        assert [img["base64"] for img in threaded] == [img["base64"] for img in single]
+
+    def test_unsupported_skipped_before_decode(self, tmp_path, monkeypatch):
+        ds = pydicom.dcmread(io.BytesIO(_rle_bytes()))
+        ds.file_meta.TransferSyntaxUID = JPEGLosslessSV1
+        path = tmp_path / "lossless.dcm"
+        ds.save_as(path)
+
+        monkeypatch.setattr(dicom_decoders, "get_decoder", lambda ts: _NoPlugins())
+        monkeypatch.setattr(dicom_decoders, "iter_pixels", lambda *a, **kw: pytest.fail("decode denendi"))
+        assert extract_images_from_dicom(str(path)) == []
+        assert read_header(str(path)) is None
@@ -0,0 +1,77 @@
+"""dHash ile yakın kopya dilim eleme testleri."""
+import asyncio
+import io
+
+import numpy as np
+
+from core.agent import dicom_pool
+from core.agent.dicom_utils import dedupe_images, dhash_frames, extract_images_from_dicom, hamming_matrix
+from tests.dicom_factory import dicom_bytes
+
+
+def _frames(seed, k=1, side=64):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, (k, side, side), dtype=np.uint8)
+
+
+class TestDhash:
+    def test_identical_and_slightly_changed_frames_are_close(self):
+        base = _frames(0)
+        noisy = np.clip(base.astype(int) + np.random.default_rng(1).integers(-3, 4, base.shape), 0, 255).astype(np.uint8)
+        hashes = dhash_frames(np.concatenate([base, base, noisy, _frames(2)]))
+        dist = hamming_matrix(hashes)
+        assert dist[0, 1] == 0
+        assert dist[0, 2] <= 4
+        assert dist[0, 3] > 10
+
+    def test_batch_matches_single(self):
+        frames = _frames(3, k=5, side=50)
+        batch = dhash_frames(frames)
+        assert [int(h) for h in batch] == [int(dhash_frames(f[None])[0]) for f in frames]
+
+    def test_tiny_and_color_frames(self):
+        assert dhash_frames(np.zeros((2, 4, 4), np.uint8)).shape == (2,)
+        assert dhash_frames(np.zeros((1, 32, 32, 3), np.uint8)).shape == (1,)
+
+
+class TestDedupeImages:
+    def _img(self, tag, hash_):
+        return {"tag": tag, "dhash": f"{hash_:016x}"}
+
+    def test_drops_near_duplicates_keeping_first(self):
+        images = [self._img("a", 0b0), self._img("b", 0b111), self._img("c", 0xFFFF), self._img("d", 0b1)]
+        kept, removed = dedupe_images(images, max_distance=3)
+        assert [i["tag"] for i in kept] == ["a", "c"]
+        assert removed == 2
+
+    def test_negative_distance_disables(self):
+        images = [self._img("a", 0), self._img("b", 0)]
+        assert dedupe_images(images, max_distance=-1) == (images, 0)
+
+    def test_images_without_hash_are_kept(self):
+        images = [{"tag": "old"}, self._img("a", 0), self._img("b", 0)]
+        kept, removed = dedupe_images(images, max_distance=0)
+        assert [i.get("tag") for i in kept] == ["old", "a"]
+        assert removed == 1
+
+
+class TestExtractedHash:
+    def test_extract_images_carries_dhash(self):
+        images = extract_images_from_dicom(dicom_bytes(frames=3), max_slices=3)
+        assert all(len(img["dhash"]) == 16 for img in images)
+
+    def test_same_slice_in_two_series_sent_once(self, monkeypatch, tmp_path):
+        from pydicom import dcmread
+
+        monkeypatch.setattr(dicom_pool, "DICOM_WORKERS", 0)
+        paths = []
+        for series in ("1.2.3.1", "1.2.3.2"):
+            for i in range(3):
+                ds = dcmread(io.BytesIO(dicom_bytes(rows=64, cols=64, series_uid=series, instance_number=i + 1)))
+                ds.PixelData = _frames(i)[0].astype(np.uint16).tobytes()
+                p = tmp_path / f"{series}_{i}.dcm"
+                ds.save_as(p)
+                paths.append(str(p))
+        images, plan = asyncio.run(dicom_pool.assemble_study(paths, selector="uniform"))
+        assert plan["duplicates_removed"] == 3
+        assert [img["series_uid"] for img in images] == ["1.2.3.1"] * 3
@@ -0,0 +1,71 @@
+"""DICOM modality LUT + VOI pencere normalizasyonu testleri."""
+import numpy as np
+from pydicom.dataset import Dataset
+
+from core.agent.dicom_utils import normalize_frames
+
+
+def _ds(**tags) -> Dataset:
+    ds = Dataset()
+    ds.PhotometricInterpretation = "MONOCHROME2"
+    for k, v in tags.items():
+        setattr(ds, k, v)
+    return ds
+
+
+class TestNormalizeFrames:
+    def test_window_center_width(self):
+        frames = np.array([[[0, 49, 100, 150, 1000]]], dtype=np.uint16)
+        out = normalize_frames(frames, _ds(WindowCenter=100, WindowWidth=101))
+        assert out.dtype == np.uint8
+        # DICOM lineer VOI: ((x - (c - 0.5)) / (w - 1) + 0.5) * 255
+        assert out.tolist() == [[[0, 0, 129, 255, 255]]]
+
+    def test_multivalued_window_uses_first(self):
+        frames = np.array([[[0, 100, 200]]], dtype=np.uint16)
+        out = normalize_frames(frames, _ds(WindowCenter=[100, 500], WindowWidth=[201, 50]))
+        assert out.tolist() == [[[1, 128, 255]]]
+
+    def test_rescale_slope_intercept_ct(self):
+        # Depolanan değer 1064 → HU 40 (intercept -1024), pencere 40/400
+        frames = np.array([[[0, 1064, 3000]]], dtype=np.int16)
+        out = normalize_frames(frames, _ds(RescaleSlope=1, RescaleIntercept=-1024, WindowCenter=40, WindowWidth=400))
+        assert out.tolist() == [[[0, 128, 255]]]
+
+    def test_percentile_fallback_ignores_outlier(self):
+        rng = np.random.default_rng(0)
+        frames = rng.integers(100, 200, size=(2, 64, 64)).astype(np.uint16)
+        frames[0, 0, 0] = 4095  # tek aykırı piksel
+        out = normalize_frames(frames, _ds())
+        # min-max olsaydı tüm görüntü ~0-12 aralığına sıkışırdı
+        assert out[1].mean() > 100
+        assert out[0, 0, 0] == 255
+
+    def test_percentiles_shared_across_frames(self):
+        dark = np.full((1, 32, 32), 100, dtype=np.uint16)
+        bright = np.full((1, 32, 32), 200, dtype=np.uint16)
+        out = normalize_frames(np.concatenate([dark, bright]), _ds())
+        assert out[0].max() == 0
+        assert out[1].min() == 255
+
+    def test_monochrome1_inverted(self):
+        frames = np.array([[[0, 100, 200]]], dtype=np.uint16)
+        out = normalize_frames(frames, _ds(PhotometricInterpretation="MONOCHROME1", WindowCenter=100, WindowWidth=201))
+        assert out.tolist() == [[[254, 127, 0]]]
+
+    def test_lut_path_matches_float_path(self):
+        rng = np.random.default_rng(1)
+        ints = rng.integers(-2000, 3000, size=(3, 48, 48)).astype(np.int16)
+        ds = _ds(RescaleSlope=0.5, RescaleIntercept=10)
+        via_lut = normalize_frames(ints, ds)
+        via_float = normalize_frames(ints.astype(np.float32), ds)
+        assert np.abs(via_lut.astype(int) - via_float.astype(int)).max() <= 1
+
+    def test_deterministic(self):
+        rng = np.random.default_rng(2)
+        frames = rng.integers(0, 4096, size=(3, 64, 64)).astype(np.uint16)
+        assert np.array_equal(normalize_frames(frames, _ds()), normalize_frames(frames.copy(), _ds()))
+
+    def test_constant_image_is_black(self):
+        out = normalize_frames(np.full((1, 8, 8), 7, dtype=np.uint16), _ds())
+        assert out.max() == 0
@@ -0,0 +1,99 @@
+"""Event loop dışı DICOM işleme havuzu testleri."""
+import asyncio
+import time
+
+from core.agent.dicom_pool import assemble_study
+from tests.dicom_factory import dicom_bytes
+
+
+def _assemble(paths, **kwargs):
+    # sentetik dosyaların pikselleri aynı: kopya eleme kapalı
+    return asyncio.run(assemble_study(paths, selector="uniform", dedup_distance=-1, **kwargs)).images
+
+
+class TestOffLoop:
+    def test_event_loop_stays_responsive(self, tmp_path):
+        paths = []
+        for i in range(4):
+            p = tmp_path / f"big{i}.dcm"
+            p.write_bytes(dicom_bytes(frames=6, rows=512, cols=512, instance_number=i))
+            paths.append(str(p))
+
+        async def run():
+            ticks = []
+            done = asyncio.Event()
+
+            async def ticker():
+                while not done.is_set():
+                    ticks.append(time.perf_counter())
+                    await asyncio.sleep(0.005)
+
+            task = asyncio.create_task(ticker())
+            study = await assemble_study(paths, max_images=12, selector="uniform", dedup_distance=-1)
+            done.set()
+            await task
+            return study.images, ticks
+
+        images, ticks = asyncio.run(run())
+        assert images
+        assert len(ticks) > 1  # işleme sürerken loop başka coroutine'leri çalıştırdı
+
+
+class TestProcessedImageCache:
+    def _setup(self, monkeypatch, tmp_path):
+        from core.agent import dicom_cache, dicom_pool
+        from core.disk_cache import DiskLRUCache
+
+        cache = DiskLRUCache(str(tmp_path / "cache"), max_bytes=16 * 1024 * 1024, suffix=".json")
+        monkeypatch.setattr(dicom_cache, "dicom_cache", cache)
+        monkeypatch.setattr(dicom_pool, "DICOM_WORKERS", 0)
+        calls = []
+        real = dicom_pool.extract_images_from_dicom
+
+        def spy(path, max_slices, frames=None, encoding=None):
+            calls.append(path)
+            return real(path, max_slices, frames, encoding)
+
+        monkeypatch.setattr(dicom_pool, "extract_images_from_dicom", spy)
+        return cache, calls
+
+    def test_repeat_analysis_skips_extraction(self, monkeypatch, tmp_path):
+        cache, calls = self._setup(monkeypatch, tmp_path)
+        p = tmp_path / "a.dcm"
+        p.write_bytes(dicom_bytes(frames=4))
+        first = _assemble([str(p)], max_images=3, digests=["abc"])
+        second = _assemble([str(p)], max_images=3, digests=["abc"])
+        assert len(calls) == 1
+        assert second == first
+        assert cache.stats()["hits"] == 1
+
+    def test_without_digests_cache_is_bypassed(self, monkeypatch, tmp_path):
+        cache, calls = self._setup(monkeypatch, tmp_path)
+        p = tmp_path / "a.dcm"
+        p.write_bytes(dicom_bytes())
+        _assemble([str(p)], max_images=3)
+        _assemble([str(p)], max_images=3)
+        assert len(calls) == 2
+        assert not list((tmp_path / "cache").glob("*.json"))
+
+    def test_unreadable_file_is_not_cached(self, monkeypatch, tmp_path):
+        cache, calls = self._setup(monkeypatch, tmp_path)
+        p = tmp_path / "bad.dcm"
+        p.write_bytes(b"not a dicom")
+        assert _assemble([str(p)], digests=["bad"]) == []
+        assert not list((tmp_path / "cache").glob("*.json"))
+
+
+class TestCacheKey:
+    def test_key_depends_on_content_and_params(self):
+        from core.agent.dicom_cache import cache_key
+        from core.agent.dicom_utils import ImageEncoding
+
+        base = cache_key("abc", 3)
+        assert cache_key("abc", 3) == base
+        assert cache_key("abc", 3, encoding=ImageEncoding()) == base
+        assert cache_key("abd", 3) != base
+        assert cache_key("abc", 4) != base
+        assert cache_key("abc", 3, frames=[0, 5]) != base
+        assert cache_key("abc", 3, encoding=ImageEncoding(quality=60)) != base
+        assert cache_key("abc", 3, encoding=ImageEncoding("webp")) != base
@@ -0,0 +1,95 @@
+"""Seri bazlı çalışma birleştirme ve bütçe paylaştırma testleri."""
+import asyncio
+
+from core.agent import dicom_pool
+from core.agent.dicom_pool import assemble_study
+from core.agent.dicom_study import allocate_budget, frames_by_file, plan_study
+from tests.dicom_factory import dicom_bytes
+
+
+def _hdr(uid, instance=None, position=None, frames=1, desc="T1"):
+    return {
+        "series_uid": uid, "series_description": desc, "instance_number": instance,
+        "position": position, "frames": frames, "rows": 256, "columns": 256,
+    }
+
+
+class TestAllocateBudget:
+    def test_equal_split_for_large_series(self):
+        assert allocate_budget([100, 100, 100, 100], 20) == [5, 5, 5, 5]
+
+    def test_small_series_taken_whole_and_rest_redistributed(self):
+        assert allocate_budget([2, 100, 100], 20) == [2, 9, 9]
+
+    def test_remainder_goes_to_earlier_series(self):
+        assert allocate_budget([50, 50, 50], 10) == [4, 3, 3]
+
+    def test_budget_smaller_than_series_count(self):
+        assert allocate_budget([10, 10, 10], 2) == [1, 1, 0]
+
+    def test_never_exceeds_sizes(self):
+        assert allocate_budget([1, 3], 20) == [1, 3]
+
+
+class TestPlanStudy:
+    def test_sorted_by_position_not_upload_order(self):
+        headers = [_hdr("A", instance=i, position=float(-i)) for i in range(5)]
+        plan = plan_study(headers, budget=5)[0]
+        # pozisyon artan: son yüklenen dosya en altta (-4)
+        assert [file_idx for _, file_idx, _ in plan.slices] == [4, 3, 2, 1, 0]
+
+    def test_falls_back_to_instance_number(self):
+        headers = [_hdr("A", instance=3), _hdr("A", instance=1), _hdr("A", instance=2)]
+        plan = plan_study(headers, budget=3)[0]
+        assert [file_idx for _, file_idx, _ in plan.slices] == [1, 2, 0]
+
+    def test_budget_shared_across_series(self):
+        headers = [_hdr("ART", instance=i) for i in range(60)] + [_hdr("PV", instance=i) for i in range(40)]
+        plans = plan_study(headers, budget=10)
+        assert [(p.series_uid, len(p.slices), p.total) for p in plans] == [("ART", 5, 60), ("PV", 5, 40)]
+        # seri boyunca eşit aralıklı: ilk ve son dilim dahil
+        assert plans[0].slices[0][0] == 0 and plans[0].slices[-1][0] == 59
+
+    def test_multiframe_file_counts_each_frame(self):
+        plans = plan_study([_hdr("E", frames=100)], budget=4)
+        assert frames_by_file(plans) == {0: [0, 33, 66, 99]}
+
+    def test_oversample_returns_candidates(self):
+        plans = plan_study([_hdr("A", instance=i) for i in range(30)], budget=4, oversample=3)
+        assert plans[0].quota == 4
+        assert len(plans[0].slices) == 12
+
+    def test_unreadable_files_skipped(self):
+        plans = plan_study([None, _hdr("A", instance=1)], budget=4)
+        assert frames_by_file(plans) == {1: [0]}
+
+
+class TestAssembleStudy:
+    def test_only_selected_files_decoded(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(dicom_pool, "DICOM_WORKERS", 0)
+        decoded = []
+        real = dicom_pool.extract_images_from_dicom
+
+        def spy(path, max_slices, frames=None, encoding=None):
+            decoded.append(path)
+            return real(path, max_slices, frames, encoding)
+
+        monkeypatch.setattr(dicom_pool, "extract_images_from_dicom", spy)
+        paths = []
+        for series, desc in (("1.2.3.1", "arterial"), ("1.2.3.2", "portal")):
+            for i in range(12):
+                p = tmp_path / f"{desc}{i}.dcm"
+                p.write_bytes(dicom_bytes(series_uid=series, instance_number=i + 1,
+                                           position=float(100 - i), description=desc))
+                paths.append(str(p))
+        paths.reverse()  # yükleme sırası anatomik sıradan bağımsız olmalı
+
+        # sentetik dosyaların pikselleri aynı: kopya eleme kapalı
+        images, plan = asyncio.run(assemble_study(paths, max_images=6, selector="uniform", dedup_distance=-1))
+        assert len(images) == 6
+        assert plan["images"] == plan["sent"] == 6
+        assert len(decoded) == 6
+        assert [img["series_uid"] for img in images] == ["1.2.3.2"] * 3 + ["1.2.3.1"] * 3
+        # pozisyon artan = InstanceNumber azalan (12 → 1)
+        assert [img["instance_number"] for img in images[:3]] == [12, 7, 1]
+        assert [img["slice_info"] for img in images[:3]] == ["1/12", "6/12", "12/12"]
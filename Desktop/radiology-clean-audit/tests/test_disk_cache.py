@@ -0,0 +1,74 @@
+"""Disk tabanlı LRU önbellek testleri."""
+import os
+import time
+
+from core.disk_cache import DiskLRUCache
+
+
+def _key(i: int) -> str:
+    return f"{i:064x}"
+
+
+class TestDiskLRUCache:
+    def test_put_and_get(self, tmp_path):
+        cache = DiskLRUCache(str(tmp_path), max_bytes=1024, suffix=".bin")
+        path = cache.put_bytes(_key(1), b"abc")
+        assert cache.get(_key(1)) == path
+        with open(path, "rb") as f:
+            assert f.read() == b"abc"
+        assert cache.get(_key(2)) is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        cache = DiskLRUCache(str(tmp_path), max_bytes=350, suffix=".bin")
+        for i in range(3):
+            cache.put_bytes(_key(i), b"x" * 100)
+            # mtime çözünürlüğüne bağımlı olmamak için açıkça sırala
+            os.utime(cache.path_for(_key(i)), (time.time() - 100 + i, time.time() - 100 + i))
+        # 0 numaralı kayda erişim onu en yeni yapar
+        assert cache.get(_key(0)) is not None
+        cache.put_bytes(_key(3), b"x" * 100)
+        assert cache.get(_key(1)) is None
+        assert cache.get(_key(0)) is not None
+        assert cache.get(_key(2)) is not None
+        assert cache.get(_key(3)) is not None
+
+    def test_unsafe_key_is_hashed(self, tmp_path):
+        cache = DiskLRUCache(str(tmp_path), max_bytes=1024)
+        path = cache.path_for("../../etc/passwd")
+        assert os.path.dirname(path) == str(tmp_path)
+
+    def test_open_survives_eviction(self, tmp_path):
+        cache = DiskLRUCache(str(tmp_path), max_bytes=1024, suffix=".bin")
+        cache.put_bytes(_key(1), b"abc")
+        f = cache.open(_key(1))
+        os.remove(cache.path_for(_key(1)))  # başka istek kaydı sildi
+        with f:
+            assert f.read() == b"abc"
+        assert cache.open(_key(1)) is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_uncounted_lookups(self, tmp_path):
+        cache = DiskLRUCache(str(tmp_path), max_bytes=1024, suffix=".bin")
+        cache.put_bytes(_key(1), b"abc")
+        assert cache.get(_key(1), count=False) is not None
+        assert cache.get(_key(2), count=False) is None
+        cache.open(_key(1), count=False).close()
+        assert cache.stats()["hits"] == cache.stats()["misses"] == 0
+
+    def test_scans_only_when_over_limit(self, tmp_path, monkeypatch):
+        cache = DiskLRUCache(str(tmp_path), max_bytes=1000, suffix=".bin")
+        scans = []
+        real = os.scandir
+        monkeypatch.setattr(os, "scandir", lambda path: scans.append(path) or real(path))
+        for i in range(9):
+            cache.put_bytes(_key(i), b"x" * 100)
+        assert len(scans) == 1  # ilk yazımdaki tarama; sonrası süreç içi toplam
+        cache.put_bytes(_key(1), b"y" * 100)  # üzerine yazma toplamı büyütmez
+        assert len(scans) == 1
+        cache.put_bytes(_key(9), b"x" * 200)  # 1100 > 1000
+        assert len(scans) == 2
+        total = sum(os.path.getsize(p) for p in tmp_path.iterdir())
+        assert total <= 900
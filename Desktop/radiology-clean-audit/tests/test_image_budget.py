@@ -0,0 +1,88 @@
+"""Vision görüntü token/bayt bütçesi planlayıcısı testleri."""
+import asyncio
+import functools
+
+from core.agent import dicom_pool
+from core.agent.image_budget import enforce_byte_budget, image_tokens, plan_images
+from core.agent.radiologist import _build_content
+from tests.dicom_factory import dicom_bytes
+
+
+class TestImageTokens:
+    def test_pixels_over_750(self):
+        assert image_tokens(750, 1) == 1
+        assert image_tokens(512, 512) == 350
+
+    def test_model_downscale_caps_cost(self):
+        assert image_tokens(4000, 4000) == image_tokens(1568, 1568)
+
+
+class TestPlanImages:
+    def test_everything_fits(self):
+        plan = plan_images([(256, 256)] * 30, max_images=20, token_budget=100_000, byte_budget=50 << 20)
+        assert plan.count == 20
+        assert plan.encoding.max_side == 256  # büyütme yok
+        assert plan.encoding.quality == 80
+
+    def test_shrinks_side_before_count(self):
+        plan = plan_images([(1024, 1024)] * 40, max_images=20, token_budget=20 * 600, byte_budget=50 << 20)
+        assert plan.count == 20
+        assert 512 <= plan.encoding.max_side < 1024
+        assert plan.count * plan.tokens_per_image <= 20 * 600
+
+    def test_reduces_count_at_min_side(self):
+        plan = plan_images([(1024, 1024)] * 40, max_images=20, token_budget=3500, byte_budget=50 << 20)
+        assert plan.encoding.max_side == 512
+        assert plan.count == 10  # 350 token/görüntü
+        assert plan.as_dict()["est_tokens"] <= 3500
+
+    def test_lowers_quality_for_byte_budget(self):
+        roomy = plan_images([(512, 512)] * 20, max_images=20, token_budget=100_000, byte_budget=50 << 20)
+        tight = plan_images([(512, 512)] * 20, max_images=20, token_budget=100_000, byte_budget=1 << 20)
+        assert tight.count == roomy.count
+        assert tight.encoding.quality < roomy.encoding.quality
+
+    def test_empty(self):
+        assert plan_images([], max_images=20).count == 0
+
+    def test_unknown_format_falls_back_to_jpeg(self):
+        plan = plan_images([(64, 64)], max_images=1, image_format="gif")
+        assert plan.encoding.media_type == "image/jpeg"
+
+
+class TestEnforceByteBudget:
+    def test_drops_from_largest_series_keeping_order(self):
+        images = [{"series_uid": "A", "base64": "x" * 100, "tag": f"a{i}"} for i in range(4)]
+        images += [{"series_uid": "B", "base64": "x" * 100, "tag": "b0"}]
+        kept = enforce_byte_budget(images, 400)
+        assert [img["tag"] for img in kept] == ["a0", "a1", "a3", "b0"]
+
+    def test_under_budget_untouched(self):
+        images = [{"series_uid": "A", "base64": "xx"}]
+        assert enforce_byte_budget(images, 10) == images
+
+
+class TestPlannedStudy:
+    def test_plan_applied_to_encoding(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(dicom_pool, "DICOM_WORKERS", 0)
+        paths = []
+        for i in range(8):
+            p = tmp_path / f"{i}.dcm"
+            p.write_bytes(dicom_bytes(rows=128, cols=128, series_uid="1.2.3", instance_number=i))
+            paths.append(str(p))
+        # 128x128 = 22 token/görüntü: 3 görüntüye yetecek bütçe
+        # sentetik dosyaların pikselleri aynı: kopya eleme kapalı
+        images, plan = asyncio.run(dicom_pool.assemble_study(paths, max_images=20, token_budget=70, dedup_distance=-1))
+        assert plan["images"] == plan["sent"] == len(images) == 3
+        assert plan["est_tokens"] <= 70
+        assert plan["bytes"] == sum(len(img["base64"]) for img in images)
+
+    def test_webp_media_type_reaches_content(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(dicom_pool, "DICOM_WORKERS", 0)
+        monkeypatch.setattr(dicom_pool, "plan_images", functools.partial(plan_images, image_format="webp"))
+        p = tmp_path / "a.dcm"
+        p.write_bytes(dicom_bytes(rows=64, cols=64))
+        images, plan = asyncio.run(dicom_pool.assemble_study([str(p)]))
+        assert plan["format"] == "webp"
+        content = _build_content({"region": "abdomen"}, images)
+        assert [c["source"]["media_type"] for c in content if c["type"] == "image"] == ["image/webp"]
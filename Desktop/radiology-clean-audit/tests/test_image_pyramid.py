@@ -0,0 +1,98 @@
+"""Çok çözünürlüklü dilim türevleri ve görüntü servis testleri."""
+import asyncio
+import io
+
+import pytest
+from PIL import Image
+
+import main
+from core.agent import dicom_pool, image_pyramid
+from core.agent.image_pyramid import PYRAMID_LEVELS, build_pyramid, pyramid_key
+from core.disk_cache import DiskLRUCache
+from tests.dicom_factory import dicom_bytes, series_bytes
+
+
+@pytest.fixture
+def pyramid_cache(monkeypatch, tmp_path):
+    cache = DiskLRUCache(str(tmp_path / "pyramid"), 1 << 24)
+    monkeypatch.setattr(image_pyramid, "pyramid_cache", cache)
+    monkeypatch.setattr(dicom_pool, "DICOM_WORKERS", 0)
+    return cache
+
+
+class TestBuildPyramid:
+    def test_levels_are_downscaled_not_upscaled(self, tmp_path):
+        path = tmp_path / "big.dcm"
+        path.write_bytes(dicom_bytes(rows=600, cols=300))
+        levels = build_pyramid(str(path), 0)
+        sizes = {level: Image.open(io.BytesIO(data)).size for level, data in levels.items()}
+        assert sizes == {"thumb": (64, 128), "medium": (256, 512), "full": (300, 600)}
+        assert all(Image.open(io.BytesIO(d)).format == image_pyramid.PYRAMID_FORMAT.upper() for d in levels.values())
+
+    def test_key_depends_on_frame_and_level(self):
+        keys = {pyramid_key("abc", f, level) for f in (0, 1) for level in PYRAMID_LEVELS}
+        assert len(keys) == 2 * len(PYRAMID_LEVELS)
+
+    def test_concurrent_requests_build_once(self, tmp_path, pyramid_cache, monkeypatch):
+        path = tmp_path / "a.dcm"
+        path.write_bytes(dicom_bytes(frames=2))
+        calls = []
+
+        def spy(p, frame):
+            calls.append(frame)
+            return build_pyramid(p, frame)
+
+        monkeypatch.setattr(dicom_pool, "build_pyramid", spy)
+
+        async def run():
+            return await asyncio.gather(*(
+                dicom_pool.slice_pyramid(str(path), "abc", 1, level) for level in ("thumb", "medium", "full", "thumb")
+            ))
+
+        paths = asyncio.run(run())
+        assert calls == [1]
+        assert all(p is not None for p in paths)
+        assert asyncio.run(dicom_pool.slice_pyramid(str(path), "abc", 1, "full")) == paths[2]
+        assert calls == [1]
+
+    def test_unreadable_file_returns_none(self, tmp_path, pyramid_cache):
+        path = tmp_path / "bad.dcm"
+        path.write_bytes(b"not a dicom")
+        assert asyncio.run(dicom_pool.slice_pyramid(str(path), "bad", 0, "thumb")) is None
+
+
+class TestStudyImageApi:
+    def _study(self, client, auth_headers, monkeypatch):
+        monkeypatch.setattr(main, "STUDY_PREWARM", False)
+        files = [("dicoms", (f"{i}.dcm", d, "application/dicom")) for i, d in enumerate(series_bytes("1.2.9", 3))]
+        return client.post("/studies", files=files, headers=auth_headers).json()["study_id"]
+
+    def test_slices_and_levels(self, client, auth_headers, store, pyramid_cache, monkeypatch):
+        study_id = self._study(client, auth_headers, monkeypatch)
+        res = client.get(f"/studies/{study_id}/slices", headers=auth_headers)
+        assert res.status_code == 200
+        slices = res.json()["slices"]
+        assert slices and set(slices[0]["levels"]) == set(PYRAMID_LEVELS)
+        assert (slices[0]["rows"], slices[0]["columns"]) == (16, 16)
+
+        thumb = client.get(slices[0]["levels"]["thumb"], headers=auth_headers)
+        assert thumb.status_code == 200
+        assert thumb.headers["content-type"] == image_pyramid.media_type()
+        assert "immutable" in thumb.headers["cache-control"]
+        etag = thumb.headers["etag"]
+
+        again = client.get(slices[0]["levels"]["thumb"], headers={**auth_headers, "If-None-Match": etag})
+        assert again.status_code == 304
+
+        part = client.get(slices[0]["levels"]["full"], headers={**auth_headers, "Range": "bytes=0-9"})
+        assert part.status_code == 206
+        assert len(part.content) == 10
+
+    def test_unknown_image(self, client, auth_headers, store, pyramid_cache, monkeypatch):
+        study_id = self._study(client, auth_headers, monkeypatch)
+        url = client.get(f"/studies/{study_id}/slices", headers=auth_headers).json()["slices"][0]["levels"]["thumb"]
+        base, _, _ = url.rsplit("/", 2)
+        assert client.get(f"{base}/0/huge", headers=auth_headers).status_code == 404
+        assert client.get(f"{base}/5/thumb", headers=auth_headers).status_code == 404
+        assert client.get(f"/studies/{study_id}/images/{'0' * 64}/0/thumb", headers=auth_headers).status_code == 404
+        assert client.get("/studies/ST-missing/slices", headers=auth_headers).status_code == 404
@@ -1,6 +1,16 @@
 """LI-RADS karar motoru testleri."""
+import itertools
+
+import numpy as np
 import pytest
-from core.export.audit_pack import run_lirads_decision
+from core.export.audit_pack import (
+    LIRADS_CATEGORIES,
+    LIRADS_FEATURES,
+    LIRADS_RULES,
+    dsls_to_columns,
+    run_lirads_decision,
+    run_lirads_decision_batch,
+)
 
 
 def _dsl(
@@ -140,3 +150,276 @@ class TestBoundary:
         assert "arterial_hyperenhancement" in result["applied_criteria"]
         assert "washout" in result["applied_criteria"]
         assert "capsule_appearance" in result["applied_criteria"]
+
+
+class TestBatchEquivalence:
+    """run_lirads_decision_batch, skaler motorla tüm özellik ızgarasında aynı sonucu vermeli."""
+
+    FLAGS = (
+        "arterial", "washout", "capsule", "cirrhosis", "tumor_in_vein", "rim_aphe",
+        "peripheral_washout", "delayed_central", "infiltrative", "ancillary_hcc",
+    )
+
+    @staticmethod
+    def _grid_dsl(flags: dict, size: int) -> dict:
+        d = _dsl(
+            arterial=flags["arterial"], washout=flags["washout"], capsule=flags["capsule"],
+            size=size, cirrhosis=flags["cirrhosis"],
+            ancillary={"corona_enhancement": True} if flags["ancillary_hcc"] else None,
+        )
+        d["tumor_in_vein"] = flags["tumor_in_vein"]
+        d["rim_aphe"] = flags["rim_aphe"]
+        d["peripheral_washout"] = flags["peripheral_washout"]
+        d["delayed_central_enhancement"] = flags["delayed_central"]
+        d["infiltrative"] = flags["infiltrative"]
+        return d
+
+    def test_exhaustive_grid_matches_scalar(self):
+        combos = list(itertools.product((False, True), repeat=len(self.FLAGS)))
+        sizes = np.arange(0, 201, dtype=np.int32)
+
+        grid = np.array(combos, dtype=bool)
+        columns = {name: np.repeat(grid[:, i], len(sizes)) for i, name in enumerate(self.FLAGS)}
+        columns["size"] = np.tile(sizes, len(combos))
+        codes = run_lirads_decision_batch(**columns)
+        got = np.asarray(LIRADS_CATEGORIES)[codes]
+
+        k = 0
+        for combo in combos:
+            flags = dict(zip(self.FLAGS, combo))
+            for size in sizes:
+                expected = cat(self._grid_dsl(flags, int(size)))
+                assert got[k] == expected, (flags, int(size))
+                k += 1
+
+    def test_dsls_to_columns_roundtrip(self):
+        dsls = [
+            _dsl(arterial=True, washout=True, capsule=True, size=22, cirrhosis=True),
+            _dsl(arterial=True, size=5),
+            {"tumor_in_vein": True},
+            {"rim_aphe": True, "lesion_size_mm": 30},
+            _dsl(arterial=True, size=12, cirrhosis=True, ancillary={"fat_sparing_in_solid_mass": True}),
+            {},
+        ]
+        codes = run_lirads_decision_batch(**dsls_to_columns(dsls))
+        assert [LIRADS_CATEGORIES[c] for c in codes] == [cat(d) for d in dsls]
+
+    def test_huge_and_negative_sizes(self):
+        dsls = [
+            _dsl(arterial=True, washout=True, size=3_000_000_000, cirrhosis=True),
+            _dsl(arterial=True, size=2**70),
+            _dsl(arterial=True, size=-5),
+        ]
+        codes = run_lirads_decision_batch(**dsls_to_columns(dsls))
+        assert [LIRADS_CATEGORIES[c] for c in codes] == [cat(d) for d in dsls]
+
+    def test_size_column_keeps_real_values(self):
+        columns = dsls_to_columns([_dsl(size=3_000_000_000), _dsl(size=-5), _dsl(size=2**70)])
+        assert columns["size"].dtype == np.int64
+        assert columns["size"].tolist() == [3_000_000_000, -5, np.iinfo(np.int64).max]
+
+    def test_int64_sizes_not_wrapped(self):
+        # 3e9 int32'ye çevrilse negatife sarar ve <10 mm kovasına düşerdi
+        sizes = np.array([3_000_000_000, 2**62, 15], dtype=np.int64)
+        codes = run_lirads_decision_batch(size=sizes, arterial=np.ones(3, dtype=bool))
+        expected = [cat(_dsl(arterial=True, size=int(s))) for s in sizes]
+        assert [LIRADS_CATEGORIES[c] for c in codes] == expected
+
+    def test_out_of_range_size_list_raises(self):
+        with pytest.raises(OverflowError):
+            run_lirads_decision_batch(size=[2**70])
+        with pytest.raises(ValueError):
+            run_lirads_decision_batch(size=[float("nan")])
+
+    def test_output_is_compact(self):
+        codes = run_lirads_decision_batch(**dsls_to_columns([_dsl(size=1)]))
+        assert codes.dtype == np.uint8
+
+
+# ── Derlenmiş karar tablosu ───────────────────────────────────────────────────
+# Karşılaştırma için referans: kural tablosundan önceki el yazımı motor.
+
+def _legacy_result(category, label, applied, ancillary_favor_hcc, ancillary_favor_benign):
+    """Standart LI-RADS sonuç dict'i oluşturur."""
+    return {
+        "category": category,
+        "label": label,
+        "applied_criteria": applied,
+        "ancillary_favor_hcc": ancillary_favor_hcc,
+        "ancillary_favor_benign": ancillary_favor_benign,
+    }
+
+
+def _legacy_run_lirads_decision(dsl: dict) -> dict:
+    """Tablo motorundan önceki if-zinciri (değiştirilmeden korunmuştur)."""
+    arterial   = bool((dsl.get("arterial_phase") or {}).get("hyperenhancement", False))
+    washout    = bool((dsl.get("portal_phase") or {}).get("washout", False))
+    capsule    = bool((dsl.get("delayed_phase") or {}).get("capsule", False))
+    size       = int(dsl.get("lesion_size_mm", 0))
+    cirrhosis  = bool(dsl.get("cirrhosis", False))
+
+    # LR-TIV ve LR-M özellikleri
+    tumor_in_vein          = bool(dsl.get("tumor_in_vein", False))
+    rim_aphe               = bool(dsl.get("rim_aphe", False))
+    peripheral_washout     = bool(dsl.get("peripheral_washout", False))
+    delayed_central        = bool(dsl.get("delayed_central_enhancement", False))
+    infiltrative           = bool(dsl.get("infiltrative", False))
+
+    # Ancillary features (yardımcı bulgular)
+    ancillary  = dsl.get("ancillary_features") or {}
+    fat_sparing       = bool(ancillary.get("fat_sparing_in_solid_mass", False))
+    blood_products    = bool(ancillary.get("blood_products_in_mass", False))
+    corona_enhancement= bool(ancillary.get("corona_enhancement", False))
+    mild_hypointensity= bool(ancillary.get("mild_hbp_hypointensity", False))  # hepatobiliary phase
+
+    applied = []
+    ancillary_favor_hcc = []
+    ancillary_favor_benign = []
+
+    if cirrhosis:
+        applied.append("cirrhosis")
+    if arterial:
+        applied.append("arterial_hyperenhancement")
+    if washout:
+        applied.append("washout")
+    if capsule:
+        applied.append("capsule_appearance")
+
+    # Yardımcı bulgular değerlendirme
+    if fat_sparing:
+        ancillary_favor_hcc.append("fat_sparing_in_solid_mass")
+    if blood_products:
+        ancillary_favor_hcc.append("blood_products_in_mass")
+    if corona_enhancement:
+        ancillary_favor_hcc.append("corona_enhancement")
+    if mild_hypointensity:
+        ancillary_favor_hcc.append("mild_hbp_hypointensity")
+
+    ancillary_positive = len(ancillary_favor_hcc) > 0
+
+    # --- LR-TIV: Tümör İçinde Ven (tüm kategorileri geçersiz kılar) ---
+    if tumor_in_vein:
+        applied.append("tumor_in_vein")
+        return _legacy_result(
+            "LR-TIV", "LR-TIV (Tumor in Vein)",
+            applied, ancillary_favor_hcc, ancillary_favor_benign,
+        )
+
+    # --- LR-M: Malign, muhtemelen HCC değil ---
+    # Targetoid kitle: rim APHE, periferal washout veya gecikmiş santral tutulum
+    # Veya infiltratif görünüm
+    targetoid = rim_aphe or peripheral_washout or delayed_central
+    if targetoid or infiltrative:
+        if rim_aphe:
+            applied.append("rim_aphe")
+        if peripheral_washout:
+            applied.append("peripheral_washout")
+        if delayed_central:
+            applied.append("delayed_central_enhancement")
+        if infiltrative:
+            applied.append("infiltrative_appearance")
+        return _legacy_result(
+            "LR-M", "LR-M (Malignant, not HCC specific)",
+            applied, ancillary_favor_hcc, ancillary_favor_benign,
+        )
+
+    # --- LR-5: Kesin HCC ---
+    # Majör kriter: siroz + arteriyel + (washout VEYA kapsül) + ≥10 mm
+    if cirrhosis and arterial and size >= 10:
+        major_features = sum([washout, capsule])
+        if major_features >= 2:
+            return _legacy_result(
+                "LR-5", "LR-5 (Definite HCC)",
+                applied, ancillary_favor_hcc, ancillary_favor_benign,
+            )
+        if major_features == 1 and size >= 20:
+            # ≥20 mm + 1 majör kriter → LR-5
+            return _legacy_result(
+                "LR-5", "LR-5 (Definite HCC)",
+                applied, ancillary_favor_hcc, ancillary_favor_benign,
+            )
+
+    # --- LR-4: Muhtemel HCC ---
+    # Siroz + arteriyel + ≥10 mm + 1 majör kriter veya ancillary
+    if cirrhosis and arterial and size >= 10:
+        if washout or capsule or ancillary_positive:
+            return _legacy_result(
+                "LR-4", "LR-4 (Probable HCC)",
+                applied, ancillary_favor_hcc, ancillary_favor_benign,
+            )
+
+    # --- LR-3: Orta olasılık ---
+    if cirrhosis and arterial and size >= 10:
+        return _legacy_result(
+            "LR-3", "LR-3 (Intermediate probability)",
+            applied, ancillary_favor_hcc, ancillary_favor_benign,
+        )
+    if arterial and size < 10:
+        return _legacy_result(
+            "LR-3", "LR-3 (Intermediate probability)",
+            applied, ancillary_favor_hcc, ancillary_favor_benign,
+        )
+    if cirrhosis and arterial and ancillary_positive:
+        return _legacy_result(
+            "LR-3", "LR-3 (Intermediate probability)",
+            applied, ancillary_favor_hcc, ancillary_favor_benign,
+        )
+
+    # --- LR-2: Muhtemelen benign ---
+    return _legacy_result(
+        "LR-2", "LR-2 (Probably benign)",
+        applied, ancillary_favor_hcc, ancillary_favor_benign,
+    )
+
+
+class TestCompiledTableEquivalence:
+    """Derlenmiş tablo, eski if-zinciriyle tüm girdi uzayında birebir aynı sonucu vermeli."""
+
+    BOOL_KEYS = (
+        "cirrhosis", "tumor_in_vein", "rim_aphe", "peripheral_washout",
+        "delayed_central_enhancement", "infiltrative",
+    )
+    PHASE_KEYS = (
+        ("arterial_phase", "hyperenhancement"),
+        ("portal_phase", "washout"),
+        ("delayed_phase", "capsule"),
+    )
+    ANCILLARY_KEYS = (
+        "fat_sparing_in_solid_mass", "blood_products_in_mass",
+        "corona_enhancement", "mild_hbp_hypointensity",
+    )
+    # Her boyut kovasının sınırları ve içi
+    SIZES = (0, 1, 5, 9, 10, 11, 15, 19, 20, 21, 50, 200)
+
+    def _all_dsls(self):
+        n_bits = len(self.BOOL_KEYS) + len(self.PHASE_KEYS) + len(self.ANCILLARY_KEYS)
+        for bits in itertools.product((False, True), repeat=n_bits):
+            it = iter(bits)
+            base = {k: next(it) for k in self.BOOL_KEYS}
+            for phase, key in self.PHASE_KEYS:
+                base[phase] = {key: next(it)}
+            ancillary = {k: True for k in self.ANCILLARY_KEYS if next(it)}
+            if ancillary:
+                base["ancillary_features"] = ancillary
+            for size in self.SIZES:
+                yield {**base, "lesion_size_mm": size}
+
+    def test_exhaustive_match_with_legacy_engine(self):
+        for dsl in self._all_dsls():
+            assert run_lirads_decision(dsl) == _legacy_run_lirads_decision(dsl), dsl
+
+    def test_table_covers_every_index(self):
+        from core.export.audit_pack import _CRITERIA_TABLE, _DECISION_TABLE, SIZE_BUCKETS
+        assert len(_DECISION_TABLE) == len(SIZE_BUCKETS) << len(LIRADS_FEATURES)
+        assert len(_CRITERIA_TABLE) == len(_DECISION_TABLE)
+
+    def test_rules_reference_known_features(self):
+        for rule in LIRADS_RULES:
+            assert rule.requires <= set(LIRADS_FEATURES)
+            assert rule.category in LIRADS_CATEGORIES
+
+    def test_result_lists_are_independent(self):
+        """Tablodan dönen listeler paylaşılmamalı (çağıran değiştirebilir)."""
+        d = _dsl(arterial=True, washout=True, capsule=True, size=22, cirrhosis=True)
+        run_lirads_decision(d)["applied_criteria"].append("x")
+        assert "x" not in run_lirads_decision(d)["applied_criteria"]
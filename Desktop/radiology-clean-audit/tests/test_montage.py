@@ -0,0 +1,108 @@
+"""Çok dilimli montaj modu testleri."""
+import asyncio
+import io
+
+import numpy as np
+import pytest
+
+from core.agent import dicom_pool
+from core.agent.dicom_study import plan_study
+from core.agent.montage import build_montage, burn_labels, tile_frames
+from core.agent.radiologist import _build_content
+from tests.dicom_factory import dicom_bytes
+
+
+def _series(tmp_path, n, side=48, series="1.2.3"):
+    from pydicom import dcmread
+
+    paths = []
+    rng = np.random.default_rng(0)
+    for i in range(n):
+        ds = dcmread(io.BytesIO(dicom_bytes(rows=side, cols=side, series_uid=series, instance_number=i + 1)))
+        ds.PixelData = rng.integers(0, 4096, (side, side), dtype=np.uint16).tobytes()
+        p = tmp_path / f"{series}_{i}.dcm"
+        ds.save_as(p)
+        paths.append(str(p))
+    return paths
+
+
+class TestTileFrames:
+    def test_block_layout_with_gap(self):
+        frames = np.stack([np.full((3, 4), v, np.uint8) for v in (10, 20, 30, 40)])
+        grid = tile_frames(frames, columns=2, gap=1)
+        assert grid.shape == (7, 9)
+        assert grid[0, 0] == 10 and grid[0, 5] == 20 and grid[4, 0] == 30 and grid[4, 5] == 40
+        assert grid[3, :].max() == 0 and grid[:, 4].max() == 0  # ayırıcı çizgiler
+
+    def test_partial_grid_is_black(self):
+        frames = np.full((3, 2, 2), 255, np.uint8)
+        grid = tile_frames(frames, columns=2, gap=0)
+        assert grid.shape == (4, 4)
+        assert grid[2:, 2:].max() == 0
+
+    def test_labels_burned_into_each_tile(self):
+        canvas = np.full((101, 101), 128, np.uint8)
+        out = burn_labels(canvas, ["1/9", "5/9"], (50, 50), columns=2)
+        assert (out[:15, :30] != 128).any() and (out[:15, 52:80] != 128).any()
+        assert (out[60:, :] == 128).all()
+
+
+class TestPlanGroups:
+    def test_budget_counts_tiles(self):
+        headers = [{"series_uid": "A", "series_description": "A", "instance_number": i, "position": None,
+                    "frames": 1, "rows": 8, "columns": 8} for i in range(40)]
+        plans = plan_study(headers, budget=3, group=4)
+        assert plans[0].quota == 12 and len(plans[0].slices) == 12
+
+
+class TestBuildMontage:
+    def test_builds_single_image_from_many_files(self, tmp_path):
+        paths = _series(tmp_path, 4)
+        img = build_montage([(p, 0) for p in paths], ["1/4", "2/4", "3/4", "4/4"], columns=2)
+        assert img["montage"] == 4
+        assert img["slice_info"] == "1/4, 2/4, 3/4, 4/4"
+        assert img["media_type"] == "image/jpeg"
+
+    def test_unreadable_slices_skipped(self, tmp_path):
+        paths = _series(tmp_path, 1)
+        bad = tmp_path / "bad.dcm"
+        bad.write_bytes(b"x")
+        img = build_montage([(paths[0], 0), (str(bad), 0)], ["1/2", "2/2"])
+        assert img["montage"] == 1
+        assert build_montage([(str(bad), 0)], ["1/1"]) is None
+
+
+class TestAssembleMontage:
+    def test_montage_layout(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(dicom_pool, "DICOM_WORKERS", 0)
+        paths = _series(tmp_path, 30)
+        images, plan = asyncio.run(dicom_pool.assemble_study(
+            paths, max_images=3, selector="uniform", layout="montage",
+        ))
+        assert plan["layout"] == "montage"
+        assert len(images) == 3
+        assert plan["slices"] == 12
+        assert all(img["montage"] == 4 for img in images)
+        content = _build_content({"region": "abdomen"}, images)
+        assert "4 dilimlik montaj" in content[1]["text"]
+
+    def test_montage_cached_by_content(self, monkeypatch, tmp_path):
+        from core.agent import dicom_cache
+        from core.disk_cache import DiskLRUCache
+
+        monkeypatch.setattr(dicom_pool, "DICOM_WORKERS", 0)
+        cache = DiskLRUCache(str(tmp_path / "cache"), max_bytes=1 << 24, suffix=".json")
+        monkeypatch.setattr(dicom_cache, "dicom_cache", cache)
+        paths = _series(tmp_path, 8)
+        digests = [f"d{i}" for i in range(8)]
+        run = lambda: asyncio.run(dicom_pool.assemble_study(
+            paths, max_images=2, selector="uniform", layout="montage", digests=digests,
+        ))
+        first, _ = run()
+        second, _ = run()
+        assert second == first
+        assert cache.stats()["hits"] == 2
+
+    def test_unknown_layout(self, tmp_path):
+        with pytest.raises(ValueError):
+            asyncio.run(dicom_pool.assemble_study([], layout="mosaic"))
@@ -0,0 +1,53 @@
+"""PDF şablonu ve Markdown → flowable dönüştürücü testleri."""
+import os
+
+os.environ.setdefault("AUDIT_SECRET", "test-secret-key")
+
+from reportlab.platypus import Paragraph, Table
+
+from core.export.audit_pack import build_pack
+from core.export.pdf_export import generate_pdf, markdown_to_flowables, pdf_template
+
+
+def _paragraphs(flowables):
+    return [f for f in flowables if isinstance(f, Paragraph)]
+
+
+class TestMarkdownToFlowables:
+    def test_headings_bullets_and_bold(self):
+        out = _paragraphs(markdown_to_flowables(
+            "## Bulgular\n### Alt\n- **Yıkanma** var\n1. Birinci\nDüz **kalın** metin"
+        ))
+        styles = [p.style.name for p in out]
+        assert styles == ["SectionHead", "SubHead", "ReportBullet", "ReportBullet", "ReportBody"]
+        assert out[2].bulletText == "•"
+        assert out[3].bulletText == "1."
+        assert "<b>kalın</b>" in out[4].text
+
+    def test_escapes_markup(self):
+        (para,) = _paragraphs(markdown_to_flowables("boyut < 10 mm & **AFP > 200**"))
+        assert para.text == "boyut &lt; 10 mm &amp; <b>AFP &gt; 200</b>"
+
+    def test_table(self):
+        out = markdown_to_flowables("| Faz | Bulgu |\n|---|:---:|\n| Arteryel | APHE |\n| Portal |")
+        (table,) = [f for f in out if isinstance(f, Table)]
+        assert len(table._cellvalues) == 3
+        assert len(table._cellvalues[2]) == 2  # eksik hücre doldurulur
+
+
+class TestTemplate:
+    def test_template_built_once(self):
+        assert pdf_template() is pdf_template()
+
+    def test_body_font_has_turkish_glyphs_when_available(self):
+        tpl = pdf_template()
+        if tpl.font == "Helvetica":
+            return  # DejaVu yok: fallback
+        from reportlab.pdfbase import pdfmetrics
+        face = pdfmetrics.getFont(tpl.font).face
+        assert all(ord(ch) in face.charWidths for ch in "ğüşıöçĞÜŞİÖÇ")
+
+    def test_generate_pdf_with_report(self):
+        pack = build_pack("PDF-MD-001", {"lesion_size_mm": 22, "cirrhosis": True}, "http://localhost:8000")
+        pack["content"]["agent_report"] = "## Sonuç\nLezyon < 2 cm, **LR-4**\n| A | B |\n|---|---|\n| 1 | 2 |"
+        assert generate_pdf(pack).startswith(b"%PDF")
@@ -0,0 +1,86 @@
+"""Kayıt sonrası PDF ön-render testleri."""
+import os
+
+os.environ.setdefault("AUDIT_SECRET", "test-secret-key")
+
+from core.export import pdf_prerender
+from core.export.audit_pack import build_pack
+from core.export.pdf_cache import pdf_cache, pdf_key
+from db import init_db
+from store.store import _save_hooks, save_case
+
+init_db()
+
+BODY = {
+    "arterial_phase": {"hyperenhancement": True},
+    "portal_phase": {"washout": True},
+    "lesion_size_mm": 22,
+    "cirrhosis": True,
+}
+
+
+def _pack(case_id: str) -> dict:
+    return build_pack(case_id, BODY, "http://localhost:8000")
+
+
+class TestQueue:
+    def teardown_method(self):
+        pdf_prerender._pending.clear()
+
+    def test_deduplicates_by_case_keeping_latest(self):
+        first, latest = _pack("PRE-DEDUP"), _pack("PRE-DEDUP")
+        latest["version"] = 2
+        pdf_prerender.enqueue("PRE-DEDUP", first)
+        pdf_prerender.enqueue("PRE-DEDUP", latest)
+        assert list(pdf_prerender._pending) == ["PRE-DEDUP"]
+        assert pdf_prerender._pending["PRE-DEDUP"]["version"] == 2
+
+    def test_drops_when_full(self):
+        dropped = pdf_prerender.prerender_stats()["dropped"]
+        for i in range(pdf_prerender.PDF_PRERENDER_QUEUE):
+            assert pdf_prerender.enqueue(f"PRE-FULL-{i}", {})
+        assert pdf_prerender.enqueue("PRE-FULL-EXTRA", {}) is False
+        assert pdf_prerender.prerender_stats()["dropped"] == dropped + 1
+
+
+class TestSaveHook:
+    def test_save_case_fills_pdf_cache(self):
+        pdf_prerender.start()
+        try:
+            assert pdf_prerender.enqueue in _save_hooks
+            pack = _pack("PRE-HOOK-001")
+            save_case("PRE-HOOK-001", pack, created_by="test")
+            assert pdf_prerender.wait_idle(timeout=60)
+            assert pdf_cache.get(pdf_key(pack["signature"])) is not None
+        finally:
+            pdf_prerender.stop()
+        assert pdf_prerender.enqueue not in _save_hooks
+
+    def test_failing_hook_does_not_break_save(self):
+        from store.store import get_case, register_save_hook, unregister_save_hook
+
+        def _boom(case_id, pack):
+            raise RuntimeError("kanca hatasi")
+
+        register_save_hook(_boom)
+        try:
+            save_case("PRE-HOOK-002", _pack("PRE-HOOK-002"))
+        finally:
+            unregister_save_hook(_boom)
+        assert get_case("PRE-HOOK-002") is not None
+
+    def test_batch_save_runs_hooks_for_saved_cases(self):
+        from store.store import register_save_hook, save_cases_batch, unregister_save_hook
+
+        save_case("PRE-HOOK-BATCH", _pack("PRE-HOOK-BATCH"))
+        calls = []
+        hook = lambda case_id, pack: calls.append((case_id, pack["version"]))  # noqa: E731
+        register_save_hook(hook)
+        try:
+            updated = _pack("PRE-HOOK-BATCH")
+            updated["version"] = 2
+            saved = save_cases_batch([("PRE-HOOK-BATCH", updated), ("PRE-HOOK-MISSING", _pack("PRE-HOOK-MISSING"))])
+        finally:
+            unregister_save_hook(hook)
+        assert saved == ["PRE-HOOK-BATCH"]
+        assert calls == [("PRE-HOOK-BATCH", 2)]  # kaydedilmeyen vaka için kanca yok
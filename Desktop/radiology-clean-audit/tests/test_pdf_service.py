@@ -0,0 +1,118 @@
+"""PDF render servisi testleri (süreç havuzu, zaman aşımı, kuyruk sınırı)."""
+import os
+import threading
+import time
+
+os.environ.setdefault("AUDIT_SECRET", "test-secret-key")
+
+import pytest
+
+from core.export import pdf_service
+from core.export.audit_pack import build_pack
+from core.export.pdf_export import generate_pdf
+
+BODY = {
+    "arterial_phase": {"hyperenhancement": True},
+    "portal_phase": {"washout": True},
+    "lesion_size_mm": 22,
+    "cirrhosis": True,
+}
+
+
+def _pack(case_id: str = "PDF-SVC-001") -> dict:
+    return build_pack(case_id, BODY, "http://localhost:8000")
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"  # zombi: sonlanmış
+    except OSError:
+        return True
+
+
+def _hang(pack: dict) -> bytes:
+    """Hiç dönmeyen render (işçi süreçte çalışır)."""
+    while True:
+        time.sleep(1)
+
+
+class TestRenderPdf:
+    def test_renders_in_worker_process(self):
+        data = pdf_service.render_pdf(_pack())
+        assert data.startswith(b"%PDF")
+        assert pdf_service.render_stats()["renders"] >= 1
+
+    def test_timeout_raises_and_frees_slot(self):
+        pdf_service.render_pdf(_pack())  # havuz ısınsın
+        timeouts = pdf_service.render_stats()["timeouts"]
+        with pytest.raises(pdf_service.PdfRenderTimeout):
+            pdf_service.render_pdf(_pack("PDF-SVC-002"), timeout=0.001)
+        assert pdf_service.render_stats()["timeouts"] == timeouts + 1
+        # Slot zaman aşımında geri verilir, yeni render kabul edilir
+        assert pdf_service.render_pdf(_pack("PDF-SVC-003")).startswith(b"%PDF")
+
+    def test_hung_renders_do_not_exhaust_capacity(self, monkeypatch):
+        killed = []
+        real_kill = pdf_service._kill_workers
+
+        def kill_spy(pool):
+            killed.extend(pool.worker_pids())
+            real_kill(pool)
+
+        monkeypatch.setattr(pdf_service, "_kill_workers", kill_spy)
+        monkeypatch.setattr(pdf_service, "generate_pdf", _hang)
+        for i in range(pdf_service.PDF_MAX_QUEUE + 1):
+            pool = pdf_service._get_pool()  # render_pdf'in kullanacağı havuz
+            with pytest.raises(pdf_service.PdfRenderTimeout):
+                pdf_service.render_pdf(_pack(f"PDF-SVC-HANG-{i}"), timeout=0.3)
+            assert pdf_service._pool is not pool  # asılı havuz devreden çıktı
+        assert pdf_service.render_stats()["inflight"] == 0
+        monkeypatch.setattr(pdf_service, "generate_pdf", generate_pdf)
+
+        # Kuyruk dolu sayılmaz; yeni havuzda render çalışır
+        assert pdf_service.render_pdf(_pack("PDF-SVC-AFTER-HANG")).startswith(b"%PDF")
+
+        # Asılı işçiler sonlandırıldı
+        deadline = time.monotonic() + 10
+        while (not killed or any(_alive(pid) for pid in killed)) and time.monotonic() < deadline:
+            time.sleep(0.1)
+        assert killed
+        assert not any(_alive(pid) for pid in killed)
+
+    def test_iter_render_yields_every_pack(self):
+        packs = [_pack(f"PDF-SVC-ITER-{i}") for i in range(5)]
+        results = list(pdf_service.iter_render(packs, max_inflight=2))
+        assert sorted(p["case_id"] for p, _ in results) == sorted(p["case_id"] for p in packs)
+        assert all(data.startswith(b"%PDF") for _, data in results)
+
+    def test_inline_bulk_waits_for_slot(self, monkeypatch):
+        monkeypatch.setattr(pdf_service, "PDF_WORKERS", 0)
+        taken = 0
+        while pdf_service._slots.acquire(blocking=False):
+            taken += 1
+        # Slot kısa süre sonra boşalır; toplu iş reddedilmek yerine bekler
+        timer = threading.Timer(0.3, pdf_service._slots.release)
+        timer.start()
+        try:
+            results = list(pdf_service.iter_render([_pack("PDF-SVC-INLINE")]))
+        finally:
+            timer.join()
+            for _ in range(taken - 1):
+                pdf_service._slots.release()
+        assert results[0][1].startswith(b"%PDF")
+
+    def test_overload_rejects_immediately(self):
+        taken = 0
+        while pdf_service._slots.acquire(blocking=False):
+            taken += 1
+        try:
+            with pytest.raises(pdf_service.PdfServiceOverloaded):
+                pdf_service.render_pdf(_pack())
+        finally:
+            for _ in range(taken):
+                pdf_service._slots.release()
@@ -0,0 +1,80 @@
+"""İçerik duyarlı dilim seçici testleri."""
+import asyncio
+
+import numpy as np
+import pytest
+
+from core.agent import dicom_pool
+from core.agent.slice_selection import content_selector, get_selector, slice_scores, top_k_spaced
+from tests.dicom_factory import dicom_bytes
+
+
+def _volume(n=30, organ=range(10, 20), side=64, seed=0):
+    """Ortadaki dilimlerde dokulu bir 'organ', diğerleri hava + düşük gürültü."""
+    rng = np.random.default_rng(seed)
+    vol = rng.normal(0, 5, (n, side, side)).astype(np.float32)
+    yy, xx = np.mgrid[0:side, 0:side]
+    mask = (yy - side / 2) ** 2 + (xx - side / 2) ** 2 < (side / 3) ** 2
+    for i in organ:
+        vol[i][mask] = 800 + rng.normal(0, 120, mask.sum())
+    return vol
+
+
+class TestSliceScores:
+    def test_organ_slices_score_higher(self):
+        scores, foreground = slice_scores(_volume())
+        assert scores[10:20].min() > scores[:10].max()
+        assert foreground[:10].max() < 0.05 < foreground[10:20].min()
+
+    def test_flat_volume(self):
+        scores, foreground = slice_scores(np.zeros((4, 8, 8), np.float32))
+        assert not scores.any() and not foreground.any()
+
+
+class TestTopKSpaced:
+    def test_spacing_enforced(self):
+        scores = np.array([0, 9, 8, 7, 0, 0, 6, 0], dtype=float)
+        assert top_k_spaced(scores, 3, min_gap=2) == [1, 3, 6]
+
+    def test_ineligible_skipped(self):
+        scores = np.array([5, 4, 3], dtype=float)
+        assert top_k_spaced(scores, 2, 1, eligible=np.array([False, True, True])) == [1, 2]
+
+
+class TestContentSelector:
+    def test_picks_organ_slices_and_skips_empty(self):
+        vol = _volume()
+        chosen = content_selector(list(vol), k=4)
+        assert len(chosen) == 4
+        assert all(10 <= i < 20 for i in chosen)
+
+    def test_sends_fewer_when_only_few_informative(self):
+        vol = _volume(organ=range(14, 16))
+        assert content_selector(list(vol), k=6) == [14, 15]
+
+    def test_unknown_selector(self):
+        with pytest.raises(ValueError):
+            get_selector("random")
+
+
+class TestAssembleWithContentSelector:
+    def test_only_informative_slices_sent(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(dicom_pool, "DICOM_WORKERS", 0)
+        from pydicom import dcmread
+        from io import BytesIO
+
+        vol = _volume(n=24, organ=range(8, 16), side=32)
+        paths = []
+        for i, frame in enumerate(vol):
+            ds = dcmread(BytesIO(dicom_bytes(rows=32, cols=32, series_uid="1.2.3", instance_number=i + 1)))
+            ds.PixelData = np.clip(frame + 100, 0, 4095).astype(np.uint16).tobytes()
+            p = tmp_path / f"{i}.dcm"
+            ds.save_as(p)
+            paths.append(str(p))
+
+        images, plan = asyncio.run(dicom_pool.assemble_study(paths, max_images=4, selector="content"))
+        assert plan["selector"] == "content"
+        assert len(images) == 4
+        assert all(9 <= img["instance_number"] <= 16 for img in images)
+        uniform, _ = asyncio.run(dicom_pool.assemble_study(paths, max_images=4, selector="uniform"))
+        assert any(not 9 <= img["instance_number"] <= 16 for img in uniform)
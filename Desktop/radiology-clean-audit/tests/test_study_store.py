@@ -0,0 +1,124 @@
+"""Kalıcı çalışma deposu ve study_id ile yeniden analiz testleri."""
+import hashlib
+import json
+import os
+
+import main
+from core.agent import dicom_pool
+from core.agent.dicom_utils import read_header
+from store import study_store
+from tests.dicom_factory import series_bytes
+
+
+def _spooled(tmp_path, blobs):
+    files = []
+    for i, data in enumerate(blobs):
+        path = tmp_path / f"up{i}.dcm"
+        path.write_bytes(data)
+        files.append((str(path), hashlib.sha256(data).hexdigest(), read_header(str(path))))
+    return files
+
+
+class TestStudyStore:
+    def test_create_groups_series_and_moves_files(self, store):
+        blobs = series_bytes("1.2.3", 3) + series_bytes("1.2.4", 2, "T2 HASTE")
+        files = _spooled(store, blobs + [blobs[0]])  # tekrar eden dosya bir kez saklanır
+        study = study_store.create_study(files, created_by="testadmin")
+
+        assert study["study_id"].startswith("ST-")
+        assert study["instance_count"] == 5
+        assert [(s["series_uid"], s["instance_count"]) for s in study["series"]] == [("1.2.3", 3), ("1.2.4", 2)]
+        assert not os.path.exists(files[0][0])
+
+        instances = study_store.get_study_instances(study["study_id"])
+        assert [inst["sha256"] for inst in instances] == [f[1] for f in files[:5]]
+        for inst, (_, _, header) in zip(instances, files):
+            assert os.path.exists(inst["path"])
+            assert inst["header"] == header
+
+    def test_delete_removes_files(self, store):
+        study = study_store.create_study(_spooled(store, series_bytes("1.2.3", 2)))
+        directory = store / "studies" / study["study_id"]
+        assert directory.exists()
+        assert study_store.delete_study(study["study_id"])
+        assert not directory.exists()
+        assert study_store.get_study(study["study_id"]) is None
+        assert study_store.get_study_instances(study["study_id"]) is None
+        assert not study_store.delete_study(study["study_id"])
+
+
+class TestStudyApi:
+    def _upload(self, client, auth_headers, blobs):
+        files = [("dicoms", (f"{i}.dcm", data, "application/dicom")) for i, data in enumerate(blobs)]
+        return client.post("/studies", files=files, headers=auth_headers)
+
+    def _analyze(self, client, auth_headers, study_id):
+        return client.post(
+            "/agent/analyze",
+            data={"clinical_json": json.dumps({"region": "abdomen"}), "study_id": study_id},
+            headers=auth_headers,
+        )
+
+    def _spy(self, monkeypatch):
+        calls = {"headers": 0, "extract": 0, "images": []}
+        real_headers, real_extract = dicom_pool.read_headers, dicom_pool.extract_images_from_dicom
+
+        def headers(paths):
+            calls["headers"] += 1
+            return real_headers(paths)
+
+        def extract(path, max_slices, frames=None, encoding=None):
+            calls["extract"] += 1
+            return real_extract(path, max_slices, frames, encoding)
+
+        async def fake_stream(clinical_data, images, education_mode=False):
+            calls["images"].append(len(images))
+            yield "rapor"
+
+        monkeypatch.setattr(dicom_pool, "read_headers", headers)
+        monkeypatch.setattr(dicom_pool, "extract_images_from_dicom", extract)
+        monkeypatch.setattr(main, "stream_radiologist_analysis", fake_stream)
+        return calls
+
+    def test_upload_then_reanalyze_without_decoding(self, client, auth_headers, store, monkeypatch):
+        monkeypatch.setattr(main, "STUDY_PREWARM", False)
+        calls = self._spy(monkeypatch)
+        res = self._upload(client, auth_headers, series_bytes("1.2.3", 4) + [b"not a dicom"])
+        assert res.status_code == 200
+        study = res.json()
+        assert study["instance_count"] == 4
+        assert study["skipped"] == 1
+        assert client.get(f"/studies/{study['study_id']}", headers=auth_headers).json()["instance_count"] == 4
+
+        first = self._analyze(client, auth_headers, study["study_id"])
+        assert first.status_code == 200
+        assert "rapor" in first.text
+        decoded = calls["extract"]
+        assert decoded > 0
+
+        headers_before = calls["headers"]
+        second = self._analyze(client, auth_headers, study["study_id"])
+        assert second.status_code == 200
+        assert calls["headers"] == headers_before  # başlıklar veritabanından
+        assert calls["extract"] == decoded  # decode yok
+        assert calls["images"][0] == calls["images"][1]
+        plans = [json.loads(r.text.split("\n")[0][len("data: "):])["image_plan"] for r in (first, second)]
+        assert plans[0] == plans[1]
+
+    def test_prewarm_makes_first_analysis_cached(self, client, auth_headers, store, monkeypatch):
+        monkeypatch.setattr(main, "STUDY_PREWARM", True)
+        calls = self._spy(monkeypatch)
+        study = self._upload(client, auth_headers, series_bytes("1.2.5", 3)).json()
+        decoded = calls["extract"]
+        assert decoded > 0  # arka plan görevi yanıt sonrası çalıştı
+        assert self._analyze(client, auth_headers, study["study_id"]).status_code == 200
+        assert calls["extract"] == decoded
+
+    def test_unknown_study(self, client, auth_headers, store):
+        assert self._analyze(client, auth_headers, "ST-missing").status_code == 404
+        assert client.get("/studies/ST-missing", headers=auth_headers).status_code == 404
+
+    def test_upload_without_images_rejected(self, client, auth_headers, store):
+        res = self._upload(client, auth_headers, [b"not a dicom"])
+        assert res.status_code == 422
+        assert not (store / "studies").exists() or not any((store / "studies").iterdir())
@@ -0,0 +1,175 @@
+"""DICOM yükleme sınırları ve diske akıtma testleri."""
+import asyncio
+import hashlib
+import io
+import os
+
+import pytest
+from fastapi import FastAPI, HTTPException, Request, UploadFile
+from fastapi.testclient import TestClient
+
+from core.agent.dicom_utils import extract_images_from_dicom
+from core.uploads import UploadSizeLimitMiddleware, spool_upload, spooled_uploads
+from tests.dicom_factory import dicom_bytes
+
+
+def _limited_app(max_bytes: int) -> TestClient:
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        return {"size": len(await request.body())}
+
+    @app.post("/other")
+    async def other(request: Request):
+        return {"size": len(await request.body())}
+
+    app.add_middleware(UploadSizeLimitMiddleware, max_bytes=max_bytes, paths=("/upload",))
+    return TestClient(app)
+
+
+class TestUploadSizeLimit:
+    def test_under_limit_passes(self):
+        res = _limited_app(100).post("/upload", content=b"x" * 100)
+        assert res.status_code == 200
+        assert res.json() == {"size": 100}
+
+    def test_content_length_rejected_early(self):
+        res = _limited_app(100).post("/upload", content=b"x" * 101)
+        assert res.status_code == 413
+
+    def test_running_total_without_content_length(self):
+        def chunks():
+            for _ in range(5):
+                yield b"x" * 40
+
+        res = _limited_app(100).post("/upload", content=chunks())
+        assert res.status_code == 413
+
+    def test_app_swallowing_error_still_gets_413(self):
+        """Uygulama okuma hatasını yakalasa da yanıt 413 olmalı (middleware gönderir)."""
+        app = FastAPI()
+
+        @app.post("/upload")
+        async def upload(request: Request):
+            try:
+                await request.body()
+            except Exception:
+                return {"swallowed": True}
+            return {"swallowed": False}
+
+        app.add_middleware(UploadSizeLimitMiddleware, max_bytes=100, paths=("/upload",))
+
+        def chunks():
+            for _ in range(5):
+                yield b"x" * 40
+
+        res = TestClient(app).post("/upload", content=chunks())
+        assert res.status_code == 413
+        assert res.json() == {"detail": "Yukleme boyutu siniri asildi"}
+
+    def test_other_paths_not_limited(self):
+        res = _limited_app(100).post("/other", content=b"x" * 500)
+        assert res.status_code == 200
+
+
+class TestSpoolUpload:
+    def test_copies_to_named_file(self):
+        data = b"DICM" * 1000
+        spooled = asyncio.run(spool_upload(UploadFile(io.BytesIO(data), filename="a.dcm"), max_bytes=1 << 20))
+        try:
+            with open(spooled.path, "rb") as f:
+                assert f.read() == data
+            assert spooled.filename == "a.dcm"
+            assert spooled.sha256 == hashlib.sha256(data).hexdigest()
+        finally:
+            os.unlink(spooled.path)
+
+    def test_batches_written_off_event_loop(self, monkeypatch):
+        import threading
+        import core.uploads as uploads
+
+        monkeypatch.setattr(uploads, "SPOOL_BATCH_BYTES", 3000)
+        calls = []
+        real_write_batch = uploads._write_batch
+
+        def spy(out, digest, batch):
+            calls.append((threading.current_thread() is threading.main_thread(), len(batch)))
+            real_write_batch(out, digest, batch)
+
+        monkeypatch.setattr(uploads, "_write_batch", spy)
+
+        async def chunks():
+            for i in range(7):
+                yield bytes([i]) * 1000
+
+        data = b"".join(bytes([i]) * 1000 for i in range(7))
+        spooled = asyncio.run(uploads.spool_chunks("b.dcm", chunks(), max_bytes=1 << 20))
+        try:
+            with open(spooled.path, "rb") as f:
+                assert f.read() == data
+            assert spooled.sha256 == hashlib.sha256(data).hexdigest()
+        finally:
+            os.unlink(spooled.path)
+        assert calls == [(False, 3), (False, 3), (False, 1)]
+
+    def test_per_file_limit(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("core.uploads.DICOM_UPLOAD_DIR", str(tmp_path))
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(spool_upload(UploadFile(io.BytesIO(b"x" * 2048), filename="big.dcm"), max_bytes=1024))
+        assert exc.value.status_code == 413
+        assert os.listdir(tmp_path) == []
+
+    def test_spooled_uploads_cleans_up(self):
+        uploads = [
+            UploadFile(io.BytesIO(b"a"), filename="a.dcm"),
+            UploadFile(io.BytesIO(b"b"), filename=""),
+        ]
+
+        async def run():
+            async with spooled_uploads(uploads) as files:
+                assert [f.filename for f in files] == ["a.dcm"]
+                assert all(os.path.exists(f.path) for f in files)
+                return files
+
+        files = asyncio.run(run())
+        assert not any(os.path.exists(f.path) for f in files)
+
+
+class TestExtractFromPath:
+    def test_path_matches_bytes(self, tmp_path):
+        data = dicom_bytes(frames=5)
+        path = tmp_path / "series.dcm"
+        path.write_bytes(data)
+        from_path = extract_images_from_dicom(str(path), max_slices=3)
+        assert from_path == extract_images_from_dicom(data, max_slices=3)
+        assert [img["slice_info"] for img in from_path] == ["1/5", "3/5", "5/5"]
+
+    def test_empty_file_returns_empty(self, tmp_path):
+        path = tmp_path / "empty.dcm"
+        path.write_bytes(b"")
+        assert extract_images_from_dicom(str(path)) == []
+
+
+class TestFrameSelection:
+    def test_decodes_only_selected_frames(self, tmp_path, monkeypatch):
+        import core.agent.dicom_decoders as dicom_decoders
+        requested = []
+        real_iter_pixels = dicom_decoders.iter_pixels
+
+        def spy(src, indices=None, **kw):
+            requested.append(list(indices))
+            return real_iter_pixels(src, indices=indices, **kw)
+
+        monkeypatch.setattr(dicom_decoders, "iter_pixels", spy)
+        path = tmp_path / "multi.dcm"
+        path.write_bytes(dicom_bytes(frames=50, rows=16, cols=16))
+        images = extract_images_from_dicom(str(path), max_slices=3)
+        assert requested == [[0, 24, 49]]
+        assert [img["slice_info"] for img in images] == ["1/50", "25/50", "50/50"]
+
+    def test_single_frame(self):
+        images = extract_images_from_dicom(dicom_bytes(frames=1))
+        assert len(images) == 1
+        assert images[0]["slice_info"] == "1/1"
+        assert images[0]["series_description"] == "MR – T1 VIBE"